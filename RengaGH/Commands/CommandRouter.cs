@@ -19,6 +19,7 @@ namespace RengaPlugin.Commands
             m_app = app;
             handlers = new Dictionary<string, ICommandHandler>
             {
+                { "hello", new HelloHandler(app) },
                 { "get_walls", new GetWallsHandler(app) },
                 { "update_points", new CreateColumnsHandler(app) }
             };
@@ -1,4 +1,5 @@
 using System;
+using System.Collections.Generic;
 using Newtonsoft.Json;
 using Newtonsoft.Json.Linq;
 
@@ -21,6 +22,17 @@ namespace RengaPlugin.Connection
         [JsonProperty("timestamp")]
         public string Timestamp { get; set; }
 
+        /// <summary>
+        /// Frame encodings the client can decode (e.g. "zlib")
+        /// </summary>
+        [JsonProperty("accept")]
+        public List<string> Accept { get; set; }
+
+        public bool Accepts(string encoding)
+        {
+            return Accept != null && Accept.Contains(encoding);
+        }
+
         public string ToJson()
         {
             return JsonConvert.SerializeObject(this);
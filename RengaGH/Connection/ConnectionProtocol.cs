@@ -1,5 +1,6 @@
 using System;
 using System.IO;
+using System.IO.Compression;
 using System.Net;
 using System.Net.Sockets;
 using System.Text;
@@ -12,15 +13,38 @@ namespace RengaPlugin.Connection
     /// </summary>
     public static class ConnectionProtocol
     {
+        /// <summary>
+        /// Largest accepted frame. Bigger get_walls replies must be streamed (data.stream = true)
+        /// </summary>
+        public const int MaxMessageSize = 10 * 1024 * 1024;
+
+        /// <summary>
+        /// Tagged frame marker: JSON text never starts with a byte that has the high bit set
+        /// </summary>
+        public const byte FrameTagged = 0x80;
+        public const byte FlagCompressed = 0x40;
+        public const byte FrameTypeMask = 0x0F;
+        public const byte FrameJson = 0x01;
+
+        /// <summary>
+        /// Value of the "accept" list of a request for zlib-compressed frames
+        /// </summary>
+        public const string EncodingZlib = "zlib";
+
+        /// <summary>
+        /// Payloads smaller than this are never compressed
+        /// </summary>
+        public const int CompressThreshold = 64 * 1024;
+
         /// <summary>
         /// Send a message with length prefix (4 bytes big-endian + JSON data)
         /// </summary>
-        public static async Task SendMessageAsync(NetworkStream stream, string json)
+        public static async Task SendMessageAsync(NetworkStream stream, string json, bool compress = false)
         {
             if (stream == null || !stream.CanWrite)
                 throw new InvalidOperationException("Stream is not writable");
 
-            var data = Encoding.UTF8.GetBytes(json);
+            var data = EncodePayload(json, compress);
             var length = BitConverter.GetBytes(IPAddress.HostToNetworkOrder(data.Length));
             
             // Send length (4 bytes)
@@ -58,7 +82,7 @@ namespace RengaPlugin.Connection
             
             int length = IPAddress.NetworkToHostOrder(BitConverter.ToInt32(lengthBytes, 0));
             
-            if (length < 0 || length > 10 * 1024 * 1024) // Max 10MB
+            if (length < 0 || length > MaxMessageSize)
                 throw new IOException($"Invalid message length: {length}");
 
             // Read JSON data
@@ -73,18 +97,18 @@ namespace RengaPlugin.Connection
                 totalRead += read;
             }
             
-            return Encoding.UTF8.GetString(buffer, 0, length);
+            return DecodePayload(buffer, length);
         }
 
         /// <summary>
         /// Synchronous version for compatibility
         /// </summary>
-        public static void SendMessage(NetworkStream stream, string json)
+        public static void SendMessage(NetworkStream stream, string json, bool compress = false)
         {
             if (stream == null || !stream.CanWrite)
                 throw new InvalidOperationException("Stream is not writable");
 
-            var data = Encoding.UTF8.GetBytes(json);
+            var data = EncodePayload(json, compress);
             var length = BitConverter.GetBytes(IPAddress.HostToNetworkOrder(data.Length));
             
             // Send length (4 bytes)
@@ -122,7 +146,7 @@ namespace RengaPlugin.Connection
             
             int length = IPAddress.NetworkToHostOrder(BitConverter.ToInt32(lengthBytes, 0));
             
-            if (length < 0 || length > 10 * 1024 * 1024) // Max 10MB
+            if (length < 0 || length > MaxMessageSize)
                 throw new IOException($"Invalid message length: {length}");
 
             // Read JSON data
@@ -137,6 +161,48 @@ namespace RengaPlugin.Connection
                 totalRead += read;
             }
             
+            return DecodePayload(buffer, length);
+        }
+
+        /// <summary>
+        /// Encode JSON as frame payload, zlib-compressed (tagged frame) if requested,
+        /// large enough and actually smaller
+        /// </summary>
+        private static byte[] EncodePayload(string json, bool compress)
+        {
+            var data = Encoding.UTF8.GetBytes(json);
+            if (!compress || data.Length < CompressThreshold)
+                return data;
+
+            using (var output = new MemoryStream())
+            {
+                output.WriteByte((byte)(FrameTagged | FlagCompressed | FrameJson));
+                using (var zlib = new ZLibStream(output, CompressionLevel.Fastest, leaveOpen: true))
+                {
+                    zlib.Write(data, 0, data.Length);
+                }
+                return output.Length < data.Length ? output.ToArray() : data;
+            }
+        }
+
+        /// <summary>
+        /// Decode frame payload: plain UTF-8 JSON or a compressed tagged JSON frame
+        /// </summary>
+        private static string DecodePayload(byte[] buffer, int length)
+        {
+            if (length > 0 && (buffer[0] & FrameTagged) != 0)
+            {
+                if ((buffer[0] & FrameTypeMask) != FrameJson || (buffer[0] & FlagCompressed) == 0)
+                    throw new IOException($"Unsupported frame type: 0x{buffer[0]:X2}");
+
+                using (var input = new MemoryStream(buffer, 1, length - 1))
+                using (var zlib = new ZLibStream(input, CompressionMode.Decompress))
+                using (var reader = new StreamReader(zlib, Encoding.UTF8))
+                {
+                    return reader.ReadToEnd();
+                }
+            }
+
             return Encoding.UTF8.GetString(buffer, 0, length);
         }
     }
@@ -25,8 +25,9 @@ namespace RengaPlugin.Handlers
         {
             try
             {
-                var points = message.Data?["points"] as JArray;
-                if (points == null || points.Count == 0)
+                var points = message.Data?["points"] as JArray ?? new JArray();
+                var deletions = message.Data?["delete"] as JArray;
+                if (points.Count == 0 && (deletions == null || deletions.Count == 0))
                 {
                     return new ConnectionResponse
                     {
@@ -54,6 +55,8 @@ namespace RengaPlugin.Handlers
                 {
                     ["results"] = JArray.FromObject(results)
                 };
+                if (deletions != null && deletions.Count > 0)
+                    responseData["deleted"] = JArray.FromObject(DeletePoints(deletions));
 
                 return new ConnectionResponse
                 {
@@ -146,6 +149,69 @@ namespace RengaPlugin.Handlers
             }
         }
 
+        /// <summary>
+        /// Delete the columns of points the client no longer has (data.delete),
+        /// all in one undo step. A column that is already gone counts as deleted
+        /// </summary>
+        private List<object> DeletePoints(JArray deletions)
+        {
+            var results = new List<object>();
+            var model = m_app.Project.Model;
+            if (model == null)
+            {
+                foreach (var item in deletions)
+                    results.Add(new { success = false, message = "No active model", columnId = (string?)null, grasshopperGuid = item["grasshopperGuid"]?.ToString() });
+                return results;
+            }
+
+            var op = m_app.Project.CreateOperationWithUndo(model.Id);
+            op.Start();
+            bool changed = false;
+            foreach (var item in deletions)
+            {
+                var grasshopperGuid = item["grasshopperGuid"]?.ToString();
+                var rengaColumnGuid = item["rengaColumnGuid"]?.ToString();
+                try
+                {
+                    int columnId = 0;
+                    if (!string.IsNullOrEmpty(grasshopperGuid) && guidToColumnIdMap.TryGetValue(grasshopperGuid, out int mappedId))
+                    {
+                        columnId = mappedId;
+                        guidToColumnIdMap.Remove(grasshopperGuid);
+                    }
+                    else if (!string.IsNullOrEmpty(rengaColumnGuid))
+                    {
+                        int.TryParse(rengaColumnGuid, out columnId);
+                    }
+
+                    string resultMessage = "Column not found";
+                    if (columnId != 0 && ColumnExistsInRenga(columnId))
+                    {
+                        model.DeleteObjectById(columnId);
+                        changed = true;
+                        resultMessage = "Column deleted";
+                    }
+                    results.Add(new
+                    {
+                        success = true,
+                        message = resultMessage,
+                        columnId = columnId != 0 ? columnId.ToString() : null,
+                        grasshopperGuid = grasshopperGuid
+                    });
+                }
+                catch (Exception ex)
+                {
+                    results.Add(new { success = false, message = $"Error deleting column: {ex.Message}", columnId = rengaColumnGuid, grasshopperGuid = grasshopperGuid });
+                }
+            }
+
+            if (changed)
+                op.Apply();
+            else
+                op.Rollback();
+            return results;
+        }
+
         private PointResult CreateColumn(double x, double y, double z, double height, string grasshopperGuid)
         {
             try
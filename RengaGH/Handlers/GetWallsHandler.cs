@@ -3,9 +3,12 @@ using System.Collections.Generic;
 using System.Linq;
 using System.Reflection;
 using System.IO;
+using System.Security.Cryptography;
+using System.Text;
 using Renga;
 using RengaPlugin.Commands;
 using RengaPlugin.Connection;
+using Newtonsoft.Json;
 using Newtonsoft.Json.Linq;
 
 namespace RengaPlugin.Handlers
@@ -16,6 +19,13 @@ namespace RengaPlugin.Handlers
     public class GetWallsHandler : ICommandHandler
     {
         private Renga.IApplication m_app;
+
+        // Revisions a client can refer to in data.since; older tokens get a full reply
+        private const int MaxRevisions = 8;
+        private static readonly object s_revisionLock = new object();
+        private static readonly Dictionary<string, Dictionary<int, string>> s_revisions = new Dictionary<string, Dictionary<int, string>>();
+        private static readonly Queue<string> s_revisionOrder = new Queue<string>();
+
         private static string logFilePath = Path.Combine(Environment.GetFolderPath(Environment.SpecialFolder.ApplicationData), "Renga", "RengaGH_GetWalls.log");
 
         public GetWallsHandler(Renga.IApplication app)
@@ -51,6 +61,16 @@ namespace RengaPlugin.Handlers
                     };
                 }
 
+                // data.analyticCurves: lines and arcs go as parameters only, without sampled points
+                bool analyticCurves = message.Data?["analyticCurves"]?.Value<bool>() ?? false;
+                // data.fields: fields to include (id is always sent); data.baselineSamples: points per curved segment
+                var fields = ParseFields(message.Data?["fields"] as JArray);
+                int baselineSamples = message.Data?["baselineSamples"]?.Value<int>() ?? 0;
+                Func<string, bool> wants = field => fields == null || fields.Contains(field);
+                // data.bbox ({"min", "max"} points) and data.levelId: only walls touching the box / on the level
+                var bboxFilter = ParseBox(message.Data?["bbox"] as JObject);
+                int? levelFilter = message.Data?["levelId"]?.Value<int>();
+
                 var walls = new List<object>();
                 var objects = model.GetObjects();
                 int count = objects.Count;
@@ -60,7 +80,7 @@ namespace RengaPlugin.Handlers
 
                 // Get exported 3D objects for mesh extraction
                 var dataExporter = m_app.Project.DataExporter;
-                var exportedObjects3D = dataExporter?.GetObjects3D();
+                var exportedObjects3D = wants("mesh") ? dataExporter?.GetObjects3D() : null;
                 var exportedObjectsMap = new Dictionary<int, Renga.IExportedObject3D>();
                 
                 if (exportedObjects3D != null)
@@ -98,6 +118,10 @@ namespace RengaPlugin.Handlers
                                 }
                                 wallIds.Add(wallId);
                                 
+                                int levelId = wall.LevelId;
+                                if (levelFilter.HasValue && levelId != levelFilter.Value)
+                                    continue;
+                                
                                 var placement = wall.GetPlacement();
                                 
                                 // Get wall parameters
@@ -105,7 +129,8 @@ namespace RengaPlugin.Handlers
                                 double thickness = 0;
                                 try
                                 {
-                                    var parameters = modelObject?.GetParameters();
+                                    bool needsParameters = wants("height") || wants("thickness") || wants("bbox") || bboxFilter != null;
+                                    var parameters = needsParameters ? modelObject?.GetParameters() : null;
                                     if (parameters != null)
                                     {
                                         try
@@ -127,31 +152,55 @@ namespace RengaPlugin.Handlers
                                 }
                                 catch { }
                                 
-                                // Get baseline curve using IWallParams and IWallContour
-                                object baselineData = ExtractBaselineData(obj, placement);
-                                
-                                // Get mesh geometry from exported 3D object
-                                object meshData = null;
-                                if (exportedObjectsMap.TryGetValue(obj.Id, out var exportedObj3D))
+                                double[] bounds = null;
+                                if (bboxFilter != null || wants("bbox"))
                                 {
-                                    meshData = ExtractMeshDataFromExported(exportedObj3D);
+                                    bounds = GetWallBounds(modelObject, placement, height, thickness);
+                                    if (bboxFilter != null && (bounds == null || !BoxesIntersect(bounds, bboxFilter)))
+                                        continue;
                                 }
                                 
-                                var wallData = new
+                                var wallData = new Dictionary<string, object> { { "id", obj.Id } };
+                                if (wants("name"))
+                                    wallData["name"] = obj.Name ?? $"Wall {obj.Id}";
+                                if (wants("position"))
                                 {
-                                    id = obj.Id,
-                                    name = obj.Name ?? $"Wall {obj.Id}",
-                                    position = placement != null ? new
+                                    wallData["position"] = placement != null ? new
                                     {
                                         x = placement.Origin.X,
                                         y = placement.Origin.Y,
                                         z = placement.Origin.Z
-                                    } : null,
-                                    height = height,
-                                    thickness = thickness,
-                                    baseline = baselineData,
-                                    mesh = meshData
-                                };
+                                    } : null;
+                                }
+                                if (wants("levelId"))
+                                    wallData["levelId"] = levelId;
+                                if (wants("height"))
+                                    wallData["height"] = height;
+                                if (wants("thickness"))
+                                    wallData["thickness"] = thickness;
+                                if (wants("bbox") && bounds != null)
+                                {
+                                    wallData["bbox"] = new Dictionary<string, object>
+                                    {
+                                        { "min", new Dictionary<string, object> { { "x", bounds[0] }, { "y", bounds[1] }, { "z", bounds[2] } } },
+                                        { "max", new Dictionary<string, object> { { "x", bounds[3] }, { "y", bounds[4] }, { "z", bounds[5] } } }
+                                    };
+                                }
+                                
+                                // Get baseline curve using IWallParams and IWallContour
+                                if (wants("baseline"))
+                                    wallData["baseline"] = ExtractBaselineData(obj, placement, analyticCurves, baselineSamples);
+                                
+                                // Get mesh geometry from exported 3D object (the most expensive part)
+                                if (wants("mesh"))
+                                {
+                                    object meshData = null;
+                                    if (exportedObjectsMap.TryGetValue(obj.Id, out var exportedObj3D))
+                                    {
+                                        meshData = ExtractMeshDataFromExported(exportedObj3D);
+                                    }
+                                    wallData["mesh"] = meshData;
+                                }
                                 walls.Add(wallData);
                             }
                         }
@@ -163,10 +212,19 @@ namespace RengaPlugin.Handlers
                     }
                 }
 
-                var responseData = new JObject
+                JObject responseData;
+                bool delta = message.Data?["delta"]?.Value<bool>() ?? false;
+                if (delta)
                 {
-                    ["walls"] = JArray.FromObject(walls)
-                };
+                    responseData = BuildDeltaData(walls, message.Data["since"]?.Value<string>());
+                }
+                else
+                {
+                    responseData = new JObject
+                    {
+                        ["walls"] = JArray.FromObject(walls)
+                    };
+                }
 
                 return new ConnectionResponse
                 {
@@ -187,7 +245,283 @@ namespace RengaPlugin.Handlers
             }
         }
 
-        private object ExtractBaselineData(Renga.IModelObject wallObj, Renga.IPlacement3D placement)
+        /// <summary>
+        /// data.bbox as [minX, minY, minZ, maxX, maxY, maxZ]; null when absent
+        /// </summary>
+        private static double[] ParseBox(JObject bbox)
+        {
+            var min = bbox?["min"];
+            var max = bbox?["max"];
+            if (min == null || max == null)
+                return null;
+            return new[]
+            {
+                min["x"]?.Value<double>() ?? double.NegativeInfinity,
+                min["y"]?.Value<double>() ?? double.NegativeInfinity,
+                min["z"]?.Value<double>() ?? double.NegativeInfinity,
+                max["x"]?.Value<double>() ?? double.PositiveInfinity,
+                max["y"]?.Value<double>() ?? double.PositiveInfinity,
+                max["z"]?.Value<double>() ?? double.PositiveInfinity
+            };
+        }
+
+        private static bool BoxesIntersect(double[] a, double[] b)
+        {
+            for (int axis = 0; axis < 3; axis++)
+            {
+                if (a[axis] > b[axis + 3] || a[axis + 3] < b[axis])
+                    return false;
+            }
+            return true;
+        }
+
+        /// <summary>
+        /// Conservative bounds of a wall without exporting its mesh: the baseline
+        /// (an arc as its whole circle) widened by half the thickness, from the
+        /// placement level up by the height. [minX, minY, minZ, maxX, maxY, maxZ]
+        /// </summary>
+        private static double[] GetWallBounds(Renga.IModelObject wallObj, Renga.IPlacement3D placement, double height, double thickness)
+        {
+            try
+            {
+                var baseline2D = (wallObj as Renga.IWallParams)?.GetContour()?.GetBaseline();
+                if (baseline2D == null)
+                    return null;
+
+                var box = new[] { double.PositiveInfinity, double.PositiveInfinity, double.NegativeInfinity, double.NegativeInfinity };
+                AddCurveBounds(baseline2D, box);
+                double pad = thickness / 2;
+                double z0 = placement != null ? placement.Origin.Z : 0.0;
+                double z1 = z0 + height;
+                return new[]
+                {
+                    box[0] - pad, box[1] - pad, Math.Min(z0, z1),
+                    box[2] + pad, box[3] + pad, Math.Max(z0, z1)
+                };
+            }
+            catch
+            {
+                return null;
+            }
+        }
+
+        /// <summary>
+        /// Grows box [minX, minY, maxX, maxY] by a 2D curve
+        /// </summary>
+        private static void AddCurveBounds(Renga.ICurve2D curve, double[] box)
+        {
+            Action<double, double> add = (x, y) =>
+            {
+                box[0] = Math.Min(box[0], x);
+                box[1] = Math.Min(box[1], y);
+                box[2] = Math.Max(box[2], x);
+                box[3] = Math.Max(box[3], y);
+            };
+
+            var polyCurve = curve as Renga.IPolyCurve2D;
+            if (curve.Curve2DType == Renga.Curve2DType.Curve2DType_PolyCurve && polyCurve != null)
+            {
+                int segmentCount = polyCurve.GetSegmentCount();
+                for (int i = 0; i < segmentCount; i++)
+                {
+                    var segment = polyCurve.GetSegment(i);
+                    if (segment != null)
+                        AddCurveBounds(segment, box);
+                }
+                return;
+            }
+
+            var begin = curve.GetBeginPoint();
+            var end = curve.GetEndPoint();
+            add(begin.X, begin.Y);
+            add(end.X, end.Y);
+
+            var arc = curve as Renga.IArc2D;
+            if (curve.Curve2DType == Renga.Curve2DType.Curve2DType_Arc && arc != null)
+            {
+                var center = arc.GetCenter();
+                double radius = arc.GetRadius();
+                add(center.X - radius, center.Y - radius);
+                add(center.X + radius, center.Y + radius);
+            }
+        }
+
+        /// <summary>
+        /// Field names of data.fields; null when absent (all fields)
+        /// </summary>
+        private static HashSet<string> ParseFields(JArray fields)
+        {
+            if (fields == null)
+                return null;
+            var result = new HashSet<string>(fields.Select(f => f.Value<string>()));
+            result.Add("id");
+            return result;
+        }
+
+        /// <summary>
+        /// Delta reply for data.delta = true: revision token of the current model
+        /// state plus only the walls added or changed since revision `since`
+        /// (all walls and full = true when `since` is unknown), and removed ids
+        /// </summary>
+        private JObject BuildDeltaData(List<object> walls, string since)
+        {
+            var wallTokens = new List<JObject>();
+            var hashes = new Dictionary<int, string>();
+            foreach (var wall in walls)
+            {
+                var token = JObject.FromObject(wall);
+                string hash = ComputeHash(token.ToString(Formatting.None));
+                token["hash"] = hash;
+                hashes[token["id"].Value<int>()] = hash;
+                wallTokens.Add(token);
+            }
+
+            var revisionText = new StringBuilder();
+            foreach (var id in hashes.Keys.OrderBy(id => id))
+                revisionText.Append(id).Append(':').Append(hashes[id]).Append(';');
+            string revision = ComputeHash(revisionText.ToString());
+
+            Dictionary<int, string> previous = null;
+            lock (s_revisionLock)
+            {
+                if (!s_revisions.ContainsKey(revision))
+                {
+                    s_revisions[revision] = hashes;
+                    s_revisionOrder.Enqueue(revision);
+                    while (s_revisionOrder.Count > MaxRevisions)
+                        s_revisions.Remove(s_revisionOrder.Dequeue());
+                }
+                if (!string.IsNullOrEmpty(since))
+                    s_revisions.TryGetValue(since, out previous);
+            }
+
+            var resultWalls = new JArray();
+            var added = new JArray();
+            var changed = new JArray();
+            var removed = new JArray();
+            foreach (var token in wallTokens)
+            {
+                int id = token["id"].Value<int>();
+                if (previous != null && previous.TryGetValue(id, out var oldHash))
+                {
+                    if (oldHash == token["hash"].Value<string>())
+                        continue;
+                    changed.Add(id);
+                }
+                else
+                {
+                    added.Add(id);
+                }
+                resultWalls.Add(token);
+            }
+            if (previous != null)
+            {
+                foreach (var id in previous.Keys)
+                {
+                    if (!hashes.ContainsKey(id))
+                        removed.Add(id);
+                }
+            }
+
+            LogToFile($"Delta since {since ?? "-"}: revision {revision}, {added.Count} added, {changed.Count} changed, {removed.Count} removed");
+            return new JObject
+            {
+                ["revision"] = revision,
+                ["full"] = previous == null,
+                ["walls"] = resultWalls,
+                ["added"] = added,
+                ["changed"] = changed,
+                ["removed"] = removed,
+                ["project"] = GetProjectKey(m_app)
+            };
+        }
+
+        /// <summary>
+        /// Identity of the open project for client-side model caches and column
+        /// snapshots: its file path, empty for a project that was never saved
+        /// </summary>
+        internal static string GetProjectKey(Renga.IApplication app)
+        {
+            try
+            {
+                return app.Project?.FilePath ?? "";
+            }
+            catch
+            {
+                return "";
+            }
+        }
+
+        private static string ComputeHash(string text)
+        {
+            var digest = SHA1.HashData(Encoding.UTF8.GetBytes(text));
+            return Convert.ToHexString(digest).Substring(0, 16).ToLowerInvariant();
+        }
+
+        /// <summary>
+        /// Analytic parameters of a circular arc: center, radius, start/end angle
+        /// (radians, endAngle - startAngle is the signed sweep) and direction.
+        /// The direction is taken from the sampled points when they lie on the
+        /// circle, so the arc runs the same way as sampledPoints; otherwise from
+        /// fallbackClockwise.
+        /// </summary>
+        private static Dictionary<string, object> BuildArcData(double cx, double cy, double z, double radius,
+            IList<Dictionary<string, object>> points, Renga.Point2D begin, Renga.Point2D end, bool fallbackClockwise)
+        {
+            double startAngle = Math.Atan2(begin.Y - cy, begin.X - cx);
+            double endAngle = Math.Atan2(end.Y - cy, end.X - cx);
+            bool clockwise = fallbackClockwise;
+
+            if (points != null && points.Count >= 3)
+            {
+                Func<Dictionary<string, object>, double> angleOf = p =>
+                    Math.Atan2(Convert.ToDouble(p["y"]) - cy, Convert.ToDouble(p["x"]) - cx);
+                Func<Dictionary<string, object>, bool> onCircle = p =>
+                    Math.Abs(Math.Sqrt(Math.Pow(Convert.ToDouble(p["x"]) - cx, 2) + Math.Pow(Convert.ToDouble(p["y"]) - cy, 2)) - radius)
+                        <= 1e-3 * Math.Max(1.0, radius);
+                var first = points[0];
+                var middle = points[points.Count / 2];
+                var last = points[points.Count - 1];
+                if (onCircle(first) && onCircle(middle) && onCircle(last))
+                {
+                    startAngle = angleOf(first);
+                    endAngle = angleOf(last);
+                    double sweepCcw = NormalizeAngle(endAngle - startAngle);
+                    clockwise = NormalizeAngle(angleOf(middle) - startAngle) > sweepCcw;
+                }
+            }
+
+            double sweep = NormalizeAngle(endAngle - startAngle);
+            if (sweep == 0)
+                sweep = 2 * Math.PI;
+            if (clockwise)
+                sweep -= 2 * Math.PI;
+
+            return new Dictionary<string, object>
+            {
+                { "center", new Dictionary<string, object> { { "x", cx }, { "y", cy }, { "z", z } } },
+                { "radius", radius },
+                { "startAngle", startAngle },
+                { "endAngle", startAngle + sweep },
+                { "clockwise", clockwise }
+            };
+        }
+
+        /// <summary>
+        /// Angle in [0, 2π)
+        /// </summary>
+        private static double NormalizeAngle(double angle)
+        {
+            angle %= 2 * Math.PI;
+            return angle < 0 ? angle + 2 * Math.PI : angle;
+        }
+
+        private static Dictionary<string, object> PointData(Renga.Point2D point, double z)
+        {
+            return new Dictionary<string, object> { { "x", point.X }, { "y", point.Y }, { "z", z } };
+        }
+
+        private object ExtractBaselineData(Renga.IModelObject wallObj, Renga.IPlacement3D placement, bool analyticCurves = false, int baselineSamples = 0)
         {
             try
             {
@@ -273,6 +607,8 @@ namespace RengaPlugin.Handlers
 
                 // Handle different curve types
                 List<Dictionary<string, object>> sampledPoints = null;
+                // True when lines/arcs describe the whole curve exactly (sampled points are redundant)
+                bool analyticComplete = false;
 
                 // Check curve type using Curve2DType enum
                 if (curveType == Renga.Curve2DType.Curve2DType_LineSegment)
@@ -283,6 +619,7 @@ namespace RengaPlugin.Handlers
                         new Dictionary<string, object> { { "x", startPoint3D.X }, { "y", startPoint3D.Y }, { "z", startPoint3D.Z } },
                         new Dictionary<string, object> { { "x", endPoint3D.X }, { "y", endPoint3D.Y }, { "z", endPoint3D.Z } }
                     };
+                    analyticComplete = true;
                 }
                 else if (curveType == Renga.Curve2DType.Curve2DType_Arc)
                 {
@@ -312,7 +649,7 @@ namespace RengaPlugin.Handlers
                                 
                                 // Sample points from the actual curve direction
                                 sampledPoints = new List<Dictionary<string, object>>();
-                                int arcSamples = 50;
+                                int arcSamples = baselineSamples > 0 ? baselineSamples : 50;
                                 
                                 // Always add start point
                                 try
@@ -322,7 +659,7 @@ namespace RengaPlugin.Handlers
                                     {
                                         { "x", startPt.X },
                                         { "y", startPt.Y },
-                                        { "z", startPt.Z }
+                                        { "z", zCoord }
                                     });
                                 }
                                 catch (Exception ex)
@@ -357,7 +694,7 @@ namespace RengaPlugin.Handlers
                                             {
                                                 { "x", pt.X },
                                                 { "y", pt.Y },
-                                                { "z", pt.Z }
+                                                { "z", zCoord }
                                             });
                                         }
                                     }
@@ -375,7 +712,7 @@ namespace RengaPlugin.Handlers
                                     {
                                         { "x", endPt.X },
                                         { "y", endPt.Y },
-                                        { "z", endPt.Z }
+                                        { "z", zCoord }
                                     });
                                 }
                                 catch (Exception ex)
@@ -483,7 +820,7 @@ namespace RengaPlugin.Handlers
                                 // CRITICAL FIX: ALWAYS invert direction - baseline was building on wrong side
                                 // Simply swap start and end angles to build in opposite direction
                                 sampledPoints = new List<Dictionary<string, object>>();
-                                int arcSamples = 50;
+                                int arcSamples = baselineSamples > 0 ? baselineSamples : 50;
                                 
                                 // ALWAYS swap start and end angles to invert direction
                                 double actualStartAngle = endAngle;
@@ -530,6 +867,10 @@ namespace RengaPlugin.Handlers
                                 baselineData["radius"] = radius;
                                 LogToFile($"Wall {wallObj.Id}: Recalculated {sampledPoints.Count} sampled points for Arc (preserving direction)");
                             }
+
+                            baselineData["arc"] = BuildArcData(center2D.X, center2D.Y, zCoord, radius,
+                                sampledPoints, startPoint2D, endPoint2D, !arc2D.IsClockwise());
+                            analyticComplete = true;
                         }
                     }
                     catch (Exception ex)
@@ -546,20 +887,25 @@ namespace RengaPlugin.Handlers
                         sampledPoints = new List<Dictionary<string, object>>();
                         int segmentCount = polyCurve2D.GetSegmentCount();
                         LogToFile($"Wall {wallObj.Id}: PolyCurve with {segmentCount} segments");
+                        var segments = new List<Dictionary<string, object>>();
+                        analyticComplete = segmentCount > 0;
                         
                         for (int segIdx = 0; segIdx < segmentCount; segIdx++)
                         {
                             try
                             {
                                 var segment = polyCurve2D.GetSegment(segIdx);
+                                int segmentFirstPoint = sampledPoints.Count;
                                 if (segment != null)
                                 {
-                                    // Sample the segment using CreateCurve3D for complex curves
-                                    // But only for sampling, not for the main coordinates
-                                    var segment3D = segment.CreateCurve3D(placement);
+                                    // Sample the segment using CreateCurve3D for complex curves.
+                                    // Null placement: the segment is already global, like the
+                                    // startPoint/endPoint/center below, so the samples and the
+                                    // analytic description are in the same frame (z = zCoord)
+                                    var segment3D = segment.CreateCurve3D(null);
                                     if (segment3D != null)
                                     {
-                                        int samples = 10;
+                                        int samples = baselineSamples > 0 ? baselineSamples : 10;
                                         for (int i = 0; i <= samples; i++)
                                         {
                                             double t = (double)i / samples;
@@ -598,20 +944,50 @@ namespace RengaPlugin.Handlers
                                                 {
                                                     { "x", pt.X },
                                                     { "y", pt.Y },
-                                                    { "z", pt.Z }
+                                                    { "z", zCoord }
                                                 });
                                             }
                                         }
                                             catch { }
                                         }
                                     }
+
+                                    // Analytic description of the segment
+                                    var segmentCurveType = segment.Curve2DType;
+                                    var segmentBegin = segment.GetBeginPoint();
+                                    var segmentEnd = segment.GetEndPoint();
+                                    var segmentData = new Dictionary<string, object>
+                                    {
+                                        { "type", segmentCurveType.ToString() },
+                                        { "startPoint", PointData(segmentBegin, zCoord) },
+                                        { "endPoint", PointData(segmentEnd, zCoord) }
+                                    };
+                                    var segmentArc = segment as Renga.IArc2D;
+                                    if (segmentCurveType == Renga.Curve2DType.Curve2DType_Arc && segmentArc != null)
+                                    {
+                                        var segmentCenter = segmentArc.GetCenter();
+                                        segmentData["arc"] = BuildArcData(segmentCenter.X, segmentCenter.Y, zCoord, segmentArc.GetRadius(),
+                                            sampledPoints.GetRange(segmentFirstPoint, sampledPoints.Count - segmentFirstPoint),
+                                            segmentBegin, segmentEnd, !segmentArc.IsClockwise());
+                                    }
+                                    else if (segmentCurveType != Renga.Curve2DType.Curve2DType_LineSegment)
+                                    {
+                                        analyticComplete = false;
+                                    }
+                                    segments.Add(segmentData);
+                                }
+                                else
+                                {
+                                    analyticComplete = false;
                                 }
                             }
                             catch (Exception ex)
                             {
                                 LogToFile($"Wall {wallObj.Id}: Error sampling segment {segIdx}: {ex.Message}");
+                                analyticComplete = false;
                             }
                         }
+                        baselineData["segments"] = segments;
                         
                         if (sampledPoints.Count == 0)
                         {
@@ -632,7 +1008,7 @@ namespace RengaPlugin.Handlers
                         {
                             LogToFile($"Wall {wallObj.Id}: Using CreateCurve3D for sampling (type: {curveTypeStr})");
                             sampledPoints = new List<Dictionary<string, object>>();
-                            int samples = 50;
+                            int samples = baselineSamples > 0 ? baselineSamples : 50;
                             for (int i = 0; i <= samples; i++)
                             {
                                 double t = (double)i / samples;
@@ -696,7 +1072,7 @@ namespace RengaPlugin.Handlers
                     }
                 }
 
-                if (sampledPoints != null && sampledPoints.Count > 0)
+                if (sampledPoints != null && sampledPoints.Count > 0 && !(analyticCurves && analyticComplete))
                 {
                     baselineData["sampledPoints"] = sampledPoints;
                 }
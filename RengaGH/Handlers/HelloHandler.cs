@@ -0,0 +1,37 @@
+using RengaPlugin.Commands;
+using RengaPlugin.Connection;
+using Newtonsoft.Json.Linq;
+
+namespace RengaPlugin.Handlers
+{
+    /// <summary>
+    /// Handler for hello command: tells the client which frame encodings
+    /// the server accepts in requests, and which project is open
+    /// </summary>
+    public class HelloHandler : ICommandHandler
+    {
+        private Renga.IApplication m_app;
+
+        public HelloHandler(Renga.IApplication app)
+        {
+            m_app = app;
+        }
+
+        public ConnectionResponse Handle(ConnectionMessage message)
+        {
+            return new ConnectionResponse
+            {
+                Id = message.Id,
+                Success = true,
+                Data = new JObject
+                {
+                    ["accept"] = new JArray(ConnectionProtocol.EncodingZlib),
+                    ["stream"] = true,
+                    ["delta"] = true,
+                    ["analyticCurves"] = true,
+                    ["project"] = GetWallsHandler.GetProjectKey(m_app)
+                }
+            };
+        }
+    }
+}
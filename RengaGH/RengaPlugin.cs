@@ -10,10 +10,13 @@
 using System;
 using Renga;
 using System.Collections.Generic;
+using System.IO;
 using System.Net;
 using System.Net.Sockets;
 using System.Threading.Tasks;
 using System.Windows.Forms;
+using Newtonsoft.Json;
+using Newtonsoft.Json.Linq;
 using RengaPlugin.Connection;
 using RengaPlugin.Commands;
 
@@ -26,6 +29,7 @@ namespace RengaPlugin
         private bool isServerRunning = false;
         private int serverPort = 50100; // Default port
         private CommandRouter commandRouter;
+        private const int DefaultStreamBatchSize = 256;
 
         private List<Renga.ActionEventSource> m_eventSources = new List<Renga.ActionEventSource>();
 
@@ -152,29 +156,101 @@ namespace RengaPlugin
             }
         }
 
+        /// <summary>
+        /// Send a response. get_walls requested with data.stream = true is sent as
+        /// batches of walls followed by a final frame, so no frame hits the size limit
+        /// </summary>
+        private async Task SendResponseAsync(NetworkStream stream, ConnectionMessage message, ConnectionResponse response)
+        {
+            var walls = response.Data?["walls"] as JArray;
+            bool streamRequested = message?.Data?["stream"]?.Value<bool>() ?? false;
+            bool compress = message?.Accepts(Connection.ConnectionProtocol.EncodingZlib) ?? false;
+            if (!streamRequested || !response.Success || walls == null)
+            {
+                var responseJson = response.ToJson();
+                System.Diagnostics.Debug.WriteLine($"Sending response ({responseJson.Length} bytes)");
+                await Connection.ConnectionProtocol.SendMessageAsync(stream, responseJson, compress);
+                return;
+            }
+
+            int batchSize = message.Data["batchSize"]?.Value<int>() ?? DefaultStreamBatchSize;
+            if (batchSize <= 0)
+                batchSize = DefaultStreamBatchSize;
+
+            int seq = 0;
+            for (int start = 0; start < walls.Count; start += batchSize)
+            {
+                var batch = new JArray();
+                for (int i = start; i < Math.Min(start + batchSize, walls.Count); i++)
+                    batch.Add(walls[i]);
+
+                var frame = new JObject
+                {
+                    ["id"] = response.Id,
+                    ["success"] = true,
+                    ["data"] = new JObject { ["walls"] = batch },
+                    ["timestamp"] = response.Timestamp,
+                    ["stream"] = new JObject { ["seq"] = seq++, ["final"] = false }
+                };
+                await Connection.ConnectionProtocol.SendMessageAsync(stream, frame.ToString(Formatting.None), compress);
+            }
+
+            // Other data fields (delta revision, removed ids...) travel in the final frame
+            var finalData = new JObject { ["walls"] = new JArray(), ["count"] = walls.Count };
+            foreach (var property in response.Data.Properties())
+            {
+                if (property.Name != "walls")
+                    finalData[property.Name] = property.Value;
+            }
+
+            var finalFrame = new JObject
+            {
+                ["id"] = response.Id,
+                ["success"] = true,
+                ["data"] = finalData,
+                ["timestamp"] = response.Timestamp,
+                ["stream"] = new JObject { ["seq"] = seq, ["final"] = true }
+            };
+            await Connection.ConnectionProtocol.SendMessageAsync(stream, finalFrame.ToString(Formatting.None), compress);
+            System.Diagnostics.Debug.WriteLine($"Streamed {walls.Count} walls in {seq} frames");
+        }
+
         private async Task HandleClientAsync(TcpClient client)
         {
             try
             {
+                // Small replies must not wait for delayed ACKs (Nagle)
+                client.NoDelay = true;
                 var stream = client.GetStream();
                 stream.ReadTimeout = 10000; // 10 seconds timeout
                 
-                // Receive message using new protocol
-                var json = await Connection.ConnectionProtocol.ReceiveMessageAsync(stream, 10000);
-                System.Diagnostics.Debug.WriteLine($"Received JSON ({json.Length} bytes): {json.Substring(0, Math.Min(200, json.Length))}...");
-                
-                // Parse message
-                var message = ConnectionMessage.FromJson(json);
-                
-                // Route to appropriate handler
-                var response = commandRouter.Route(message);
-                
-                // Send response back to client
-                var responseJson = response.ToJson();
-                System.Diagnostics.Debug.WriteLine($"Sending response ({responseJson.Length} bytes)");
-                
-                await Connection.ConnectionProtocol.SendMessageAsync(stream, responseJson);
-                System.Diagnostics.Debug.WriteLine($"Response sent successfully");
+                // Keep-alive: serve messages on this connection until the client closes it,
+                // so pooled clients can send many commands over one socket
+                while (isServerRunning && client.Connected)
+                {
+                    string json;
+                    try
+                    {
+                        // Receive message using new protocol
+                        json = await Connection.ConnectionProtocol.ReceiveMessageAsync(stream, 10000);
+                    }
+                    catch (IOException)
+                    {
+                        // Client closed the connection between messages
+                        break;
+                    }
+                    System.Diagnostics.Debug.WriteLine($"Received JSON ({json.Length} bytes): {json.Substring(0, Math.Min(200, json.Length))}...");
+                    
+                    // Parse message
+                    var message = ConnectionMessage.FromJson(json);
+                    
+                    // Route to appropriate handler
+                    var response = commandRouter.Route(message);
+                    
+                    // Send response back to client
+                    await SendResponseAsync(stream, message, response);
+                    System.Diagnostics.Debug.WriteLine($"Response sent successfully");
+                }
             }
             catch (Exception ex)
             {
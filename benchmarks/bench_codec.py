@@ -0,0 +1,61 @@
+"""
+Benchmark: JSON codec backends on synthetic get_walls replies
+
+Encodes and decodes a plain-JSON get_walls reply of 1k, 10k and 50k walls
+(reference_server.make_synthetic_walls) with every backend json_codec can
+load here: orjson, ujson, stdlib json. Decoding goes through
+connection_protocol.decode_message, as on the receive path.
+
+Usage:
+    python benchmarks/bench_codec.py [--walls 1000 10000 50000] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sverchok_nodes", "renga"))
+
+import connection_protocol
+import json_codec
+import reference_server
+
+
+def _best(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--walls", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    codecs = json_codec.available_codecs()
+    print(f"available codecs: {', '.join(codecs)}")
+    print(f"{'walls':>7} {'codec':>7} {'size, MB':>9} {'encode, ms':>11} {'decode, ms':>11} {'vs json':>8}")
+    for count in args.walls:
+        model = reference_server.ReferenceModel(reference_server.make_synthetic_walls(count))
+        reply = {"id": "bench", "success": True, "data": {"walls": model.get_walls({})}}
+        baseline = None
+        for codec in reversed(codecs):  # stdlib json first, as the reference
+            json_codec.set_codec(codec)
+            payload = json_codec.dumps(reply)
+            encode = _best(lambda: json_codec.dumps(reply), args.repeat)
+            decode = _best(lambda: connection_protocol.decode_message(payload), args.repeat)
+            if baseline is None:
+                baseline = encode + decode
+            speedup = baseline / (encode + decode)
+            print(f"{count:>7} {codec:>7} {len(payload) / 1e6:>9.2f} {encode * 1000:>11.1f} "
+                  f"{decode * 1000:>11.1f} {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
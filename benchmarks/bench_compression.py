@@ -0,0 +1,96 @@
+"""
+Benchmark: negotiated zlib frame compression on loopback
+
+Runs the reference server and measures round trips of
+    - small update_points messages (below the compression threshold)
+    - one huge get_walls reply
+with compression off and on, for JSON and binary frames. "wire" is the
+size of the reply payload as sent.
+
+Usage:
+    python benchmarks/bench_compression.py [--walls N] [--points N] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sverchok_nodes", "renga"))
+
+import commands
+import connection_protocol
+import reference_server
+import renga_client
+
+
+def _best(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _wire_size(server, client, message):
+    """Size of the reply payload the server sends for message"""
+    message = client._prepare(message)
+    accept = message.get("accept") or []
+    response = server.handle_message(message)[0]
+    level = server.compress_level if connection_protocol.ENCODING_ZLIB in accept else None
+    binary = connection_protocol.ENCODING_BINARY in accept and connection_protocol.np is not None
+    if binary:
+        response = connection_protocol.pack_geometry(response)
+    return len(connection_protocol.encode_message(response, binary, level, server.compress_threshold))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--walls", type=int, default=5000)
+    parser.add_argument("--points", type=int, default=20, help="points per update_points message")
+    parser.add_argument("--messages", type=int, default=200, help="update_points messages per run")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    model = reference_server.ReferenceModel(reference_server.make_synthetic_walls(args.walls))
+    points = [(i * 1000.0, 0.0, 0.0) for i in range(args.points)]
+
+    cases = [
+        ("json", False, None),
+        ("json+zlib1", False, 1),
+        ("json+zlib6", False, 6),
+        ("binary", True, None),
+        ("binary+zlib1", True, 1),
+    ]
+
+    print(f"{'case':>14} {'update_points, ms':>18} {'get_walls, ms':>14} {'wire, MB':>10}")
+    for name, binary, level in cases:
+        server = reference_server.RengaReferenceServer(
+            model=model, compress_level=level if level is not None else 1).start()
+        try:
+            client = renga_client.RengaConnectionClient(
+                port=server.port, timeout=120.0, accept_binary=binary,
+                max_frame_size=1 << 31, compress_level=level)
+
+            def small():
+                for _ in range(args.messages):
+                    response = client.send(commands.create_update_points_message(points, [3000.0]))
+                    assert response["success"], response
+
+            def huge():
+                response = client.send(commands.create_get_walls_message())
+                assert response["success"], response
+
+            small_time = _best(small, args.repeat) / args.messages
+            huge_time = _best(huge, args.repeat)
+            wire = _wire_size(server, client, commands.create_get_walls_message())
+            print(f"{name:>14} {small_time * 1000:>18.3f} {huge_time * 1000:>14.1f} {wire / 1e6:>10.2f}")
+            client.close()
+        finally:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
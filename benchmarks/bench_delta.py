@@ -0,0 +1,114 @@
+"""
+Benchmark: full vs delta get_walls refresh
+
+Serves N synthetic walls from the reference server and times a refresh as
+the Get Walls node does it (download + mesh decode, baselines left out):
+    full               - download and decode all walls
+    delta              - send the cached revision; only walls changed since
+                         then come back and are merged into a WallCache
+    delta, no changes  - same with an unchanged model
+with `--changes` walls modified before every refresh.
+
+Usage:
+    python benchmarks/bench_delta.py [--walls N] [--changes N] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sverchok_nodes", "renga"))
+
+import commands
+import reference_server
+import renga_client
+import wall_cache
+import walls_decoder
+
+
+def full_refresh(client):
+    builder = walls_decoder.MeshBuilder()
+    message = commands.create_get_walls_message(stream=True, batch_size=256)
+    for batch in client.iter_wall_batches(message):
+        walls = batch.get("walls") or []
+        if batch.get("geometry") is not None:
+            builder.add_packed(batch["geometry"], walls)
+        else:
+            for wall in walls:
+                builder.add_wall(wall)
+    return builder.build()
+
+
+def delta_refresh(client, cache):
+    message = commands.create_get_walls_message(stream=True, batch_size=256, delta=True, since=cache.revision)
+    meta = {}
+    cache.begin()
+    for batch in client.iter_wall_batches(message):
+        walls = batch.get("walls") or []
+        if batch.get("geometry") is not None:
+            meshes = walls_decoder.split_packed(batch["geometry"], walls)
+        else:
+            meshes = [walls_decoder.wall_mesh_arrays(wall) for wall in walls]
+        for wall, mesh in zip(walls, meshes):
+            cache.add({k: v for k, v in wall.items() if k != "mesh"}, mesh)
+        if "revision" in batch:
+            meta = batch
+    cache.commit(meta)
+    builder = walls_decoder.MeshBuilder()
+    for _, (vertices, faces) in cache.entries():
+        builder.add_wall_mesh(vertices, faces)
+    return builder.build()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--walls", type=int, default=10000)
+    parser.add_argument("--changes", type=int, default=10, help="walls changed before every refresh")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    model = reference_server.ReferenceModel(reference_server.make_synthetic_walls(args.walls))
+    server = reference_server.RengaReferenceServer(model=model).start()
+    client = renga_client.RengaConnectionClient(port=server.port, timeout=120.0, max_frame_size=1 << 31)
+    cache = wall_cache.WallCache()
+    step = 0
+
+    def change():
+        nonlocal step
+        for i in range(args.changes):
+            wall = dict(model.walls[(step * 7919 + i * 104729) % len(model.walls)])
+            wall["height"] += 1.0
+            model.set_wall(wall)
+        step += 1
+
+    try:
+        delta_refresh(client, cache)  # prime the cache
+        print(f"{args.walls} walls, {args.changes} changed before every refresh")
+        print(f"{'refresh':>20} {'time, ms':>10}")
+        cases = (
+            ("full", True, lambda: full_refresh(client)),
+            ("delta", True, lambda: delta_refresh(client, cache)),
+            ("delta, no changes", False, lambda: delta_refresh(client, cache)),
+        )
+        for name, changes, refresh in cases:
+            best = None
+            for _ in range(args.repeat):
+                if changes:
+                    change()
+                start = time.perf_counter()
+                vertices, faces = refresh()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            print(f"{name:>20} {best * 1000:>10.1f}")
+
+        expected = full_refresh(client)
+        merged = delta_refresh(client, cache)
+        assert (expected[0] == merged[0]).all() and (expected[1] == merged[1]).all()
+    finally:
+        client.close()
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
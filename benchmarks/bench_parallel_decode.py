@@ -0,0 +1,90 @@
+"""
+Benchmark: get_walls decode in the request thread vs a process pool
+
+Serves N synthetic walls from the reference server as JSON frames (what the
+Renga plugin sends) and times download + mesh decode of the whole reply:
+    0 workers  - frames parsed and meshes built in this thread
+    N workers  - raw frames decoded in a pool of N processes, mesh arrays
+                 returned through shared memory (parallel_decode)
+The speedup is relative to 0 workers; it is bounded by the cores there are
+and by how fast the server produces frames.
+
+Usage:
+    python benchmarks/bench_parallel_decode.py [--walls N] [--workers 0,1,2,4,8]
+        [--batch N] [--repeat N] [--binary] [--compress]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sverchok_nodes", "renga"))
+
+import commands
+import parallel_decode
+import reference_server
+import renga_client
+import walls_decoder
+
+
+def decode(client, batch_size, submit=None):
+    builder = walls_decoder.MeshBuilder()
+    message = commands.create_get_walls_message(stream=True, batch_size=batch_size)
+    for batch in client.iter_wall_batches(message, submit):
+        walls = batch.get("walls") or []
+        if parallel_decode.MESH_ARRAYS in batch:
+            builder.add_walls(*batch[parallel_decode.MESH_ARRAYS])
+        elif batch.get("geometry") is not None:
+            builder.add_packed(batch["geometry"], walls)
+        else:
+            for wall in walls:
+                builder.add_wall(wall)
+    return builder.build()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--walls", type=int, default=50000)
+    parser.add_argument("--workers", default="0,1,2,4,8", help="comma-separated worker counts")
+    parser.add_argument("--batch", type=int, default=256, help="walls per frame")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--binary", action="store_true", help="accept binary frames")
+    parser.add_argument("--compress", action="store_true", help="accept zlib frames")
+    args = parser.parse_args()
+    worker_counts = [int(w) for w in args.workers.split(",")]
+
+    model = reference_server.ReferenceModel(reference_server.make_synthetic_walls(args.walls))
+    server = reference_server.RengaReferenceServer(model=model).start()
+    client = renga_client.RengaConnectionClient(
+        port=server.port, timeout=300.0, max_frame_size=1 << 31, accept_binary=args.binary,
+        compress_level=renga_client.connection_protocol.COMPRESS_LEVEL if args.compress else None)
+
+    try:
+        expected = decode(client, args.batch)
+        print(f"{args.walls} walls, {args.batch} per frame, {os.cpu_count()} cores, "
+              f"{'binary' if args.binary else 'JSON'}{' + zlib' if args.compress else ''} frames")
+        print(f"{'workers':>8} {'time, ms':>10} {'speedup':>8}")
+        baseline = None
+        for workers in worker_counts:
+            submit = parallel_decode.frame_submitter(workers) if workers else None
+            if submit is not None:
+                decode(client, args.batch, submit)  # start the processes
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                vertices, faces = decode(client, args.batch, submit)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            assert (vertices == expected[0]).all() and (faces == expected[1]).all()
+            if baseline is None:
+                baseline = best
+            print(f"{workers:>8} {best * 1000:>10.1f} {baseline / best:>7.2f}x")
+    finally:
+        parallel_decode.shutdown()
+        client.close()
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
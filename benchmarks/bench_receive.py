@@ -0,0 +1,97 @@
+"""
+Benchmark: receive path of connection_protocol
+
+Compares the old receive loop (buffer += chunk) with receive_frame()
+(one preallocated bytearray filled by recv_into) for 1 MB, 10 MB and
+100 MB frames over a local socket pair.
+
+Copy count is the number of payload bytes copied in user space after the
+kernel delivered them, divided by the frame size:
+    buffer += chunk   - every append copies the whole buffer so far
+    recv_into         - data lands in its final place, no extra copies
+
+Usage:
+    python benchmarks/bench_receive.py [--repeat N]
+"""
+
+import argparse
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sverchok_nodes", "renga"))
+
+import connection_protocol
+
+
+SIZES_MB = [1, 10, 100]
+
+
+def legacy_receive(sock):
+    """Receive loop as it was before recv_into; returns (payload, bytes_copied)"""
+    length_bytes = b''
+    while len(length_bytes) < 4:
+        chunk = sock.recv(4 - len(length_bytes))
+        if not chunk:
+            raise ConnectionError("Connection closed while reading message length")
+        length_bytes += chunk
+    length = struct.unpack('>I', length_bytes)[0]
+
+    buffer = b''
+    copied = 0
+    while len(buffer) < length:
+        chunk = sock.recv(length - len(buffer))
+        if not chunk:
+            raise ConnectionError("Connection closed while reading message data")
+        buffer += chunk
+        copied += len(buffer)
+    return buffer, copied
+
+
+def _send_frame(sock, payload):
+    sock.sendall(struct.pack('>I', len(payload)))
+    sock.sendall(payload)
+
+
+def run(size_mb, repeat):
+    payload = os.urandom(size_mb * 1024 * 1024)
+    results = {}
+    for name in ("legacy", "recv_into"):
+        best = None
+        copied = 0
+        for _ in range(repeat):
+            reader, writer = socket.socketpair()
+            sender = threading.Thread(target=_send_frame, args=(writer, payload))
+            start = time.perf_counter()
+            sender.start()
+            if name == "legacy":
+                data, copied = legacy_receive(reader)
+            else:
+                data = connection_protocol.receive_frame(reader, timeout=60.0, max_length=len(payload))
+                copied = 0
+            elapsed = time.perf_counter() - start
+            sender.join()
+            reader.close()
+            writer.close()
+            assert len(data) == len(payload)
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = (best, copied / len(payload))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, best time is reported")
+    args = parser.parse_args()
+
+    print(f"{'frame':>8} {'method':>10} {'time, ms':>10} {'copies':>10}")
+    for size_mb in SIZES_MB:
+        for name, (elapsed, copies) in run(size_mb, args.repeat).items():
+            print(f"{size_mb:>6}MB {name:>10} {elapsed * 1000:>10.1f} {copies:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
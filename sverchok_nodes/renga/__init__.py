@@ -177,3 +177,10 @@ def unregister():
                 renga_connect.unregister()
         except:
             pass
+    
+    # Остановить фоновые задачи нод (таймер и пул потоков)
+    try:
+        import renga_jobs
+        renga_jobs.unregister()
+    except:
+        pass
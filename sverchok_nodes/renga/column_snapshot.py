@@ -0,0 +1,251 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Client-side snapshot of the columns Renga acknowledged, for diff-based
+update_points
+
+ColumnSnapshot keeps, for one Create Columns node, the position, height
+and column id of every point GUID Renga confirmed, and the GUID of every
+input point of the last sync. diff() compares new input against it:
+
+    created   - GUID not in the snapshot
+    moved     - new GUID at an input index whose old GUID is gone: the old
+                column is sent along (rengaColumnGuid) and moved
+    changed   - known GUID with another height
+    deleted   - GUIDs of the snapshot no input point has any more
+    unchanged - everything else, not sent at all
+
+    plan = snapshot.diff(guids, points, heights)
+    message = create_update_points_message(
+        [points[i] for i in plan.send], [heights[i] for i in plan.send],
+        plan.column_ids, plan.deletions)
+    outputs = snapshot.apply(plan, results, deleted)
+
+The snapshot only changes in apply(), from the server's results: a failed
+create or delete is simply tried again next time.
+
+save()/load() keep a snapshot on disk as UTF-8 JSON (snapshot_name(node_id,
+port) next to the .blend, see model_cache.cache_dir), so point GUIDs and their
+columns survive a restart:
+
+    {"format": 1, "guids": [...], "columns": [[x, y, z, height], ...],
+     "columnIds": [...], "order": [...], "project": "..."}
+
+Column ids are only meaningful in the project they were created in: a
+loaded snapshot is compared with the open project before its first sync
+(project, checked) and dropped when another project is open.
+"""
+
+import os
+import sys
+
+# Добавить путь к папке для импорта модулей
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+if _current_dir not in sys.path:
+    sys.path.insert(0, _current_dir)
+
+import json_codec
+
+# Heights closer than this are the same (model units, mm)
+HEIGHT_TOLERANCE = 0.001
+
+FORMAT_VERSION = 1
+SNAPSHOT_SUFFIX = ".json"
+
+
+class SyncPlan:
+    """What diff() found; send/column_ids/deletions go into the message"""
+
+    def __init__(self, guids, points, heights):
+        self.guids = guids
+        self.points = points
+        self.heights = heights
+        self.send = []  # input indices to send
+        self.column_ids = []  # rengaColumnGuid per sent point, None - from the mapping
+        self.moved = {}  # new GUID -> old GUID whose column it takes
+        self.deletions = []  # (point GUID, column id)
+        self.created = self.changed = 0
+
+    @property
+    def empty(self):
+        return not self.send and not self.deletions
+
+    def summary(self):
+        return (f"{self.created} created, {len(self.moved)} moved, {self.changed} changed, "
+                f"{len(self.deletions)} deleted, {len(self.guids) - len(self.send)} unchanged")
+
+
+class ColumnSnapshot:
+    """Acknowledged columns of one node: point GUID -> (x, y, z, height, column id)"""
+
+    def __init__(self):
+        self.columns = {}
+        self.order = []  # point GUID of every input point of the last sync
+        self.project = None  # project the columns are in, None - not known
+        self.checked = False  # project compared with the one open in Renga
+
+    def __len__(self):
+        return len(self.columns)
+
+    def clear(self):
+        self.columns = {}
+        self.order = []
+        self.project = None
+        self.checked = False
+
+    def column_id(self, guid):
+        entry = self.columns.get(guid)
+        return entry[4] if entry is not None else None
+
+    def diff(self, guids, points, heights, full=False):
+        """
+        Plan the update of the snapshot to new input
+
+        Args:
+            guids: point GUID of every input point
+            points: (x, y, z) of every input point
+            heights: height of every input point
+            full: send every point, as without a snapshot (deletions still
+                go along)
+
+        Returns:
+            SyncPlan
+        """
+        plan = SyncPlan(guids, points, heights)
+        current = set(guids)
+        # Old GUIDs gone from the input: their columns can be reused by
+        # the points that now sit at the same input index
+        gone = {guid for guid in self.order if guid not in current and guid in self.columns}
+
+        for i, guid in enumerate(guids):
+            entry = self.columns.get(guid)
+            if entry is not None:
+                if full or abs(entry[3] - heights[i]) > HEIGHT_TOLERANCE:
+                    plan.send.append(i)
+                    plan.column_ids.append(entry[4])
+                    plan.changed += 1
+                continue
+            old = self.order[i] if i < len(self.order) else None
+            if old in gone and guid not in plan.moved:
+                gone.discard(old)
+                plan.moved[guid] = old
+                plan.send.append(i)
+                plan.column_ids.append(self.columns[old][4])
+            else:
+                plan.send.append(i)
+                plan.column_ids.append(None)
+                plan.created += 1
+
+        # Reused columns aren't deleted; the rest of the gone ones are
+        plan.deletions = [(guid, self.columns[guid][4]) for guid in self.columns
+                          if guid not in current and guid not in plan.moved.values()]
+        return plan
+
+    def apply(self, plan, results, deleted=None):
+        """
+        Merge the server's answer
+
+        Args:
+            plan: the SyncPlan the message was built from
+            results: data.results, one per sent point (None - request failed)
+            deleted: data.deleted, one per deletion; None - the server did
+                not report deletions (the columns stay in the snapshot)
+
+        Returns:
+            tuple: (successes, messages, column ids) for every input point
+        """
+        count = len(plan.guids)
+        successes = [True] * count
+        messages = ["Column unchanged"] * count
+        column_ids = [str(self.column_id(guid) or "") for guid in plan.guids]
+
+        for n, i in enumerate(plan.send):
+            result = results[n] if results is not None and n < len(results) else None
+            guid = plan.guids[i]
+            if result is None:
+                successes[i], messages[i], column_ids[i] = False, "No result from Renga", ""
+                continue
+            column_id = result.get("columnId") or ""
+            successes[i] = bool(result.get("success", False))
+            messages[i] = result.get("message", "Unknown")
+            column_ids[i] = str(column_id) if column_id else ""
+            if successes[i] and column_id:
+                x, y, z = plan.points[i][:3]
+                self.columns[guid] = (float(x), float(y), float(z), float(plan.heights[i]), str(column_id))
+                old = plan.moved.get(guid)
+                if old is not None:
+                    self.columns.pop(old, None)
+
+        for (guid, _), result in zip(plan.deletions, deleted or []):
+            if result.get("success", False):
+                self.columns.pop(guid, None)
+
+        self.order = list(plan.guids)
+        return successes, messages, column_ids
+
+
+def snapshot_name(node_id, port=None):
+    """File name of the snapshot of a node (for the server on port)"""
+    node_id = "".join(c for c in str(node_id) if c.isalnum() or c in "-_")
+    if port is not None:
+        node_id = f"{node_id}_{int(port)}"
+    return f"columns_{node_id}{SNAPSHOT_SUFFIX}"
+
+
+def save(snapshot, path):
+    """Write snapshot to path (atomically)"""
+    guids = list(snapshot.columns)
+    entries = [snapshot.columns[guid] for guid in guids]
+    data = json_codec.dumps({
+        "format": FORMAT_VERSION,
+        "guids": guids,
+        "columns": [entry[:4] for entry in entries],
+        "columnIds": [entry[4] for entry in entries],
+        "order": snapshot.order,
+        "project": snapshot.project,
+    })
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def load(path):
+    """
+    Read a snapshot written by save()
+
+    Returns:
+        ColumnSnapshot
+
+    Raises:
+        ValueError: not a snapshot file of this format version
+    """
+    with open(path, "rb") as f:
+        data = json_codec.loads(f.read())
+    if not isinstance(data, dict) or data.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported column snapshot format: {data.get('format') if isinstance(data, dict) else None}")
+    snapshot = ColumnSnapshot()
+    for guid, (x, y, z, height), column_id in zip(data["guids"], data["columns"], data["columnIds"]):
+        snapshot.columns[guid] = (float(x), float(y), float(z), float(height), str(column_id))
+    snapshot.order = list(data.get("order") or [])
+    snapshot.project = data.get("project")
+    return snapshot
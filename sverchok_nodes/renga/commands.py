@@ -22,37 +22,67 @@ Compatible with C# Renga plugin commands
 """
 
 import json
+import os
+import sys
+import threading
 import uuid
 from datetime import datetime
 
+# Добавить путь к папке для импорта модулей
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+if _current_dir not in sys.path:
+    sys.path.insert(0, _current_dir)
+
+import point_index
+
+# Wall fields get_walls can be limited to (data.fields)
+WALL_FIELDS = ("id", "name", "position", "levelId", "height", "thickness", "bbox", "baseline", "mesh")
+
+# Points closer than this on every axis are the same point
+POINT_TOLERANCE = 0.001
+
 # Global mapping for point GUIDs (similar to C# implementation)
 _point_guid_map = {}
-_point_to_guid_map = {}
+_point_index = point_index.PointIndex(POINT_TOLERANCE)  # point -> GUID
 _guid_counter = 0
+# GUIDs may be resolved from worker threads: one point, one GUID
+_point_lock = threading.RLock()
 
 
-def _get_point_guid(point, tolerance=0.001):
+def _get_point_guid(point, tolerance=POINT_TOLERANCE):
     """
     Get or create GUID for a point
     Similar to CreateColumnsCommand.GetPointGuid in C#
     """
-    global _point_to_guid_map, _guid_counter
+    global _guid_counter
     
-    # Check if point already has a GUID
-    for existing_point, guid in _point_to_guid_map.items():
-        if (abs(existing_point[0] - point[0]) < tolerance and
-            abs(existing_point[1] - point[1]) < tolerance and
-            abs(existing_point[2] - point[2]) < tolerance):
+    with _point_lock:
+        # Check if point already has a GUID
+        guid = _point_index.find(point, tolerance)
+        if guid is not None:
             return guid
-    
-    # Create new GUID
-    new_guid = f"SV_Point_{_guid_counter}_{uuid.uuid4().hex[:8]}"
-    _point_to_guid_map[tuple(point)] = new_guid
-    _guid_counter += 1
-    return new_guid
+        
+        # Create new GUID
+        new_guid = f"SV_Point_{_guid_counter}_{uuid.uuid4().hex[:8]}"
+        _point_index.add(point, new_guid)
+        _guid_counter += 1
+        return new_guid
 
 
-def create_update_points_message(points, heights=None):
+def _get_point_guids(points, tolerance=POINT_TOLERANCE):
+    """
+    GUIDs of many points: known points are looked up in one batch, new
+    ones get GUIDs in input order (close new points share one)
+    """
+    with _point_lock:
+        guids = _point_index.find_many(points, tolerance) if len(points) else []
+        for i, guid in enumerate(guids):
+            if guid is None:
+                guids[i] = _get_point_guid(points[i], tolerance)
+        return guids
+
+
+def create_update_points_message(points, heights=None, column_ids=None, deletions=None, point_guids=None):
     """
     Create update_points command message
     Similar to CreateColumnsCommand.CreateMessage in C#
@@ -60,6 +90,11 @@ def create_update_points_message(points, heights=None):
     Args:
         points: List of points as tuples (x, y, z) or lists [x, y, z]
         heights: List of heights (one per point, or single value for all, default: 3000.0)
+        column_ids: rengaColumnGuid of every point, None - from the mapping
+            (a moved point takes over the column of its old GUID)
+        deletions: (point GUID, column id) of columns to delete; answered
+            in data.deleted (see column_snapshot)
+        point_guids: GUID of every point if already resolved, None - looked up
     
     Returns:
         dict: Message dictionary ready for JSON serialization
@@ -74,6 +109,8 @@ def create_update_points_message(points, heights=None):
         last_height = heights[-1] if heights else 3000.0
         heights.extend([last_height] * (len(points) - len(heights)))
     
+    if point_guids is None:
+        point_guids = _get_point_guids(points)
     point_data = []
     for i, point in enumerate(points):
         # Convert point to list if needed
@@ -87,8 +124,8 @@ def create_update_points_message(points, heights=None):
         if height <= 0:
             height = 3000.0
         
-        point_guid = _get_point_guid(point)
-        renga_column_guid = _point_guid_map.get(point_guid)
+        point_guid = point_guids[i]
+        renga_column_guid = column_ids[i] if column_ids and column_ids[i] else _point_guid_map.get(point_guid)
         
         point_obj = {
             "x": float(x),
@@ -100,30 +137,74 @@ def create_update_points_message(points, heights=None):
         }
         point_data.append(point_obj)
     
+    data = {"points": point_data}
+    if deletions:
+        data["delete"] = [{"grasshopperGuid": guid, "rengaColumnGuid": str(column_id) if column_id else None}
+                          for guid, column_id in deletions]
+    
     message = {
         "id": str(uuid.uuid4()),
         "command": "update_points",
-        "data": {
-            "points": point_data
-        },
+        "data": data,
         "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
     }
     
     return message
 
 
-def create_get_walls_message():
+def _bbox_data(bbox):
+    lower, upper = bbox
+    return {
+        "min": {"x": float(lower[0]), "y": float(lower[1]), "z": float(lower[2])},
+        "max": {"x": float(upper[0]), "y": float(upper[1]), "z": float(upper[2])},
+    }
+
+
+def create_get_walls_message(stream=False, batch_size=None, delta=False, since=None, analytic_curves=False,
+                             fields=None, baseline_samples=None, bbox=None, level_id=None):
     """
     Create get_walls command message
     Similar to GetWallsCommand.CreateMessage in C#
     
+    Args:
+        stream: Ask for the reply as a sequence of wall batches
+        batch_size: Walls per streamed frame (server default if None)
+        delta: Ask for a revision token and only walls changed since `since`
+        since: Revision token of the last reply (None - full reply)
+        analytic_curves: Lines and arcs as parameters only, without sampled points
+        fields: Wall fields to include (of WALL_FIELDS; id is always sent),
+            None - all
+        baseline_samples: Points per curved baseline segment (None - server default)
+        bbox: ((x, y, z) min, (x, y, z) max) - only walls touching this box
+        level_id: Only walls on this level
+    
     Returns:
         dict: Message dictionary ready for JSON serialization
     """
+    data = {}
+    if stream:
+        data["stream"] = True
+        if batch_size:
+            data["batchSize"] = int(batch_size)
+    if delta:
+        data["delta"] = True
+        if since:
+            data["since"] = since
+    if analytic_curves:
+        data["analyticCurves"] = True
+    if fields is not None:
+        data["fields"] = list(fields)
+    if baseline_samples:
+        data["baselineSamples"] = int(baseline_samples)
+    if bbox is not None:
+        data["bbox"] = _bbox_data(bbox)
+    if level_id is not None:
+        data["levelId"] = int(level_id)
+    
     message = {
         "id": str(uuid.uuid4()),
         "command": "get_walls",
-        "data": {},
+        "data": data,
         "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
     }
     
@@ -137,10 +218,12 @@ def update_mapping(point_guid, column_id):
     
     Args:
         point_guid: GUID of the point
-        column_id: ID of the column in Renga
+        column_id: ID of the column in Renga, None - the column was deleted
     """
     global _point_guid_map
     
     if column_id:
         _point_guid_map[point_guid] = str(column_id)
+    else:
+        _point_guid_map.pop(point_guid, None)
 
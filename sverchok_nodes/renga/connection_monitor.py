@@ -0,0 +1,233 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Background heartbeat for the Renga server connection
+
+A ConnectionMonitor thread probes the server and keeps its state:
+
+    connecting - no probe has finished yet
+    connected  - last probe succeeded
+    degraded   - was connected, the last probes failed (fewer than down_after)
+    down       - down_after probes in a row failed, or never connected
+
+While probes fail the interval grows exponentially up to max_interval, so a
+stopped Renga costs almost nothing. Nodes read monitor.state instead of
+probing themselves; reading never blocks.
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Добавить путь к папке для импорта модулей
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+if _current_dir not in sys.path:
+    sys.path.insert(0, _current_dir)
+
+import renga_client
+
+STATE_CONNECTING = "connecting"
+STATE_CONNECTED = "connected"
+STATE_DEGRADED = "degraded"
+STATE_DOWN = "down"
+
+
+class ConnectionMonitor:
+    """
+    Heartbeat thread for one Renga server
+
+    Args:
+        host, port: server address
+        interval: seconds between probes while connected
+        timeout: connect timeout of one probe
+        max_interval: upper bound of the backoff while probes fail
+        down_after: failed probes in a row before connected becomes down
+        pool: ConnectionPool probed through (default: shared pool), so a
+            probe reuses an idle connection when there is one
+    """
+
+    def __init__(self, host="127.0.0.1", port=50100, interval=2.0, timeout=1.0,
+                 max_interval=30.0, down_after=3, pool=None):
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.timeout = timeout
+        self.max_interval = max_interval
+        self.down_after = down_after
+        self.pool = pool or renga_client.get_pool()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._state = STATE_CONNECTING
+        self._failures = 0
+        self._last_error = None
+        self._last_ok = None
+        self._latency = None
+        self._changes = 0
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def changes(self):
+        """Counter bumped on every state change (cheap change detection)"""
+        return self._changes
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def is_usable(self):
+        """True unless the server is known to be down"""
+        return self._state != STATE_DOWN
+
+    def snapshot(self):
+        """State and probe details as a dict"""
+        with self._lock:
+            return {
+                "state": self._state,
+                "failures": self._failures,
+                "last_error": self._last_error,
+                "last_ok": self._last_ok,
+                "latency": self._latency,
+                "next_interval": self._next_interval(),
+            }
+
+    def start(self):
+        if self.running:
+            return self
+        with self._lock:
+            self._set_state(STATE_CONNECTING)
+            self._failures = 0
+        # Own stop event per thread: a stopped thread may still be finishing
+        # its probe when the monitor is started again
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._stop, self._wake),
+            name=f"renga-heartbeat-{self.port}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop probing; does not wait for a probe in progress"""
+        self._stop.set()
+        self._wake.set()
+        self._thread = None
+
+    def poke(self):
+        """Probe now instead of waiting out the backoff (e.g. user pressed Connect)"""
+        self._wake.set()
+
+    def probe(self):
+        """Run one probe in the calling thread; returns True if the server answered"""
+        start = time.perf_counter()
+        try:
+            conn, _ = self.pool.acquire(self.host, self.port, self.timeout)
+        except Exception as e:
+            self._record(False, error=str(e))
+            return False
+        self.pool.release(conn)
+        self._record(True, latency=time.perf_counter() - start)
+        return True
+
+    def _run(self, stop, wake):
+        while not stop.is_set():
+            self.probe()
+            wake.wait(self._next_interval())
+            wake.clear()
+
+    def _record(self, ok, latency=None, error=None):
+        with self._lock:
+            if ok:
+                self._failures = 0
+                self._last_error = None
+                self._last_ok = time.time()
+                self._latency = latency
+                self._set_state(STATE_CONNECTED)
+                return
+            self._failures += 1
+            self._last_error = error
+            if self._state in (STATE_CONNECTED, STATE_DEGRADED) and self._failures < self.down_after:
+                self._set_state(STATE_DEGRADED)
+            else:
+                self._set_state(STATE_DOWN)
+
+    def _set_state(self, state):
+        if state != self._state:
+            self._state = state
+            self._changes += 1
+
+    def _next_interval(self):
+        if not self._failures:
+            return self.interval
+        return min(self.interval * (2 ** self._failures), self.max_interval)
+
+
+_monitors = {}
+_monitors_lock = threading.Lock()
+
+
+def get_monitor(host="127.0.0.1", port=50100, start=True, **kwargs):
+    """Shared monitor for (host, port), started unless start=False"""
+    key = (host, port)
+    with _monitors_lock:
+        monitor = _monitors.get(key)
+        if monitor is None:
+            monitor = ConnectionMonitor(host, port, **kwargs)
+            _monitors[key] = monitor
+    if start:
+        monitor.start()
+    return monitor
+
+
+def find_monitor(host="127.0.0.1", port=50100):
+    """Monitor of (host, port) if one was created, else None"""
+    return _monitors.get((host, port))
+
+
+def get_state(host="127.0.0.1", port=50100):
+    """
+    Cached state of (host, port), never blocks
+
+    Returns:
+        str or None: None when no monitor runs for this server
+    """
+    monitor = find_monitor(host, port)
+    if monitor is None or not monitor.running:
+        return None
+    return monitor.state
+
+
+def stop_monitor(host="127.0.0.1", port=50100):
+    with _monitors_lock:
+        monitor = _monitors.pop((host, port), None)
+    if monitor is not None:
+        monitor.stop()
+
+
+def stop_all():
+    with _monitors_lock:
+        monitors = list(_monitors.values())
+        _monitors.clear()
+    for monitor in monitors:
+        monitor.stop()
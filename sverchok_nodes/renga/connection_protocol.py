@@ -20,75 +20,433 @@
 Protocol for reliable TCP communication with Renga plugin
 Uses length-prefixed messages (4 bytes big-endian + JSON data)
 Compatible with C# Renga plugin protocol
+
+Besides plain JSON the payload may be a tagged frame: its first byte has the
+high bit set (JSON text never starts with such a byte), the low bits give the
+frame type. FRAME_BINARY carries a small JSON header plus raw little-endian
+arrays for bulk geometry:
+
+    [type byte][4 bytes header length, big-endian][header JSON][padding][arrays]
+
+FLAG_COMPRESSED in the type byte means everything after it is zlib data;
+large plain JSON is sent compressed as a tagged FRAME_JSON.
+
+A peer only sends binary or compressed frames to a client that listed
+"binary" / "zlib" in the "accept" field of its request, so old peers keep
+exchanging plain JSON. Which formats a server can receive is asked with the
+"hello" command (see RengaConnectionClient.peer_features).
 """
 
+import os
 import struct
 import socket
-import json
+import sys
+import zlib
+from array import array
+
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+if _current_dir not in sys.path:
+    sys.path.insert(0, _current_dir)
+
+import json_codec
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+MAX_MESSAGE_SIZE = 10 * 1024 * 1024  # 10MB
+
+FRAME_TAGGED = 0x80
+FLAG_COMPRESSED = 0x40
+FRAME_TYPE_MASK = 0x0F
+FRAME_JSON = 0x01
+FRAME_BINARY = 0x02
+
+# Values for the "accept" list of a request
+ENCODING_BINARY = "binary"
+ENCODING_ZLIB = "zlib"
 
+# Frames smaller than this are never compressed: for a small update_points
+# message zlib costs more time than the bytes it saves on loopback
+COMPRESS_THRESHOLD = 64 * 1024
+COMPRESS_LEVEL = 1
 
-def send_message(sock, message_dict):
+_ARRAY_ALIGNMENT = 8
+_SINGLE_WRITE_LIMIT = 64 * 1024
+_ARRAY_REF = "$array"
+
+# dtype -> array.array typecode, for decoding without numpy
+_TYPECODES = {"<f4": "f", "<f8": "d", "<i4": "i", "<u4": "I", "<i8": "q"}
+
+
+def send_message(sock, message_dict, binary=False, compress_level=None,
+                 compress_threshold=COMPRESS_THRESHOLD):
     """
     Send a message with length prefix (4 bytes big-endian + JSON data)
     
     Args:
         sock: socket object
         message_dict: Message dictionary (will be converted to JSON)
+        binary: Send as binary frame (arrays in message_dict go as raw data)
+        compress_level: zlib level, None - never compress
+        compress_threshold: payloads smaller than this stay uncompressed
     """
+    send_payload(sock, encode_message(message_dict, binary, compress_level, compress_threshold))
+
+
+def send_payload(sock, data):
+    """Send already encoded payload bytes with length prefix"""
     if not sock:
         raise ValueError("Socket is None")
     
-    # Convert to JSON
-    json_str = json.dumps(message_dict)
-    data = json_str.encode('utf-8')
     length = len(data)
     
-    # Send length (4 bytes, big-endian)
+    # Length (4 bytes, big-endian) and data go out in one write for small
+    # frames: two small writes stall on Nagle + delayed ACK
     length_bytes = struct.pack('>I', length)
-    sock.sendall(length_bytes)
-    
-    # Send data
-    sock.sendall(data)
+    if length < _SINGLE_WRITE_LIMIT:
+        sock.sendall(length_bytes + data)
+    else:
+        sock.sendall(length_bytes)
+        sock.sendall(data)
 
 
-def receive_message(sock, timeout=10.0):
+def receive_message(sock, timeout=10.0, max_length=None):
     """
     Receive a message with length prefix
     
     Args:
         sock: socket object
         timeout: timeout in seconds (default: 10.0)
+        max_length: largest accepted payload (default: MAX_MESSAGE_SIZE)
     
     Returns:
-        dict: Parsed JSON message as dictionary
+        dict: Parsed message as dictionary (JSON or binary frame)
+    """
+    return decode_message(receive_frame(sock, timeout, max_length), max_length)
+
+
+def receive_frame(sock, timeout=10.0, max_length=None):
+    """
+    Receive the raw payload of one length-prefixed frame
+    
+    The payload is read with recv_into straight into one preallocated buffer
+    of the announced length, so large frames are never re-copied while they
+    arrive.
+    
+    Returns:
+        bytearray: payload without the length prefix
     """
     if not sock:
         raise ValueError("Socket is None")
     
+    if max_length is None:
+        max_length = MAX_MESSAGE_SIZE
+    
     # Set timeout
     sock.settimeout(timeout)
     
     # Read length (4 bytes)
-    length_bytes = b''
-    while len(length_bytes) < 4:
-        chunk = sock.recv(4 - len(length_bytes))
-        if not chunk:
-            raise ConnectionError("Connection closed while reading message length")
-        length_bytes += chunk
-    
+    length_bytes = _recv_exact(sock, 4, "length")
     length = struct.unpack('>I', length_bytes)[0]
     
-    if length < 0 or length > 10 * 1024 * 1024:  # Max 10MB
+    if length < 0 or length > max_length:
         raise ValueError(f"Invalid message length: {length}")
     
-    # Read JSON data
-    buffer = b''
-    while len(buffer) < length:
-        chunk = sock.recv(length - len(buffer))
-        if not chunk:
-            raise ConnectionError("Connection closed while reading message data")
-        buffer += chunk
+    return _recv_exact(sock, length, "data")
+
+
+def _recv_exact(sock, length, what):
+    buffer = bytearray(length)
+    view = memoryview(buffer)
+    received = 0
+    while received < length:
+        count = sock.recv_into(view[received:], length - received)
+        if not count:
+            raise ConnectionError(f"Connection closed while reading message {what}")
+        received += count
+    return buffer
+
+
+def encode_message(message_dict, binary=False, compress_level=None,
+                   compress_threshold=COMPRESS_THRESHOLD):
+    """
+    Encode a message into frame payload bytes (without length prefix)
+    
+    Args:
+        message_dict: Message dictionary
+        binary: Produce a binary frame; numpy arrays and array.array values
+            anywhere in message_dict are stored as raw little-endian data
+        compress_level: zlib level, None - never compress
+        compress_threshold: payloads smaller than this stay uncompressed
+    
+    Returns:
+        bytes: payload
+    """
+    payload = _encode_binary(message_dict) if binary else json_codec.dumps(message_dict)
+    if compress_level is None:
+        return payload
+    return compress_payload(payload, compress_level, compress_threshold)
+
+
+def compress_payload(payload, level=COMPRESS_LEVEL, threshold=COMPRESS_THRESHOLD):
+    """
+    Compress an encoded payload if it is large enough and compression helps
+    
+    Returns:
+        bytes: tagged frame with FLAG_COMPRESSED, or payload unchanged
+    """
+    if len(payload) < threshold:
+        return payload
+    if payload[0] & FRAME_TAGGED:
+        if payload[0] & FLAG_COMPRESSED:
+            return payload
+        frame_type, body = payload[0], memoryview(payload)[1:]
+    else:
+        frame_type, body = FRAME_TAGGED | FRAME_JSON, payload
+    packed = zlib.compress(body, level)
+    if len(packed) + 1 >= len(payload):
+        return payload
+    return bytes((frame_type | FLAG_COMPRESSED,)) + packed
+
+
+def _encode_binary(message_dict):
+    arrays = []
+    header = {"message": _extract_arrays(message_dict, arrays), "arrays": []}
+    blobs = []
+    offset = 0
+    for data, dtype, shape in arrays:
+        padding = -offset % _ARRAY_ALIGNMENT
+        if padding:
+            blobs.append(b'\0' * padding)
+            offset += padding
+        header["arrays"].append({"dtype": dtype, "shape": shape, "offset": offset, "nbytes": len(data)})
+        blobs.append(data)
+        offset += len(data)
+    
+    header_bytes = json_codec.dumps(header)
+    prefix = struct.pack('>BI', FRAME_TAGGED | FRAME_BINARY, len(header_bytes))
+    padding = -(len(prefix) + len(header_bytes)) % _ARRAY_ALIGNMENT
+    return b''.join([prefix, header_bytes, b'\0' * padding] + blobs)
+
+
+def decompress_body(data, max_length=None):
+    """
+    Inflate the zlib body of a compressed frame
+    
+    Args:
+        max_length: largest accepted inflated size (default: MAX_MESSAGE_SIZE),
+            so a small frame can't expand without bound
+    
+    Raises:
+        ValueError: inflated body larger than max_length, or truncated
+    """
+    if max_length is None:
+        max_length = MAX_MESSAGE_SIZE
+    inflater = zlib.decompressobj()
+    body = inflater.decompress(data, max_length)
+    if inflater.unconsumed_tail:
+        raise ValueError(f"Compressed message inflates past {max_length} bytes")
+    if not inflater.eof:
+        raise ValueError("Truncated compressed message")
+    return body
+
+
+def decode_message(payload, max_length=None):
+    """
+    Decode frame payload bytes into a message dictionary
+    
+    Plain JSON and binary frames are told apart by the first byte. Arrays of
+    binary frames become numpy arrays (views into payload, no copy) when
+    numpy is available, nested lists otherwise.
+    
+    Args:
+        max_length: largest accepted size of a compressed frame's inflated
+            body (default: MAX_MESSAGE_SIZE)
+    """
+    if payload and payload[0] & FRAME_TAGGED:
+        frame_type = payload[0] & FRAME_TYPE_MASK
+        if payload[0] & FLAG_COMPRESSED:
+            body = decompress_body(memoryview(payload)[1:], max_length)
+            if frame_type == FRAME_JSON:
+                return json_codec.loads(body)
+            # Keep the type byte in front so array offsets stay 8-byte aligned
+            payload = bytearray((frame_type | FRAME_TAGGED,))
+            payload += body
+        if frame_type == FRAME_BINARY:
+            return unpack_geometry(_decode_binary(payload))
+        if frame_type == FRAME_JSON:
+            return json_codec.loads(memoryview(payload)[1:])
+        raise ValueError(f"Unknown frame type: {payload[0]:#04x}")
     
-    # Parse JSON and return as dict
-    return json.loads(buffer.decode('utf-8'))
+    # Parse JSON straight from the receive buffer (bytes/bytearray, no decode copy)
+    return json_codec.loads(payload)
+
+
+def pack_geometry(message_dict, vertex_dtype="<f8"):
+    """
+    Move geometry of a get_walls response into a few arrays for a binary frame
+    
+    Per-grid vertex and triangle lists are tiny (a wall face is one grid),
+    so they are concatenated into data["geometry"]:
+        vertices            (N, 3) vertex_dtype ("<f8" or "<f4")
+        triangles           (M, 3) int32, indices local to their grid
+        gridVertexStart     (G + 1) int32 offsets into vertices
+        gridTriangleStart   (G + 1) int32 offsets into triangles
+        baselinePoints      (K, 3) vertex_dtype, sampled baseline points
+        wallBaselineStart   (W + 1) int32 offsets into baselinePoints
+    Grids are numbered in wall -> mesh -> grid order. The walls keep all
+    other fields; decode_message() restores the per-grid lists as views.
+    The input is left untouched. Requires numpy.
+    
+    Returns:
+        dict: message ready for send_message(..., binary=True)
+    """
+    data = message_dict.get("data") or {}
+    walls = data.get("walls")
+    if not walls:
+        return message_dict
+    
+    vertices, triangles, baseline_points = [], [], []
+    grid_vertex_start, grid_triangle_start, wall_baseline_start = [0], [0], [0]
+    packed_walls = []
+    for wall in walls:
+        wall = dict(wall)
+        baseline = wall.get("baseline")
+        if baseline and baseline.get("sampledPoints"):
+            _extend_points(baseline_points, baseline["sampledPoints"])
+            wall["baseline"] = {k: v for k, v in baseline.items() if k != "sampledPoints"}
+        wall_baseline_start.append(len(baseline_points) // 3)
+        
+        if wall.get("mesh"):
+            meshes = []
+            for mesh_obj in wall["mesh"]:
+                grids = []
+                for grid in mesh_obj.get("grids") or []:
+                    _extend_points(vertices, grid.get("vertices") or [])
+                    for triangle in grid.get("triangles") or []:
+                        triangles.extend(triangle[:3])
+                    grid_vertex_start.append(len(vertices) // 3)
+                    grid_triangle_start.append(len(triangles) // 3)
+                    grids.append({k: v for k, v in grid.items() if k not in ("vertices", "triangles")})
+                meshes.append(dict(mesh_obj, grids=grids))
+            wall["mesh"] = meshes
+        packed_walls.append(wall)
+    
+    geometry = {
+        "vertices": np.asarray(vertices, dtype=vertex_dtype).reshape(-1, 3),
+        "triangles": np.asarray(triangles, dtype="<i4").reshape(-1, 3),
+        "gridVertexStart": np.asarray(grid_vertex_start, dtype="<i4"),
+        "gridTriangleStart": np.asarray(grid_triangle_start, dtype="<i4"),
+        "baselinePoints": np.asarray(baseline_points, dtype=vertex_dtype).reshape(-1, 3),
+        "wallBaselineStart": np.asarray(wall_baseline_start, dtype="<i4"),
+    }
+    return dict(message_dict, data=dict(data, walls=packed_walls, geometry=geometry))
+
+
+def unpack_geometry(message_dict):
+    """
+    Restore per-grid vertices/triangles and sampled baseline points
+    
+    Inverse of pack_geometry(): every grid gets its slice of the shared
+    arrays (numpy views, no copies). data["geometry"] is kept for callers
+    that work on the concatenated arrays directly. Modifies message_dict in
+    place and returns it.
+    """
+    data = message_dict.get("data") or {}
+    geometry = data.get("geometry")
+    walls = data.get("walls")
+    if not geometry or not walls:
+        return message_dict
+    
+    vertices = geometry["vertices"]
+    triangles = geometry["triangles"]
+    grid_vertex_start = geometry["gridVertexStart"]
+    grid_triangle_start = geometry["gridTriangleStart"]
+    baseline_points = geometry["baselinePoints"]
+    wall_baseline_start = geometry["wallBaselineStart"]
+    
+    grid_index = 0
+    for wall_index, wall in enumerate(walls):
+        start, stop = wall_baseline_start[wall_index], wall_baseline_start[wall_index + 1]
+        if stop > start and wall.get("baseline") is not None:
+            wall["baseline"]["sampledPoints"] = baseline_points[start:stop]
+        for mesh_obj in wall.get("mesh") or []:
+            for grid in mesh_obj.get("grids") or []:
+                grid["vertices"] = vertices[grid_vertex_start[grid_index]:grid_vertex_start[grid_index + 1]]
+                grid["triangles"] = triangles[grid_triangle_start[grid_index]:grid_triangle_start[grid_index + 1]]
+                grid_index += 1
+    return message_dict
+
+
+def _extend_points(flat, points):
+    for p in points:
+        if isinstance(p, dict):
+            flat.extend((p.get('x', 0), p.get('y', 0), p.get('z', 0)))
+        else:
+            flat.extend(p[:3])
+
+
+def _extract_arrays(value, arrays):
+    """Replace arrays in a message tree with references, collecting raw data"""
+    if isinstance(value, dict):
+        return {k: _extract_arrays(v, arrays) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_extract_arrays(v, arrays) for v in value]
+    if np is not None and isinstance(value, np.ndarray):
+        dtype = value.dtype.newbyteorder('<')
+        data = np.ascontiguousarray(value, dtype=dtype)
+        arrays.append((data.tobytes(), dtype.str, list(data.shape)))
+        return {_ARRAY_REF: len(arrays) - 1}
+    if isinstance(value, array):
+        dtype = next((k for k, v in _TYPECODES.items() if v == value.typecode), None)
+        if dtype is None:
+            raise ValueError(f"Unsupported array typecode: {value.typecode}")
+        if sys.byteorder == 'big':
+            value = array(value.typecode, value)
+            value.byteswap()
+        arrays.append((value.tobytes(), dtype, [len(value)]))
+        return {_ARRAY_REF: len(arrays) - 1}
+    return value
+
+
+def _decode_binary(payload):
+    header_length = struct.unpack_from('>I', payload, 1)[0]
+    header_end = 5 + header_length
+    header = json_codec.loads(memoryview(payload)[5:header_end])
+    data_start = header_end + (-header_end % _ARRAY_ALIGNMENT)
+    view = memoryview(payload)
+    
+    arrays = []
+    for spec in header.get("arrays", []):
+        start = data_start + spec["offset"]
+        chunk = view[start:start + spec["nbytes"]]
+        arrays.append(_array_from_buffer(chunk, spec["dtype"], spec["shape"]))
+    return _restore_arrays(header.get("message"), arrays)
+
+
+def _array_from_buffer(chunk, dtype, shape):
+    if np is not None:
+        return np.frombuffer(chunk, dtype=dtype).reshape(shape)
+    
+    flat = array(_TYPECODES[dtype])
+    flat.frombytes(chunk)
+    if sys.byteorder == 'big':
+        flat.byteswap()
+    flat = flat.tolist()
+    # Nest the flat list according to shape (innermost dimension first)
+    for size in reversed(shape[1:]):
+        flat = [flat[i:i + size] for i in range(0, len(flat), size)]
+    return flat
+
 
+def _restore_arrays(value, arrays):
+    if isinstance(value, dict):
+        if len(value) == 1 and _ARRAY_REF in value:
+            return arrays[value[_ARRAY_REF]]
+        return {k: _restore_arrays(v, arrays) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_restore_arrays(v, arrays) for v in value]
+    return value
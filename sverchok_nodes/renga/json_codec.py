@@ -0,0 +1,230 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+JSON codec for protocol frames
+
+Uses the fastest available backend: orjson, then ujson, then the standard
+json module (always available). orjson/ujson are optional - Blender does not
+ship them, install into Blender's Python to use them.
+
+The cyclic garbage collector is left alone while decoding: disabling it
+is process-wide, and inside Blender other threads and Blender's own Python
+keep running meanwhile.
+
+The backend can be forced with the RENGA_JSON_CODEC environment variable
+(orjson / ujson / json) or set_codec(). stats() reports the backend and
+the time spent encoding and decoding, for diagnostics.
+"""
+
+import json
+import os
+import threading
+import time
+
+CODEC_ORJSON = "orjson"
+CODEC_UJSON = "ujson"
+CODEC_JSON = "json"
+
+# Порядок предпочтения
+CODEC_PREFERENCE = (CODEC_ORJSON, CODEC_UJSON, CODEC_JSON)
+
+
+def _default(value):
+    """
+    numpy arrays and scalars (and array.array) as lists and numbers, so
+    every backend encodes what orjson's OPT_SERIALIZE_NUMPY does
+    """
+    tolist = getattr(value, "tolist", None)
+    if tolist is not None:
+        return tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _json_backend():
+    def dumps(obj):
+        return json.dumps(obj, default=_default).encode('utf-8')
+
+    def loads(data):
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+    return dumps, loads
+
+
+def _orjson_backend():
+    import orjson
+
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        return orjson.dumps(obj, default=_default, option=options)
+
+    return dumps, orjson.loads
+
+
+def _ujson_backend():
+    import ujson
+
+    def dumps(obj):
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False,
+                           default=_default).encode('utf-8')
+
+    def loads(data):
+        if not isinstance(data, (bytes, str)):
+            data = bytes(data)
+        return ujson.loads(data)
+
+    return dumps, loads
+
+
+_BACKENDS = {
+    CODEC_ORJSON: _orjson_backend,
+    CODEC_UJSON: _ujson_backend,
+    CODEC_JSON: _json_backend,
+}
+
+
+class _Timing:
+    def __init__(self):
+        self.calls = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def as_dict(self):
+        return {"calls": self.calls, "bytes": self.bytes, "seconds": self.seconds}
+
+
+_lock = threading.Lock()
+_codec_name = None
+_dumps = None
+_loads = None
+_encode_timing = _Timing()
+_decode_timing = _Timing()
+
+
+def available_codecs():
+    """Names of backends that can be imported here, fastest first"""
+    names = []
+    for name in CODEC_PREFERENCE:
+        try:
+            _BACKENDS[name]()
+            names.append(name)
+        except ImportError:
+            pass
+    return names
+
+
+def set_codec(name=None):
+    """
+    Select the JSON backend
+
+    Args:
+        name: "orjson", "ujson", "json" or None - fastest available
+            (or the one named in RENGA_JSON_CODEC)
+
+    Returns:
+        str: name of the selected backend
+
+    Raises:
+        ValueError: unknown name; ImportError: backend not installed
+    """
+    global _codec_name, _dumps, _loads
+    if name is None:
+        name = os.environ.get("RENGA_JSON_CODEC") or None
+    if name is not None:
+        if name not in _BACKENDS:
+            raise ValueError(f"Unknown JSON codec: {name}")
+        candidates = (name,)
+    else:
+        candidates = CODEC_PREFERENCE
+
+    for candidate in candidates:
+        try:
+            dumps, loads = _BACKENDS[candidate]()
+        except ImportError:
+            if name is not None:
+                raise
+            continue
+        with _lock:
+            _codec_name, _dumps, _loads = candidate, dumps, loads
+        return candidate
+
+
+def get_codec():
+    """Name of the backend in use"""
+    if _codec_name is None:
+        _select_default()
+    return _codec_name
+
+
+def dumps(obj):
+    """Encode obj as UTF-8 JSON bytes"""
+    if _dumps is None:
+        _select_default()
+    start = time.perf_counter()
+    data = _dumps(obj)
+    elapsed = time.perf_counter() - start
+    with _lock:
+        _encode_timing.calls += 1
+        _encode_timing.bytes += len(data)
+        _encode_timing.seconds += elapsed
+    return data
+
+
+def loads(data):
+    """Decode JSON from bytes, bytearray, memoryview or str"""
+    if _loads is None:
+        _select_default()
+    start = time.perf_counter()
+    obj = _loads(data)
+    elapsed = time.perf_counter() - start
+    with _lock:
+        _decode_timing.calls += 1
+        _decode_timing.bytes += len(data)
+        _decode_timing.seconds += elapsed
+    return obj
+
+
+def stats():
+    """
+    Codec diagnostics
+
+    Returns:
+        dict: {"codec": name, "encode": {calls, bytes, seconds},
+               "decode": {calls, bytes, seconds}}
+    """
+    codec = get_codec()
+    with _lock:
+        return {"codec": codec, "encode": _encode_timing.as_dict(), "decode": _decode_timing.as_dict()}
+
+
+def reset_stats():
+    global _encode_timing, _decode_timing
+    with _lock:
+        _encode_timing = _Timing()
+        _decode_timing = _Timing()
+
+
+def _select_default():
+    try:
+        set_codec()
+    except (ImportError, ValueError):
+        # RENGA_JSON_CODEC names something unusable: fastest available instead
+        set_codec(available_codecs()[0])
@@ -0,0 +1,238 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+On-disk copy of a fetched wall model
+
+A model is stored as one uncompressed .npz file named after the project,
+the revision and the options it was fetched with:
+
+    <project hash>_<revision>_<options hash>.npz
+
+    meta                 UTF-8 JSON: format, project, revision, options and
+                         the wall dicts without meshes and sampled points
+    vertices, faces      meshes of all walls, faces index each wall's own
+                         vertices; wall_vertex_start / wall_face_start
+                         (W + 1) say where each wall starts
+    baseline_points      sampledPoints of all baselines, wall_baseline_start
+                         (W + 1) marks each wall's share
+    has_mesh, has_points which walls had a mesh / sampled points at all
+
+The files live next to the .blend (<name>_renga_cache) or, for an unsaved
+file, in the user cache directory. A directory is kept under
+MAX_CACHE_BYTES by deleting the least recently used files.
+"""
+
+import hashlib
+import os
+import sys
+
+import numpy as np
+
+# Добавить путь к папке для импорта модулей
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+if _current_dir not in sys.path:
+    sys.path.insert(0, _current_dir)
+
+import json_codec
+import walls_decoder
+
+FORMAT_VERSION = 1
+CACHE_SUFFIX = ".npz"
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def cache_dir(blend_path=None):
+    """Cache directory next to the .blend, or the user cache dir for an unsaved file"""
+    if blend_path:
+        name = os.path.splitext(os.path.basename(blend_path))[0]
+        return os.path.join(os.path.dirname(os.path.abspath(blend_path)), f"{name}_renga_cache")
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "renga_sverchok")
+
+
+def _short_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def options_key(options):
+    """Short hash of JSON-compatible options; tuples and lists hash alike"""
+    return _short_hash(json_codec.dumps(options).decode("utf-8"))
+
+
+def cache_name(project, revision, options=None):
+    """
+    File name of a model
+
+    Args:
+        project: project identity reported by the server (None - unknown)
+        revision: revision token of the model
+        options: JSON-compatible settings the cached data depends on
+    """
+    revision = "".join(c for c in str(revision) if c.isalnum())[:32]
+    return f"{_short_hash(project or '')}_{revision}_{options_key(options)}{CACHE_SUFFIX}"
+
+
+def find(name, directories):
+    """Path of the first existing file name in directories, or None"""
+    for directory in directories:
+        if directory:
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                return path
+    return None
+
+
+def _csr(arrays, width, dtype):
+    """Concatenate (N_i, width) arrays, None as empty; returns (data, starts)"""
+    counts = [len(a) if a is not None else 0 for a in arrays]
+    starts = np.zeros(len(arrays) + 1, dtype=np.int64)
+    np.cumsum(counts, out=starts[1:])
+    parts = [a for a in arrays if a is not None and len(a)]
+    data = np.concatenate(parts).astype(dtype, copy=False) if parts else np.empty((0, width), dtype=dtype)
+    return data.reshape(-1, width), starts
+
+
+def save(path, project, revision, options, walls, meshes):
+    """
+    Write a model; the file is replaced atomically
+
+    Args:
+        walls: wall dicts in server order, baseline sampledPoints as lists
+            or arrays
+        meshes: (vertices, faces) per wall, (None, None) when not fetched
+
+    Returns:
+        int: file size in bytes
+    """
+    stripped, points = [], []
+    for wall in walls:
+        baseline = wall.get("baseline")
+        sampled = baseline.get("sampledPoints") if baseline else None
+        if sampled is not None:
+            wall = dict(wall, baseline={k: v for k, v in baseline.items() if k != "sampledPoints"})
+            sampled = walls_decoder.points_array(sampled)
+        stripped.append(wall)
+        points.append(sampled)
+
+    vertices, wall_vertex_start = _csr([m[0] for m in meshes], 3, walls_decoder.VERTEX_DTYPE)
+    faces, wall_face_start = _csr([m[1] for m in meshes], 3, walls_decoder.INDEX_DTYPE)
+    baseline_points, wall_baseline_start = _csr(points, 3, walls_decoder.VERTEX_DTYPE)
+    meta = json_codec.dumps({
+        "format": FORMAT_VERSION,
+        "project": project,
+        "revision": revision,
+        "options": options,
+        "walls": stripped,
+    })
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        np.savez(f,
+                 meta=np.frombuffer(meta, dtype=np.uint8),
+                 vertices=vertices, faces=faces,
+                 wall_vertex_start=wall_vertex_start, wall_face_start=wall_face_start,
+                 baseline_points=baseline_points, wall_baseline_start=wall_baseline_start,
+                 has_mesh=np.array([m[0] is not None for m in meshes], dtype=bool),
+                 has_points=np.array([p is not None for p in points], dtype=bool))
+    os.replace(temp_path, path)
+    return os.path.getsize(path)
+
+
+def load(path):
+    """
+    Read a model written by save()
+
+    Returns:
+        tuple: (meta, walls, meshes) - meta without "walls"; walls get their
+            sampledPoints back as (N, 3) arrays, meshes are (vertices,
+            faces) views into the file's arrays, (None, None) if not saved
+
+    Raises:
+        ValueError: not a model file of this format version
+    """
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+    meta = json_codec.loads(arrays["meta"].tobytes())
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model cache format: {meta.get('format')}")
+    walls = meta.pop("walls")
+
+    vertices, faces = arrays["vertices"], arrays["faces"]
+    vertex_start = arrays["wall_vertex_start"].tolist()
+    face_start = arrays["wall_face_start"].tolist()
+    points, point_start = arrays["baseline_points"], arrays["wall_baseline_start"].tolist()
+    has_mesh, has_points = arrays["has_mesh"].tolist(), arrays["has_points"].tolist()
+    meshes = []
+    for i, wall in enumerate(walls):
+        if has_points[i]:
+            wall["baseline"]["sampledPoints"] = points[point_start[i]:point_start[i + 1]]
+        if has_mesh[i]:
+            meshes.append((vertices[vertex_start[i]:vertex_start[i + 1]],
+                           faces[face_start[i]:face_start[i + 1]]))
+        else:
+            meshes.append((None, None))
+    return meta, walls, meshes
+
+
+def touch(path):
+    """Mark a file as recently used"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def evict(directory, max_bytes=MAX_CACHE_BYTES, keep=()):
+    """
+    Delete the least recently used model files until the directory fits in
+    max_bytes; files in keep are never deleted
+
+    Returns:
+        list: deleted paths
+    """
+    try:
+        names = [n for n in os.listdir(directory) if n.endswith(CACHE_SUFFIX)]
+    except OSError:
+        return []
+    keep = {os.path.abspath(p) for p in keep}
+    files = []
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in files)
+    deleted = []
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if os.path.abspath(path) in keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        deleted.append(path)
+    return deleted
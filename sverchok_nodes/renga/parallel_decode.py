@@ -0,0 +1,224 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Decoding of get_walls frames in a process pool
+
+Parsing a JSON frame and flattening its meshes is pure Python and holds
+the GIL, so a large model decodes on one core. Here every frame of a
+streamed reply is a shard: its raw payload goes to a worker process,
+which parses it and builds the frame's meshes with a MeshBuilder.
+
+Shipping decoded walls back by pickling would cost as much as decoding
+them, so the mesh arrays come back through a shared memory block the
+parent allocates for the frame (SHARED_BLOCK_RATIO times the payload;
+arrays that don't fit are pickled instead). Only the walls without their
+meshes are pickled.
+
+    submit = frame_submitter(workers=4)
+    for batch in client.iter_wall_batches(message, submit):
+        vertices, faces, wall_vertex_start, wall_face_start = batch[MESH_ARRAYS]
+
+The pool uses the "spawn" start method (forking a threaded Blender is
+unsafe) and is kept between requests; shutdown() stops it.
+"""
+
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Добавить путь к папке для импорта модулей
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+if _current_dir not in sys.path:
+    sys.path.insert(0, _current_dir)
+
+import connection_protocol
+import walls_decoder
+
+# Key of the (vertices, faces, wall_vertex_start, wall_face_start) block
+# a decoded batch carries instead of per-wall meshes
+MESH_ARRAYS = "meshArrays"
+
+# Shared block size per payload byte: a JSON vertex takes at least 19
+# bytes for 24 bytes of float64, a triangle 7 bytes for 12 bytes of int32
+SHARED_BLOCK_RATIO = 2
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers):
+    """Shared process pool with `workers` processes, (re)created on demand"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown():
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+
+
+def default_workers():
+    """One worker per core, leaving one for Blender"""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def frame_submitter(workers=None, want_meshes=True, max_frame_size=None):
+    """
+    submit(payload) for RengaConnectionClient.send_stream / iter_wall_batches;
+    submit.max_pending bounds the frames read ahead (2 per worker)
+
+    Args:
+        workers: pool size, None - default_workers()
+        want_meshes: False - meshes are dropped in the worker
+        max_frame_size: largest inflated compressed frame (default:
+            connection_protocol.MAX_MESSAGE_SIZE)
+    """
+    workers = workers or default_workers()
+    pool = get_pool(workers)
+
+    def submit(payload):
+        return DecodeJob(pool, payload, want_meshes, max_frame_size)
+
+    # Every frame waiting for a worker holds a shared block of twice its
+    # size: read ahead only enough to keep the workers busy
+    submit.max_pending = 2 * workers
+    return submit
+
+
+class DecodeJob:
+    """One frame being decoded in the pool, with its shared block"""
+
+    def __init__(self, pool, payload, want_meshes=True, max_frame_size=None):
+        # Compressed frames are inflated here: the block is sized by the
+        # real payload, and zlib releases the GIL anyway
+        if payload and payload[0] & connection_protocol.FRAME_TAGGED and \
+                payload[0] & connection_protocol.FLAG_COMPRESSED:
+            payload = bytes((payload[0] & ~connection_protocol.FLAG_COMPRESSED,)) + \
+                connection_protocol.decompress_body(memoryview(payload)[1:], max_frame_size)
+        self._block = None
+        block_name = None
+        if want_meshes:
+            self._block = shared_memory.SharedMemory(create=True, size=max(1, SHARED_BLOCK_RATIO * len(payload)))
+            block_name = self._block.name
+        self._future = pool.submit(decode_frame, payload, block_name, want_meshes)
+
+    def done(self):
+        return self._future.done()
+
+    def result(self):
+        """Decoded response; data[MESH_ARRAYS] holds the frame's mesh arrays"""
+        try:
+            response = self._future.result()
+            data = response.get("data") or {}
+            arrays = data.get(MESH_ARRAYS)
+            if arrays is not None and arrays[0] == "shared":
+                data[MESH_ARRAYS] = tuple(
+                    np.ndarray(shape, dtype=np.dtype(dtype), buffer=self._block.buf, offset=offset).copy()
+                    for shape, dtype, offset in arrays[1])
+            elif arrays is not None:
+                data[MESH_ARRAYS] = arrays[1]
+            return response
+        finally:
+            self._release()
+
+    def close(self):
+        """Result not wanted: free the block once the worker is done with it"""
+        if not self._future.cancel():
+            self._future.add_done_callback(lambda _: self._release())
+        else:
+            self._release()
+
+    def _release(self):
+        block, self._block = self._block, None
+        if block is not None:
+            block.close()
+            block.unlink()
+
+
+def _attach(name):
+    """Open the parent's block; the parent unlinks it"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers the block again on attach; spawned workers
+        # share the parent's resource tracker, so the parent's unlink clears it
+        return shared_memory.SharedMemory(name=name)
+
+
+def _store(block_name, arrays):
+    """Copy arrays into the shared block; ("inline", arrays) if they don't fit"""
+    arrays = [np.ascontiguousarray(a) for a in arrays]
+    block = _attach(block_name)
+    try:
+        if sum(a.nbytes for a in arrays) > block.size:
+            return ("inline", tuple(arrays))
+        specs = []
+        offset = 0
+        for a in arrays:
+            np.ndarray(a.shape, dtype=a.dtype, buffer=block.buf, offset=offset)[...] = a
+            specs.append((a.shape, a.dtype.str, offset))
+            offset += a.nbytes
+        return ("shared", specs)
+    finally:
+        block.close()
+
+
+def decode_frame(payload, block_name=None, want_meshes=True):
+    """
+    Worker: decode one frame and build the meshes of its walls
+
+    Returns:
+        dict: the response; walls lose "mesh" (and the frame its
+            "geometry"), data[MESH_ARRAYS] is ("shared", [(shape, dtype,
+            offset)]) or ("inline", arrays) when the frame had walls
+    """
+    response = connection_protocol.decode_message(payload)
+    data = response.get("data")
+    if not isinstance(data, dict):
+        return response
+    walls = data.get("walls") or []
+    geometry = data.pop("geometry", None)
+    if walls and want_meshes:
+        builder = walls_decoder.MeshBuilder()
+        if geometry is not None:
+            builder.add_packed(geometry, walls)
+        else:
+            for wall in walls:
+                builder.add_wall(wall)
+        vertices, faces = builder.build()
+        data[MESH_ARRAYS] = _store(block_name, (vertices, faces) + builder.wall_offsets())
+    if walls:
+        data["walls"] = [{k: v for k, v in wall.items() if k != "mesh"} for wall in walls]
+    return response
@@ -0,0 +1,184 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Spatial hash of points with ids, for point identity within a tolerance
+
+Two points are the same when they differ by less than the tolerance on
+every axis (as CreateColumnsCommand.GetPointGuid compares them). Points are
+bucketed by their coordinates quantized to cells of the tolerance size, so
+a match can only be in the point's own cell or one of its 26 neighbours.
+When several stored points match, the one added first wins, as with the
+linear scan this replaces.
+
+    index = PointIndex(0.001)
+    guid = index.find((x, y, z))               # None if unknown
+    index.add((x, y, z), guid)
+    guids = index.find_many(points_array)      # (N, 3) -> list, None if unknown
+"""
+
+import math
+from itertools import product
+
+import numpy as np
+
+# Mixing constants of the vectorized cell hash (collisions only add candidates)
+_HASH_X = np.int64(73856093)
+_HASH_Y = np.int64(19349663)
+_HASH_Z = np.int64(83492791)
+
+
+class PointIndex:
+    """
+    Points with ids in a uniform grid of tolerance-sized cells
+
+    Args:
+        tolerance: default match distance per axis, also the cell size
+    """
+
+    def __init__(self, tolerance=0.001):
+        self.tolerance = float(tolerance)
+        self._cells = {}  # (ix, iy, iz) -> entry numbers
+        self._points = []
+        self._ids = []
+        self._id_entries = {}  # id -> entry number
+        self._arrays = None  # (points, cell keys sorted, entry order) for find_many
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, point_id):
+        return point_id in self._id_entries
+
+    def clear(self):
+        self._cells.clear()
+        self._points = []
+        self._ids = []
+        self._id_entries = {}
+        self._arrays = None
+
+    def _cell(self, point):
+        size = self.tolerance
+        return (math.floor(point[0] / size), math.floor(point[1] / size), math.floor(point[2] / size))
+
+    def _reach(self, tolerance):
+        """Cells to look at on each side for a match distance"""
+        return max(1, math.ceil(tolerance / self.tolerance))
+
+    def add(self, point, point_id):
+        """Store a point; a point id can be stored once (later adds replace its point)"""
+        if point_id in self._id_entries:
+            self.remove(point_id)
+        point = (float(point[0]), float(point[1]), float(point[2]))
+        entry = len(self._points)
+        self._points.append(point)
+        self._ids.append(point_id)
+        self._id_entries[point_id] = entry
+        self._cells.setdefault(self._cell(point), []).append(entry)
+        self._arrays = None
+
+    def remove(self, point_id):
+        """Forget a point id; returns False if it was not stored"""
+        entry = self._id_entries.pop(point_id, None)
+        if entry is None:
+            return False
+        cell = self._cell(self._points[entry])
+        entries = self._cells.get(cell)
+        if entries is not None:
+            entries.remove(entry)
+            if not entries:
+                del self._cells[cell]
+        # The slot stays (entry numbers keep the insertion order), without an id
+        self._ids[entry] = None
+        self._arrays = None
+        return True
+
+    def point(self, point_id):
+        """Stored point of an id, or None"""
+        entry = self._id_entries.get(point_id)
+        return self._points[entry] if entry is not None else None
+
+    def items(self):
+        """(point, id) pairs in insertion order"""
+        return [(p, i) for p, i in zip(self._points, self._ids) if i is not None]
+
+    def find(self, point, tolerance=None):
+        """Id of the first stored point within tolerance of point, or None"""
+        tolerance = self.tolerance if tolerance is None else tolerance
+        reach = self._reach(tolerance)
+        x, y, z = float(point[0]), float(point[1]), float(point[2])
+        cx, cy, cz = self._cell((x, y, z))
+        best = None
+        for dx, dy, dz in product(range(-reach, reach + 1), repeat=3):
+            for entry in self._cells.get((cx + dx, cy + dy, cz + dz), ()):
+                if best is not None and entry > best:
+                    continue
+                px, py, pz = self._points[entry]
+                if abs(px - x) < tolerance and abs(py - y) < tolerance and abs(pz - z) < tolerance:
+                    best = entry
+        return self._ids[best] if best is not None else None
+
+    def find_many(self, points, tolerance=None):
+        """
+        Ids of many points at once
+
+        Args:
+            points: (N, 3) array-like
+
+        Returns:
+            list: id of the first stored point within tolerance, None if none
+        """
+        tolerance = self.tolerance if tolerance is None else tolerance
+        queries = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        found = np.full(len(queries), len(self._points), dtype=np.int64)
+        if len(queries) and self._id_entries:
+            stored, keys, order = self._sorted_arrays()
+            cells = np.floor(queries / self.tolerance).astype(np.int64)
+            reach = self._reach(tolerance)
+            query_numbers = np.arange(len(queries))
+            for offset in product(range(-reach, reach + 1), repeat=3):
+                query_keys = _cell_keys(cells + np.asarray(offset, dtype=np.int64))
+                lo = np.searchsorted(keys, query_keys, side='left')
+                hi = np.searchsorted(keys, query_keys, side='right')
+                counts = hi - lo
+                if not counts.any():
+                    continue
+                # Every (query, candidate) pair of this neighbour cell
+                pair_query = np.repeat(query_numbers, counts)
+                pair_slot = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+                pair_entry = order[pair_slot]
+                close = np.all(np.abs(stored[pair_entry] - queries[pair_query]) < tolerance, axis=1)
+                np.minimum.at(found, pair_query[close], pair_entry[close])
+        ids = self._ids
+        return [ids[entry] if entry < len(ids) else None for entry in found.tolist()]
+
+    def _sorted_arrays(self):
+        """Stored points, their cell keys sorted and the entry of every key"""
+        if self._arrays is None:
+            entries = np.fromiter(sorted(self._id_entries.values()), dtype=np.int64, count=len(self._id_entries))
+            stored = np.asarray(self._points, dtype=np.float64).reshape(-1, 3)
+            keys = _cell_keys(np.floor(stored[entries] / self.tolerance).astype(np.int64))
+            sort = np.argsort(keys, kind='stable')
+            self._arrays = (stored, keys[sort], entries[sort])
+        return self._arrays
+
+
+def _cell_keys(cells):
+    """int64 hash of (N, 3) cell coordinates; wraps on overflow"""
+    with np.errstate(over='ignore'):
+        return (cells[:, 0] * _HASH_X) ^ (cells[:, 1] * _HASH_Y) ^ (cells[:, 2] * _HASH_Z)
@@ -0,0 +1,579 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Reference TCP server speaking the Renga plugin protocol
+Stand-in for the C# plugin, for testing and benchmarks without Renga
+
+Serves get_walls and update_points from an in-memory model of synthetic
+walls. get_walls with data.delta=true answers with a revision token and
+only the walls changed since data.since (see ReferenceModel.get_walls_delta).
+Run standalone:
+    python reference_server.py --port 50100 --walls 1000
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import socket
+import socketserver
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+# Добавить путь к папке для импорта connection_protocol
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+if _current_dir not in sys.path:
+    sys.path.insert(0, _current_dir)
+
+import connection_protocol
+
+
+DEFAULT_BATCH_SIZE = 256
+
+# Revisions a client can refer to in data.since; older tokens get a full reply
+MAX_REVISIONS = 8
+
+
+def _timestamp():
+    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _point(x, y, z):
+    return {"x": x, "y": y, "z": z}
+
+
+def _box_grids(p0, p1, thickness, height):
+    """Six quad faces (two triangles each) of a wall segment from p0 to p1"""
+    dx, dy = p1[0] - p0[0], p1[1] - p0[1]
+    length = math.hypot(dx, dy) or 1.0
+    nx, ny = -dy / length * thickness / 2, dx / length * thickness / 2
+    z0, z1 = p0[2], p0[2] + height
+    corners = [
+        (p0[0] + nx, p0[1] + ny), (p1[0] + nx, p1[1] + ny),
+        (p1[0] - nx, p1[1] - ny), (p0[0] - nx, p0[1] - ny),
+    ]
+    bottom = [(x, y, z0) for x, y in corners]
+    top = [(x, y, z1) for x, y in corners]
+    faces = [
+        ("FrontSide", [bottom[0], bottom[1], top[1], top[0]]),
+        ("BackSide", [bottom[2], bottom[3], top[3], top[2]]),
+        ("Bottom", [bottom[3], bottom[2], bottom[1], bottom[0]]),
+        ("Top", [top[0], top[1], top[2], top[3]]),
+        ("StartSide", [bottom[3], bottom[0], top[0], top[3]]),
+        ("EndSide", [bottom[1], bottom[2], top[2], top[1]]),
+    ]
+    return [
+        {
+            "gridType": grid_type,
+            "vertices": [_point(*v) for v in quad],
+            "triangles": [[0, 1, 2], [0, 2, 3]],
+        }
+        for grid_type, quad in faces
+    ]
+
+
+def make_wall(wall_id, start, end, height=3000.0, thickness=200.0, arc_bulge=None, arc_samples=16,
+              level_id=1):
+    """
+    Build one wall in the get_walls response format of the C# plugin
+
+    Args:
+        start, end: (x, y, z) baseline end points
+        arc_bulge: sagitta of an arc baseline, None for a straight wall
+        level_id: id of the wall's level
+    """
+    if arc_bulge:
+        mx, my = (start[0] + end[0]) / 2, (start[1] + end[1]) / 2
+        half = math.hypot(end[0] - start[0], end[1] - start[1]) / 2
+        radius = (half * half + arc_bulge * arc_bulge) / (2 * arc_bulge)
+        ux, uy = (end[0] - start[0]) / (2 * half), (end[1] - start[1]) / (2 * half)
+        cx, cy = mx + uy * (radius - arc_bulge), my - ux * (radius - arc_bulge)
+        a0 = math.atan2(start[1] - cy, start[0] - cx)
+        a1 = math.atan2(end[1] - cy, end[0] - cx)
+        if a1 < a0:
+            a1 += 2 * math.pi
+        points = []
+        for i in range(arc_samples + 1):
+            a = a0 + (a1 - a0) * i / arc_samples
+            points.append((cx + radius * math.cos(a), cy + radius * math.sin(a), start[2]))
+        baseline = {
+            "type": "Curve2DType_Arc",
+            "center": _point(cx, cy, start[2]),
+            "radius": radius,
+            "arc": {
+                "center": _point(cx, cy, start[2]),
+                "radius": radius,
+                "startAngle": a0,
+                "endAngle": a1,
+                "clockwise": False,
+            },
+        }
+    else:
+        points = [tuple(start), tuple(end)]
+        baseline = {"type": "Curve2DType_LineSegment"}
+
+    baseline["startPoint"] = _point(*points[0])
+    baseline["endPoint"] = _point(*points[-1])
+    baseline["sampledPoints"] = [_point(*p) for p in points]
+
+    grids = []
+    for p0, p1 in zip(points[:-1], points[1:]):
+        grids.extend(_box_grids(p0, p1, thickness, height))
+    corners = [(v["x"], v["y"], v["z"]) for grid in grids for v in grid["vertices"]]
+    lower = [min(c[i] for c in corners) for i in range(3)]
+    upper = [max(c[i] for c in corners) for i in range(3)]
+
+    return {
+        "id": wall_id,
+        "name": f"Wall {wall_id}",
+        "position": _point(*start),
+        "levelId": level_id,
+        "height": height,
+        "thickness": thickness,
+        "bbox": {"min": _point(*lower), "max": _point(*upper)},
+        "baseline": baseline,
+        "mesh": [{"meshType": "Wall", "grids": grids}],
+    }
+
+
+def _is_analytic(baseline):
+    segments = baseline.get("segments")
+    if segments:
+        return all(s.get("arc") or s.get("type", "").endswith("LineSegment") for s in segments)
+    return bool(baseline.get("arc")) or baseline.get("type", "").endswith("LineSegment")
+
+
+def analytic_walls(walls):
+    """Walls for data.analyticCurves: sampled points dropped where lines/arcs describe the baseline"""
+    result = []
+    for wall in walls:
+        baseline = wall.get("baseline")
+        if baseline and "sampledPoints" in baseline and _is_analytic(baseline):
+            baseline = {k: v for k, v in baseline.items() if k != "sampledPoints"}
+            wall = dict(wall, baseline=baseline)
+        result.append(wall)
+    return result
+
+
+def filter_walls(walls, bbox=None, level_id=None):
+    """Walls touching data.bbox ({"min", "max"} points) and on level data.levelId"""
+    if bbox is None and level_id is None:
+        return walls
+    result = []
+    for wall in walls:
+        if level_id is not None and wall.get("levelId") != level_id:
+            continue
+        if bbox is not None:
+            bounds = wall.get("bbox")
+            if bounds is None or any(
+                    bounds["min"][axis] > bbox["max"][axis] or bounds["max"][axis] < bbox["min"][axis]
+                    for axis in ("x", "y", "z")):
+                continue
+        result.append(wall)
+    return result
+
+
+def project_walls(walls, fields=None, baseline_samples=None):
+    """
+    Walls with only the requested fields (data.fields, data.baselineSamples)
+
+    Arc baselines are resampled to baseline_samples segments.
+    """
+    if fields is None and not baseline_samples:
+        return walls
+    keep = None if fields is None else set(fields) | {"id", "hash"}
+    result = []
+    for wall in walls:
+        if keep is not None:
+            wall = {k: v for k, v in wall.items() if k in keep}
+        baseline = wall.get("baseline")
+        if baseline_samples and baseline and baseline.get("arc") and "sampledPoints" in baseline:
+            wall = dict(wall, baseline=dict(baseline, sampledPoints=_arc_points(baseline["arc"], baseline_samples)))
+        result.append(wall)
+    return result
+
+
+def _arc_points(arc, samples):
+    center = arc["center"]
+    a0, a1 = arc["startAngle"], arc["endAngle"]
+    return [
+        _point(center["x"] + arc["radius"] * math.cos(a0 + (a1 - a0) * i / samples),
+               center["y"] + arc["radius"] * math.sin(a0 + (a1 - a0) * i / samples),
+               center["z"])
+        for i in range(samples + 1)
+    ]
+
+
+def wall_hash(wall):
+    """Content hash of a wall (all fields but "hash")"""
+    content = {k: v for k, v in wall.items() if k != "hash"}
+    text = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def model_revision(hashes):
+    """Revision token of a model state: hash over (id, wall hash) pairs"""
+    digest = hashlib.sha1()
+    for wall_id in sorted(hashes):
+        digest.update(f"{wall_id}:{hashes[wall_id]};".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def make_synthetic_walls(count, arc_every=5, spacing=5000.0, seed_id=1, levels=1):
+    """
+    Generate a grid of walls; every arc_every-th wall has an arc baseline,
+    rows of walls go to levels 1..levels in turn
+
+    Returns:
+        list: wall dicts in the get_walls response format
+    """
+    walls = []
+    per_row = max(1, int(math.sqrt(count)))
+    for i in range(count):
+        x = (i % per_row) * spacing
+        y = (i // per_row) * spacing
+        arc = arc_every and i % arc_every == arc_every - 1
+        walls.append(make_wall(
+            seed_id + i, (x, y, 0.0), (x + spacing * 0.8, y, 0.0),
+            height=3000.0, thickness=200.0,
+            arc_bulge=spacing * 0.2 if arc else None,
+            level_id=1 + (i // per_row) % levels))
+    return walls
+
+
+class ReferenceModel:
+    """
+    In-memory stand-in for a Renga project
+    """
+
+    def __init__(self, walls=None, project="reference"):
+        self._lock = threading.Lock()
+        self.project = project
+        self.walls = list(walls) if walls is not None else []
+        self.columns = {}  # column id -> point dict
+        self._guid_to_column = {}
+        self._next_column_id = 1000000
+        self._hashes = {}  # wall id -> content hash, filled lazily
+        self._revisions = OrderedDict()  # revision -> {wall id: hash}
+
+    def get_walls(self, data):
+        with self._lock:
+            walls = list(self.walls)
+        return filter_walls(walls, data.get("bbox"), data.get("levelId"))
+
+    def set_wall(self, wall):
+        """Add a wall or replace the wall with the same id"""
+        with self._lock:
+            self._hashes.pop(wall["id"], None)
+            for i, existing in enumerate(self.walls):
+                if existing["id"] == wall["id"]:
+                    self.walls[i] = wall
+                    return
+            self.walls.append(wall)
+
+    def remove_wall(self, wall_id):
+        with self._lock:
+            self._hashes.pop(wall_id, None)
+            self.walls = [w for w in self.walls if w["id"] != wall_id]
+
+    def get_walls_delta(self, since=None, bbox=None, level_id=None):
+        """
+        Walls added or changed since revision `since`
+
+        With bbox/level_id the revision covers only the walls that pass the
+        filter (see filter_walls).
+
+        Returns:
+            dict: revision - token of the current state
+                  full - True when since is unknown: walls holds every wall
+                  walls - added and changed walls, each with its "hash"
+                  added, changed, removed - wall ids
+                  project - identity of the project
+        """
+        with self._lock:
+            walls = filter_walls(list(self.walls), bbox, level_id)
+            hashes = {}
+            for wall in walls:
+                wall_id = wall["id"]
+                if wall_id not in self._hashes:
+                    self._hashes[wall_id] = wall_hash(wall)
+                hashes[wall_id] = self._hashes[wall_id]
+            revision = model_revision(hashes)
+            self._revisions[revision] = hashes
+            self._revisions.move_to_end(revision)
+            while len(self._revisions) > MAX_REVISIONS:
+                self._revisions.popitem(last=False)
+            previous = self._revisions.get(since) if since else None
+
+        if previous is None:
+            return {
+                "revision": revision, "full": True,
+                "walls": [dict(wall, hash=hashes[wall["id"]]) for wall in walls],
+                "added": [wall["id"] for wall in walls], "changed": [], "removed": [],
+                "project": self.project,
+            }
+        added, changed, delta_walls = [], [], []
+        for wall in walls:
+            wall_id = wall["id"]
+            old_hash = previous.get(wall_id)
+            if old_hash == hashes[wall_id]:
+                continue
+            (added if old_hash is None else changed).append(wall_id)
+            delta_walls.append(dict(wall, hash=hashes[wall_id]))
+        removed = [wall_id for wall_id in previous if wall_id not in hashes]
+        return {"revision": revision, "full": False, "walls": delta_walls,
+                "added": added, "changed": changed, "removed": removed, "project": self.project}
+
+    def update_points(self, points):
+        """Create or move columns, same result format as CreateColumnsHandler"""
+        results = []
+        with self._lock:
+            for point in points:
+                guid = point.get("grasshopperGuid")
+                if not guid:
+                    results.append({"success": False, "message": "Missing grasshopperGuid",
+                                    "columnId": None, "grasshopperGuid": None})
+                    continue
+                column_id = self._guid_to_column.get(guid)
+                if column_id is None and point.get("rengaColumnGuid"):
+                    try:
+                        candidate = int(point["rengaColumnGuid"])
+                    except (TypeError, ValueError):
+                        candidate = None
+                    if candidate in self.columns:
+                        column_id = candidate
+                        # The column changes owner (a moved point)
+                        for other in [g for g, c in self._guid_to_column.items() if c == candidate]:
+                            del self._guid_to_column[other]
+                if column_id is not None and column_id in self.columns:
+                    message = "Column updated"
+                else:
+                    column_id = self._next_column_id
+                    self._next_column_id += 1
+                    message = "Column created"
+                self._guid_to_column[guid] = column_id
+                self.columns[column_id] = {
+                    "x": point.get("x", 0.0), "y": point.get("y", 0.0), "z": point.get("z", 0.0),
+                    "height": point.get("height", 3000.0),
+                }
+                results.append({"success": True, "message": message,
+                                "columnId": str(column_id), "grasshopperGuid": guid})
+        return results
+
+    def delete_points(self, deletions):
+        """Delete the columns of points (data.delete), same result format as update_points"""
+        results = []
+        with self._lock:
+            for item in deletions:
+                guid = item.get("grasshopperGuid")
+                column_id = self._guid_to_column.pop(guid, None) if guid else None
+                if column_id is None and item.get("rengaColumnGuid"):
+                    try:
+                        column_id = int(item["rengaColumnGuid"])
+                    except (TypeError, ValueError):
+                        column_id = None
+                if column_id is not None and self.columns.pop(column_id, None) is not None:
+                    message = "Column deleted"
+                else:
+                    # Already gone (e.g. deleted in Renga): nothing left to do
+                    message = "Column not found"
+                results.append({"success": True, "message": message,
+                                "columnId": str(column_id) if column_id is not None else None,
+                                "grasshopperGuid": guid})
+        return results
+
+
+class RengaReferenceServer:
+    """
+    Threaded TCP server for the Renga plugin protocol
+
+    Connections are kept alive; every message is answered in order. Replies
+    use binary frames (when numpy is available) and zlib compression when
+    the request accepts them, and get_walls with data.stream=true is
+    answered as a sequence of batches followed by a final frame.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, model=None,
+                 compress_level=connection_protocol.COMPRESS_LEVEL,
+                 compress_threshold=connection_protocol.COMPRESS_THRESHOLD):
+        self.model = model if model is not None else ReferenceModel()
+        self.compress_level = compress_level
+        self.compress_threshold = compress_threshold
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        reference = self
+
+        class _Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                reference._serve_connection(self.request)
+
+        class _Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self._server = _Server((host, port), _Handler)
+        self.host, self.port = self._server.server_address[:2]
+
+    def start(self):
+        """Serve in a background thread; returns self"""
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name=f"renga-reference-{self.port}", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            connections = list(self._connections)
+        for sock in connections:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _serve_connection(self, sock):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._lock:
+            self._connections.add(sock)
+        try:
+            while True:
+                try:
+                    message = connection_protocol.receive_message(sock, timeout=None)
+                except (ConnectionError, OSError, ValueError):
+                    return
+                accept = message.get("accept") or []
+                binary = connection_protocol.np is not None and connection_protocol.ENCODING_BINARY in accept
+                compress_level = self.compress_level if connection_protocol.ENCODING_ZLIB in accept else None
+                for response in self.handle_message(message):
+                    if binary and (response.get("data") or {}).get("walls"):
+                        connection_protocol.send_message(
+                            sock, connection_protocol.pack_geometry(response), True,
+                            compress_level, self.compress_threshold)
+                    else:
+                        connection_protocol.send_message(
+                            sock, response, False, compress_level, self.compress_threshold)
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._connections.discard(sock)
+
+    def handle_message(self, message):
+        """
+        Answer one request
+
+        Returns:
+            list: response dicts to send, in order
+        """
+        message_id = message.get("id", "")
+        command = message.get("command")
+        data = message.get("data") or {}
+        try:
+            if command == "hello":
+                accept = [connection_protocol.ENCODING_ZLIB, connection_protocol.ENCODING_BINARY]
+                return [self._response(message_id, True, {"accept": accept, "stream": True, "delta": True, "analyticCurves": True,
+                                                            "project": self.model.project})]
+            if command == "get_walls":
+                return self._get_walls(message_id, data)
+            if command == "update_points":
+                points = data.get("points") or []
+                deletions = data.get("delete") or []
+                if not points and not deletions:
+                    return [self._response(message_id, False, error="No points provided")]
+                result = {"results": self.model.update_points(points)}
+                if deletions:
+                    result["deleted"] = self.model.delete_points(deletions)
+                return [self._response(message_id, True, result)]
+            return [self._response(message_id, False, error=f"Unknown command: {command}")]
+        except Exception as e:
+            return [self._response(message_id, False, error=f"Error handling command: {e}")]
+
+    def _get_walls(self, message_id, data):
+        meta = {}
+        if data.get("delta"):
+            meta = self.model.get_walls_delta(data.get("since"), data.get("bbox"), data.get("levelId"))
+            walls = meta.pop("walls")
+        else:
+            walls = self.model.get_walls(data)
+        walls = project_walls(walls, data.get("fields"), data.get("baselineSamples"))
+        if data.get("analyticCurves"):
+            walls = analytic_walls(walls)
+        if not data.get("stream"):
+            return [self._response(message_id, True, dict(meta, walls=walls))]
+
+        batch_size = max(1, int(data.get("batchSize") or DEFAULT_BATCH_SIZE))
+        responses = []
+        for seq, start in enumerate(range(0, len(walls), batch_size)):
+            response = self._response(message_id, True, {"walls": walls[start:start + batch_size]})
+            response["stream"] = {"seq": seq, "final": False}
+            responses.append(response)
+        # Delta fields (revision, removed ids...) travel in the final frame
+        final = self._response(message_id, True, dict(meta, walls=[], count=len(walls)))
+        final["stream"] = {"seq": len(responses), "final": True}
+        responses.append(final)
+        return responses
+
+    @staticmethod
+    def _response(message_id, success, data=None, error=None):
+        return {
+            "id": message_id,
+            "success": success,
+            "data": data,
+            "error": error,
+            "timestamp": _timestamp(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Renga protocol reference server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=50100)
+    parser.add_argument("--walls", type=int, default=100, help="number of synthetic walls")
+    parser.add_argument("--arc-every", type=int, default=5, help="every N-th wall is an arc (0 - none)")
+    args = parser.parse_args()
+
+    model = ReferenceModel(make_synthetic_walls(args.walls, arc_every=args.arc_every))
+    server = RengaReferenceServer(args.host, args.port, model)
+    print(f"Renga reference server on {server.host}:{server.port} with {len(model.walls)} walls")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+asyncio client for communicating with Renga plugin
+Same length-prefixed protocol as RengaConnectionClient, on asyncio streams
+
+Any number of requests can be in flight on one connection; responses are
+matched to their request by message id. Example:
+
+    async with AsyncRengaClient(port=50100) as client:
+        walls, columns = await asyncio.gather(
+            client.get_walls(),
+            client.update_points([(0, 0, 0)], [3000.0]))
+"""
+
+import asyncio
+import os
+import struct
+import sys
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+# Добавить путь к папке для импорта модулей
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+if _current_dir not in sys.path:
+    sys.path.insert(0, _current_dir)
+
+import connection_protocol
+import commands
+
+
+class AsyncRengaClient:
+    """
+    asyncio TCP client for Renga plugin communication
+
+    request() raises on transport problems (ConnectionError,
+    asyncio.TimeoutError, cancellation); error replies from Renga are
+    returned as response dicts with success=False, as in the blocking client.
+    """
+
+    def __init__(self, host="127.0.0.1", port=50100, timeout=10.0, accept_binary=True,
+                 max_frame_size=None, compress_level=connection_protocol.COMPRESS_LEVEL,
+                 compress_threshold=connection_protocol.COMPRESS_THRESHOLD):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.accept_binary = accept_binary
+        self.max_frame_size = max_frame_size or connection_protocol.MAX_MESSAGE_SIZE
+        self.compress_level = compress_level
+        self.compress_threshold = compress_threshold
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+        self._connect_lock = None
+        self._pending = OrderedDict()  # message id -> Future or Queue (streams)
+        self._peer_features = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @property
+    def connected(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self):
+        """Open the connection (done lazily by request() as well)"""
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.connected:
+                return
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout)
+            self._reader_task = asyncio.ensure_future(self._read_loop(self._reader))
+
+    async def close(self):
+        writer, task = self._writer, self._reader_task
+        self._writer = self._reader = self._reader_task = None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._fail_pending(ConnectionError("Client closed"))
+
+    async def request(self, message, timeout=None):
+        """
+        Send a message and wait for its response
+
+        Args:
+            message: Message dictionary
+            timeout: seconds to wait (default: self.timeout, None in both - forever)
+
+        Returns:
+            dict: response
+        """
+        message = self._prepare(message)
+        future = asyncio.get_running_loop().create_future()
+        message_id = message.get("id", "")
+        self._pending[message_id] = future
+        try:
+            await self._send(message)
+            return await asyncio.wait_for(future, timeout if timeout is not None else self.timeout)
+        finally:
+            # Cancelled or timed out: a late response is dropped by the reader
+            if self._pending.get(message_id) is future:
+                del self._pending[message_id]
+
+    async def request_stream(self, message, timeout=None):
+        """
+        Send a request and yield response frames of a streamed reply
+
+        timeout applies to the wait for each frame.
+        """
+        message = self._prepare(message)
+        queue = asyncio.Queue()
+        message_id = message.get("id", "")
+        self._pending[message_id] = queue
+        try:
+            await self._send(message)
+            while True:
+                response = await asyncio.wait_for(queue.get(), timeout if timeout is not None else self.timeout)
+                if isinstance(response, BaseException):
+                    raise response
+                yield response
+                if _is_final(response):
+                    return
+        finally:
+            if self._pending.get(message_id) is queue:
+                del self._pending[message_id]
+
+    async def get_walls(self, stream=False, batch_size=None, timeout=None):
+        """
+        Get walls from Renga
+
+        Returns:
+            dict: response; with stream=True the walls of all batches are
+            collected into data.walls
+        """
+        message = commands.create_get_walls_message(stream=stream, batch_size=batch_size)
+        if not stream:
+            return await self.request(message, timeout)
+
+        walls = []
+        async for response in self.request_stream(message, timeout):
+            if not response.get("success", False):
+                return response
+            walls.extend((response.get("data") or {}).get("walls") or [])
+        return {"id": message["id"], "success": True, "data": {"walls": walls}}
+
+    async def iter_walls(self, batch_size=None, timeout=None):
+        """Yield walls of a streamed get_walls reply as they arrive"""
+        message = commands.create_get_walls_message(stream=True, batch_size=batch_size)
+        async for response in self.request_stream(message, timeout):
+            if not response.get("success", False):
+                raise ConnectionError(response.get("error") or "get_walls failed")
+            for wall in (response.get("data") or {}).get("walls") or []:
+                yield wall
+
+    async def update_points(self, points, heights=None, timeout=None):
+        """
+        Create or update columns at points
+
+        Column ids of successful results are stored in the point mapping,
+        as the Create Columns node does.
+
+        Returns:
+            dict: response with data.results in the order of points
+        """
+        message = commands.create_update_points_message(points, list(heights) if heights else None)
+        response = await self.request(message, timeout)
+        if response.get("success", False):
+            for result in (response.get("data") or {}).get("results") or []:
+                if result.get("success") and result.get("columnId") and result.get("grasshopperGuid"):
+                    commands.update_mapping(result["grasshopperGuid"], result["columnId"])
+        return response
+
+    async def peer_features(self):
+        """Encodings the server accepts in requests ("hello"); empty for old servers"""
+        if self._peer_features is None:
+            hello = {
+                "id": str(uuid.uuid4()),
+                "command": "hello",
+                "data": {},
+                "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            }
+            response = await self.request(hello)
+            features = []
+            if response.get("success", False):
+                features = list((response.get("data") or {}).get("accept") or [])
+            self._peer_features = features
+        return self._peer_features
+
+    def _prepare(self, message):
+        accept = []
+        if self.accept_binary:
+            accept.append(connection_protocol.ENCODING_BINARY)
+        if self.compress_level is not None:
+            accept.append(connection_protocol.ENCODING_ZLIB)
+        if not accept or "accept" in message:
+            return message
+        return dict(message, accept=accept)
+
+    async def _send(self, message):
+        payload = connection_protocol.encode_message(message)
+        if (self.compress_level is not None and len(payload) >= self.compress_threshold and
+                connection_protocol.ENCODING_ZLIB in await self.peer_features()):
+            payload = connection_protocol.compress_payload(payload, self.compress_level, self.compress_threshold)
+        if not self.connected:
+            await self.connect()
+        # One write call per frame, so concurrent requests never interleave
+        self._writer.writelines((struct.pack('>I', len(payload)), payload))
+        await self._writer.drain()
+
+    async def _read_loop(self, reader):
+        try:
+            while True:
+                length = struct.unpack('>I', await reader.readexactly(4))[0]
+                if length > self.max_frame_size:
+                    raise ValueError(f"Invalid message length: {length}")
+                response = connection_protocol.decode_message(
+                    await reader.readexactly(length), self.max_frame_size)
+                self._dispatch(response)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.IncompleteReadError:
+            self._connection_lost(ConnectionError("Connection closed by server"))
+        except Exception as e:
+            self._connection_lost(e)
+
+    def _dispatch(self, response):
+        response_id = response.get("id", "") if isinstance(response, dict) else ""
+        target = self._pending.get(response_id)
+        if target is None and not response_id and self._pending:
+            # Server-level error without id: answers the oldest request
+            response_id, target = next(iter(self._pending.items()))
+        if target is None:
+            return
+        if isinstance(target, asyncio.Queue):
+            target.put_nowait(response)
+            if _is_final(response):
+                self._pending.pop(response_id, None)
+        else:
+            self._pending.pop(response_id, None)
+            if not target.done():
+                target.set_result(response)
+
+    def _connection_lost(self, error):
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = self._reader = self._reader_task = None
+        self._fail_pending(error)
+
+    def _fail_pending(self, error):
+        pending = list(self._pending.values())
+        self._pending.clear()
+        for target in pending:
+            if isinstance(target, asyncio.Queue):
+                target.put_nowait(error)
+            elif not target.done():
+                target.set_exception(error)
+
+
+def _is_final(response):
+    stream = response.get("stream")
+    return not response.get("success", False) or not isinstance(stream, dict) or stream.get("final", True)
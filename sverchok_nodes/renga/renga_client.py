@@ -22,10 +22,17 @@ Reliable TCP client for communicating with Renga plugin
 """
 
 import socket
+import select
 import json
 import struct
 import os
 import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
 
 # Добавить путь к папке для импорта connection_protocol
 _current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -36,106 +43,689 @@ if _current_dir not in sys.path:
 try:
     import connection_protocol
 except ImportError:
-    # Если не работает, определяем функции здесь
-    def send_message(sock, message_dict):
-        if not sock:
-            raise ValueError("Socket is None")
-        json_str = json.dumps(message_dict)
-        data = json_str.encode('utf-8')
-        length = len(data)
-        length_bytes = struct.pack('>I', length)
-        sock.sendall(length_bytes)
-        sock.sendall(data)
-    
-    def receive_message(sock, timeout=10.0):
-        if not sock:
-            raise ValueError("Socket is None")
-        sock.settimeout(timeout)
-        length_bytes = b''
-        while len(length_bytes) < 4:
-            chunk = sock.recv(4 - len(length_bytes))
-            if not chunk:
-                raise ConnectionError("Connection closed while reading message length")
-            length_bytes += chunk
-        length = struct.unpack('>I', length_bytes)[0]
-        if length < 0 or length > 10 * 1024 * 1024:
-            raise ValueError(f"Invalid message length: {length}")
-        buffer = b''
-        while len(buffer) < length:
-            chunk = sock.recv(length - len(buffer))
-            if not chunk:
-                raise ConnectionError("Connection closed while reading message data")
-            buffer += chunk
-        return json.loads(buffer.decode('utf-8'))
-    
-    # Создать объект connection_protocol
-    class _ConnectionProtocol:
-        send_message = staticmethod(send_message)
-        receive_message = staticmethod(receive_message)
-    connection_protocol = _ConnectionProtocol()
+    # Fallback: загрузить модуль напрямую из файла
+    import importlib.util
+    _protocol_file = os.path.join(_current_dir, "connection_protocol.py")
+    _spec = importlib.util.spec_from_file_location("connection_protocol", _protocol_file)
+    connection_protocol = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(connection_protocol)
+
+
+class _PooledConnection:
+    """Socket kept open by ConnectionPool between requests"""
+    
+    __slots__ = ("sock", "host", "port", "created", "last_used")
+    
+    def __init__(self, sock, host, port):
+        self.sock = sock
+        self.host = host
+        self.port = port
+        self.created = time.monotonic()
+        self.last_used = self.created
+    
+    def close(self):
+        try:
+            self.sock.close()
+        except:
+            pass
+
+
+class ConnectionPool:
+    """
+    Pool of persistent TCP connections keyed by (host, port)
+    
+    One live socket carries many length-prefixed frames, so repeated node
+    evaluations don't pay for a TCP handshake (and leave TIME_WAIT sockets)
+    on every command. Idle sockets are health-checked before reuse and
+    evicted after idle_timeout seconds.
+    """
+    
+    def __init__(self, max_idle=4, idle_timeout=60.0, keepalive=True):
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        self._lock = threading.Lock()
+        self._idle = {}  # (host, port) -> list of _PooledConnection
+        self.stats = {"opened": 0, "reused": 0, "evicted": 0, "discarded": 0}
+    
+    def acquire(self, host, port, connect_timeout=2.0):
+        """
+        Take a healthy connection from the pool or open a new one
+        
+        Returns:
+            tuple: (_PooledConnection, reused) - reused is True for pooled sockets
+        """
+        key = (host, port)
+        with self._lock:
+            self._evict_expired_locked()
+            idle = self._idle.get(key, [])
+            while idle:
+                conn = idle.pop()
+                if _is_socket_alive(conn.sock):
+                    self.stats["reused"] += 1
+                    return conn, True
+                conn.close()
+                self.stats["evicted"] += 1
+        
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(connect_timeout)
+            sock.connect((host, port))
+            _configure_socket(sock, self.keepalive)
+        except:
+            sock.close()
+            raise
+        with self._lock:
+            self.stats["opened"] += 1
+        return _PooledConnection(sock, host, port), False
+    
+    def release(self, conn):
+        """Return a connection to the pool after a complete request/response"""
+        conn.last_used = time.monotonic()
+        key = (conn.host, conn.port)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+    
+    def discard(self, conn):
+        """Close a connection that is broken or in an unknown protocol state"""
+        conn.close()
+        with self._lock:
+            self.stats["discarded"] += 1
+    
+    def close_all(self, host=None, port=None):
+        """Close idle connections (all of them, or only for host/port)"""
+        with self._lock:
+            keys = [k for k in self._idle
+                    if (host is None or k[0] == host) and (port is None or k[1] == port)]
+            for key in keys:
+                for conn in self._idle.pop(key):
+                    conn.close()
+    
+    def idle_count(self, host, port):
+        with self._lock:
+            return len(self._idle.get((host, port), []))
+    
+    def _evict_expired_locked(self):
+        if self.idle_timeout is None:
+            return
+        deadline = time.monotonic() - self.idle_timeout
+        for key in list(self._idle):
+            alive = []
+            for conn in self._idle[key]:
+                if conn.last_used < deadline:
+                    conn.close()
+                    self.stats["evicted"] += 1
+                else:
+                    alive.append(conn)
+            if alive:
+                self._idle[key] = alive
+            else:
+                del self._idle[key]
+
+
+def _configure_socket(sock, keepalive=True):
+    """Disable Nagle for small frames and enable TCP keep-alive"""
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except OSError:
+        pass
+    if not keepalive:
+        return
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if hasattr(socket, "SIO_KEEPALIVE_VALS"):
+            # Windows: start probing after 30 s idle, probe every 5 s
+            sock.ioctl(socket.SIO_KEEPALIVE_VALS, (1, 30000, 5000))
+        elif hasattr(socket, "TCP_KEEPIDLE"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 5)
+    except (OSError, AttributeError):
+        pass
+
+
+def _is_socket_alive(sock):
+    """
+    Health check for an idle pooled socket without sending anything
+    
+    An idle connection must have nothing to read: EOF means the server closed
+    it, unexpected bytes mean the stream is out of sync. Either way it can't
+    be reused.
+    """
+    try:
+        timeout = sock.gettimeout()
+        sock.setblocking(False)
+        try:
+            sock.recv(1, socket.MSG_PEEK)
+        finally:
+            sock.settimeout(timeout)
+        return False
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+
+
+def _poll_frame(sock, timeout):
+    """
+    Wait up to timeout seconds for the next frame
+    
+    Returns:
+        True - there are bytes to read, False - EOF (the server closed the
+        connection) or a closed socket, None - nothing arrived yet
+    """
+    try:
+        if not select.select([sock], [], [], timeout)[0]:
+            return None
+        return bool(sock.recv(1, socket.MSG_PEEK))
+    except (OSError, ValueError):
+        return False
+
+
+# Seconds between checks for a decoded frame while reading ahead
+STREAM_POLL_INTERVAL = 0.005
+
+# Frames read ahead of the oldest one still decoding, unless submit says
+# otherwise (submit.max_pending)
+STREAM_READ_AHEAD = 8
+
+
+# Shared by all clients, so nodes that create a client on every process()
+# still reuse the same sockets
+_default_pool = ConnectionPool()
+
+
+def get_pool():
+    """Get the module-wide connection pool"""
+    return _default_pool
+
+
+class RequestNotSentError(ConnectionError):
+    """The connection failed before the request was written: safe to resend"""
+
+
+class PipelinedChannel:
+    """
+    Single connection carrying several in-flight requests
+    
+    Requests are written back-to-back without waiting for replies; a reader
+    thread matches each response to its Future by the echoed message id.
+    An error response with an empty id (server-level error) is assigned to
+    the oldest outstanding request, since the server answers in order; any
+    other response with an unknown id is dropped. Streamed requests
+    (data.stream) answer with several frames and can't be pipelined: use
+    RengaConnectionClient.send_stream for them.
+    """
+    
+    def __init__(self, host="127.0.0.1", port=50100, timeout=10.0, pool=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.pool = pool if pool is not None else _default_pool
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._pending = OrderedDict()  # message id -> Future
+        self._conn = None
+        self._reader = None
+    
+    def submit(self, message, payload=None):
+        """
+        Send a message without waiting for the response
+        
+        Args:
+            message: Message dictionary
+            payload: Already encoded payload of message (optional)
+        
+        Returns:
+            Future: resolves to the response dict, or fails with the
+            connection error (ConnectionError, socket.timeout, ...);
+            RequestNotSentError if the request was never written
+        
+        Raises:
+            ValueError: streamed request (data.stream)
+        """
+        data = message.get("data")
+        if isinstance(data, dict) and data.get("stream"):
+            raise ValueError("Streamed requests can't be pipelined, use send_stream")
+        future = Future()
+        message_id = message.get("id", "")
+        try:
+            with self._send_lock:
+                conn = self._ensure_connected()
+                with self._lock:
+                    self._pending[message_id] = future
+                try:
+                    if payload is None:
+                        payload = connection_protocol.encode_message(message)
+                    connection_protocol.send_payload(conn.sock, payload)
+                except Exception as e:
+                    # A partly written frame is never processed by the server
+                    with self._lock:
+                        self._pending.pop(message_id, None)
+                    self._close_connection(conn, e)
+                    future.set_exception(RequestNotSentError(str(e)))
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        return future
+    
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+    
+    def close(self):
+        with self._lock:
+            conn = self._conn
+        if conn is not None:
+            self._close_connection(conn, ConnectionError("Channel closed"))
+    
+    def _ensure_connected(self):
+        with self._lock:
+            if self._conn is not None:
+                return self._conn
+        conn, _ = self.pool.acquire(self.host, self.port, self.timeout)
+        conn.sock.settimeout(self.timeout)
+        with self._lock:
+            self._conn = conn
+        self._reader = threading.Thread(
+            target=self._reader_loop, args=(conn,),
+            name=f"renga-pipeline-{self.port}", daemon=True)
+        self._reader.start()
+        return conn
+    
+    def _reader_loop(self, conn):
+        while True:
+            try:
+                response = connection_protocol.receive_message(conn.sock, self.timeout)
+            except socket.timeout as e:
+                with self._lock:
+                    idle = not self._pending
+                if idle:
+                    continue
+                self._close_connection(conn, e)
+                return
+            except Exception as e:
+                self._close_connection(conn, e)
+                return
+            
+            response_id = response.get("id", "") if isinstance(response, dict) else ""
+            with self._lock:
+                future = self._pending.pop(response_id, None)
+                if future is None and not response_id and self._pending and \
+                        isinstance(response, dict) and not response.get("success", False):
+                    _, future = self._pending.popitem(last=False)
+            if future is not None and not future.done():
+                future.set_result(response)
+    
+    def _close_connection(self, conn, error):
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+            pending = list(self._pending.values())
+            self._pending.clear()
+        self.pool.discard(conn)
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+
+_channels = {}
+_channels_lock = threading.Lock()
+
+# (host, port) -> list of encodings the server accepts, from "hello"
+_peer_features = {}
+
+
+def get_channel(host="127.0.0.1", port=50100, timeout=10.0):
+    """Get the shared pipelined channel for (host, port)"""
+    key = (host, port)
+    with _channels_lock:
+        channel = _channels.get(key)
+        if channel is None:
+            channel = _channels[key] = PipelinedChannel(host, port, timeout)
+        channel.timeout = max(channel.timeout, timeout)
+        return channel
+
+
+def _close_jobs(pending):
+    """Drop frames of send_stream whose decoded result is not going to be taken"""
+    while pending:
+        pending.popleft().close()
+
+
+def _error_response(message, error):
+    """Convert a transport exception into the client's error response format"""
+    if isinstance(error, socket.timeout):
+        text = "Connection timeout"
+    elif isinstance(error, ConnectionRefusedError):
+        text = "Connection refused. Make sure Renga plugin is running and server is started."
+    elif isinstance(error, socket.error):
+        text = f"Socket error: {str(error)}"
+    else:
+        text = f"Error: {str(error)}"
+    return {
+        "id": message.get("id", ""),
+        "success": False,
+        "error": text
+    }
+
+
+class RengaServerError(Exception):
+    """Error response received from Renga in the middle of a streamed reply"""
+    
+    def __init__(self, response):
+        super().__init__(response.get("error") or "Request failed")
+        self.response = response
 
 
 class RengaConnectionClient:
     """
     TCP client for Renga plugin communication
+    
+    Connections are taken from a ConnectionPool keyed by (host, port) and kept
+    open between commands. A stale pooled socket is replaced transparently.
     """
     
-    def __init__(self, host="127.0.0.1", port=50100, timeout=10.0):
+    def __init__(self, host="127.0.0.1", port=50100, timeout=10.0, pool=None, accept_binary=True,
+                 max_frame_size=None, compress_level=connection_protocol.COMPRESS_LEVEL,
+                 compress_threshold=connection_protocol.COMPRESS_THRESHOLD):
         self.host = host
         self.port = port
         self.timeout = timeout
+        self.pool = pool if pool is not None else _default_pool
+        self.accept_binary = accept_binary
+        self.max_frame_size = max_frame_size
+        # zlib level for frames >= compress_threshold; None disables compression
+        self.compress_level = compress_level
+        self.compress_threshold = compress_threshold
+    
+    def _prepare(self, message):
+        """
+        Advertise frame formats this client can decode
+        
+        Servers that don't know the "accept" field ignore it and answer with
+        plain JSON, which is always understood.
+        """
+        accept = []
+        if self.accept_binary:
+            accept.append(connection_protocol.ENCODING_BINARY)
+        if self.compress_level is not None:
+            accept.append(connection_protocol.ENCODING_ZLIB)
+        if not accept or "accept" in message:
+            return message
+        return dict(message, accept=accept)
+    
+    def _encode(self, message):
+        """
+        Encode a request, compressed only if it is large and the server
+        reported in "hello" that it accepts zlib frames
+        """
+        payload = connection_protocol.encode_message(message)
+        if (self.compress_level is not None and len(payload) >= self.compress_threshold and
+                connection_protocol.ENCODING_ZLIB in self.peer_features()):
+            payload = connection_protocol.compress_payload(
+                payload, self.compress_level, self.compress_threshold)
+        return payload
+    
+    def peer_features(self):
+        """
+        Encodings the server accepts in requests, asked once per server
+        
+        Servers without the "hello" command (older plugin versions) answer
+        with an error and get an empty list: they are sent plain JSON only.
+        """
+        key = (self.host, self.port)
+        features = _peer_features.get(key)
+        if features is None:
+            hello = {
+                "id": str(uuid.uuid4()),
+                "command": "hello",
+                "data": {},
+                "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            }
+            try:
+                response = self._exchange(hello, connection_protocol.encode_message(hello))
+            except Exception:
+                # Server not reachable: don't remember anything
+                return []
+            features = []
+            if response.get("success", False):
+                features = list((response.get("data") or {}).get("accept") or [])
+            _peer_features[key] = features
+        return features
+    
+    def open_project(self):
+        """
+        Identity of the project open in Renga (its file path, "" if never
+        saved), asked with "hello" on every call: the user may open another
+        project at any time
+        
+        Returns:
+            str: None when the server is not reachable or doesn't report it
+        """
+        hello = {
+            "id": str(uuid.uuid4()),
+            "command": "hello",
+            "data": {},
+            "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        }
+        response = self.send(hello)
+        if not response.get("success", False):
+            return None
+        return (response.get("data") or {}).get("project")
     
     def send(self, message):
         """Send a message and receive response"""
-        client = None
+        message = self._prepare(message)
         try:
-            client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            client.settimeout(self.timeout)
-            client.connect((self.host, self.port))
-            
-            connection_protocol.send_message(client, message)
-            response = connection_protocol.receive_message(client, self.timeout)
-            return response
-        
-        except socket.timeout:
-            return {
-                "id": message.get("id", ""),
-                "success": False,
-                "error": "Connection timeout"
-            }
-        except ConnectionRefusedError:
-            return {
-                "id": message.get("id", ""),
-                "success": False,
-                "error": "Connection refused. Make sure Renga plugin is running and server is started."
-            }
-        except socket.error as e:
-            return {
-                "id": message.get("id", ""),
-                "success": False,
-                "error": f"Socket error: {str(e)}"
-            }
+            return self._exchange(message, self._encode(message))
         except Exception as e:
-            return {
-                "id": message.get("id", ""),
-                "success": False,
-                "error": f"Error: {str(e)}"
-            }
+            if isinstance(e, ConnectionError):
+                # The server may come back as a different plugin version
+                _peer_features.pop((self.host, self.port), None)
+            return _error_response(message, e)
+    
+    def _exchange(self, message, payload):
+        """Send an encoded request and receive its response; raises on transport errors"""
+        conn = None
+        try:
+            # Second attempt only happens when a reused socket turned out to be
+            # closed by the server while writing - reconnect once and resend.
+            # A failure while receiving is never retried: the server may have
+            # applied the request already (update_points would create twice)
+            for attempt in range(2):
+                conn, reused = self.pool.acquire(self.host, self.port, self.timeout)
+                try:
+                    conn.sock.settimeout(self.timeout)
+                    connection_protocol.send_payload(conn.sock, payload)
+                except (ConnectionError, BrokenPipeError):
+                    self.pool.discard(conn)
+                    conn = None
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                response = connection_protocol.receive_message(
+                    conn.sock, self.timeout, self.max_frame_size)
+                self.pool.release(conn)
+                conn = None
+                return response
         finally:
-            if client:
+            # Socket left in an unknown state (timeout, parse error) is never reused
+            if conn is not None:
+                self.pool.discard(conn)
+    
+    def send_stream(self, message, submit=None):
+        """
+        Send a request and yield response frames as they arrive
+        
+        A streamed reply is a sequence of frames with "stream": {"seq", "final"};
+        iteration stops after the final frame. A reply without "stream"
+        (server that doesn't support streaming) is yielded as the only frame.
+        Transport errors are yielded as an error response, like send().
+        
+        With submit, raw frame payloads are decoded elsewhere (see
+        parallel_decode): submit(payload) returns a job with done(), result()
+        -> response dict and close() - drop a result that is never taken.
+        Frames are read ahead while earlier ones are being decoded, at most
+        submit.max_pending (STREAM_READ_AHEAD) of them; then the oldest is
+        waited for. Whether a frame was the final one is only known once it
+        is decoded, so reading stops at EOF too: a server without streaming
+        may close the connection after its only reply.
+        """
+        message = self._prepare(message)
+        conn = None
+        pending = deque()
+        try:
+            for attempt in range(2):
+                reused = received = False
                 try:
-                    client.close()
-                except:
-                    pass
+                    payload = self._encode(message)
+                    conn, reused = self.pool.acquire(self.host, self.port, self.timeout)
+                    conn.sock.settimeout(self.timeout)
+                    connection_protocol.send_payload(conn.sock, payload)
+                    for response in self._receive_stream(conn.sock, submit, pending):
+                        received = True
+                        stream = response.get("stream")
+                        final = (not response.get("success", False) or
+                                 not isinstance(stream, dict) or stream.get("final", True))
+                        if final:
+                            self.pool.release(conn)
+                            conn = None
+                        yield response
+                        if final:
+                            return
+                except (ConnectionError, BrokenPipeError) as e:
+                    if conn is not None:
+                        self.pool.discard(conn)
+                        conn = None
+                    _close_jobs(pending)
+                    if reused and attempt == 0 and not received:
+                        continue
+                    yield _error_response(message, e)
+                    return
+                except Exception as e:
+                    if conn is not None:
+                        self.pool.discard(conn)
+                        conn = None
+                    yield _error_response(message, e)
+                    return
+        finally:
+            # Consumer stopped early: unread frames make the socket unusable
+            if conn is not None:
+                self.pool.discard(conn)
+            _close_jobs(pending)
+    
+    def _receive_stream(self, sock, submit, pending):
+        """Responses of a streamed reply in order (see send_stream); runs until the caller stops"""
+        if submit is None:
+            while True:
+                yield connection_protocol.receive_message(sock, self.timeout, self.max_frame_size)
+        max_pending = getattr(submit, "max_pending", None) or STREAM_READ_AHEAD
+        while True:
+            while pending and pending[0].done():
+                yield pending.popleft().result()
+            if not pending:
+                # Nothing left to wait for: the reply isn't complete yet
+                pending.append(submit(connection_protocol.receive_frame(
+                    sock, self.timeout, self.max_frame_size)))
+                continue
+            # Read the next frame if it is there, otherwise give the oldest
+            # frame time to get decoded
+            state = _poll_frame(sock, STREAM_POLL_INTERVAL) if len(pending) < max_pending else None
+            if state:
+                pending.append(submit(connection_protocol.receive_frame(
+                    sock, self.timeout, self.max_frame_size)))
+            elif state is False or len(pending) >= max_pending:
+                # EOF (maybe after the final reply) or enough read ahead
+                yield pending.popleft().result()
+    
+    def iter_wall_batches(self, message, submit=None):
+        """
+        Yield the data dict of every frame of a (streamed) get_walls reply
+        
+        Besides "walls" a batch from a binary frame carries "geometry", the
+        concatenated arrays of all its walls (see pack_geometry).
+        
+        Args:
+            submit: decode frames elsewhere, see send_stream
+        
+        Raises:
+            RengaServerError: error response from the server or transport
+        """
+        for response in self.send_stream(message, submit):
+            if not response.get("success", False):
+                raise RengaServerError(response)
+            yield response.get("data") or {}
+    
+    def iter_walls(self, message):
+        """
+        Yield walls of a (streamed) get_walls reply as they arrive
+        
+        Raises:
+            RengaServerError: error response from the server or transport
+        """
+        for data in self.iter_wall_batches(message):
+            for wall in data.get("walls") or []:
+                yield wall
+    
+    def submit(self, message):
+        """
+        Send a message over the shared pipelined channel without waiting
+        
+        Returns:
+            Future: resolves to the response dict
+        
+        Raises:
+            ValueError: streamed request (data.stream), see send_stream
+        """
+        message = self._prepare(message)
+        return get_channel(self.host, self.port, self.timeout).submit(message, self._encode(message))
+    
+    def send_many(self, messages):
+        """
+        Send several messages back-to-back on one connection
+        
+        Responses are matched by id and returned in the order of messages.
+        Messages that were never written because the connection failed are
+        resent one by one; a message written but not answered gets an error
+        response, since the server may have applied it.
+        
+        Returns:
+            list: response dicts, one per message
+        """
+        futures = [self.submit(message) for message in messages]
+        deadline = time.monotonic() + self.timeout
+        responses = []
+        for message, future in zip(messages, futures):
+            try:
+                responses.append(future.result(max(0.0, deadline - time.monotonic())))
+            except FuturesTimeoutError:
+                responses.append(_error_response(message, socket.timeout()))
+            except RequestNotSentError:
+                responses.append(self.send(message))
+            except (ConnectionError, BrokenPipeError) as e:
+                responses.append(_error_response(message, e))
+            except Exception as e:
+                responses.append(_error_response(message, e))
+        return responses
     
     def is_server_reachable(self):
-        """Check if server is reachable"""
+        """
+        Check if server is reachable
+        
+        Reuses a pooled connection when one is alive; otherwise the probe
+        connection is kept in the pool for the next send().
+        """
         try:
-            client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            client.settimeout(2.0)
-            client.connect((self.host, self.port))
-            client.close()
-            return True
+            conn, _ = self.pool.acquire(self.host, self.port, 2.0)
         except:
             return False
-
+        self.pool.release(conn)
+        return True
+    
+    def close(self):
+        """Close idle pooled connections to this server"""
+        self.pool.close_all(self.host, self.port)
@@ -50,6 +50,66 @@ except ImportError:
         print(f"Renga Connect: Failed to import renga_client: {e}")
         renga_client = None
 
+try:
+    import json_codec
+except ImportError:
+    json_codec = None
+
+try:
+    import connection_monitor
+except ImportError:
+    connection_monitor = None
+
+# Период проверки смены состояния heartbeat (таймер Blender)
+WATCH_INTERVAL = 0.5
+
+# node_id -> [tree name, node name, port, monitor.changes at last process()]
+_watched = {}
+
+
+def _watch_monitors():
+    """
+    Timer: re-run Connect nodes whose connection state changed
+    
+    The heartbeat thread must not touch Blender data, so it only bumps
+    monitor.changes; this callback runs on the main thread.
+    """
+    for node_id, entry in list(_watched.items()):
+        tree_name, node_name, port, changes = entry
+        monitor = connection_monitor.find_monitor(port=port)
+        if monitor is None or monitor.changes == changes:
+            continue
+        entry[3] = monitor.changes
+        tree = bpy.data.node_groups.get(tree_name)
+        node = tree.nodes.get(node_name) if tree is not None else None
+        if node is None or getattr(node, 'node_id', None) != node_id:
+            _watched.pop(node_id, None)
+            continue
+        try:
+            node.process_node(None)
+        except Exception as e:
+            print(f"Renga Connect: error updating node {node_name}: {e}")
+    return WATCH_INTERVAL if _watched else None
+
+
+def _unwatch(node_id):
+    entry = _watched.pop(node_id, None)
+    if entry is None:
+        return
+    port = entry[2]
+    # Stop the heartbeat unless another Connect node uses the same port
+    if not any(other[2] == port for other in _watched.values()):
+        connection_monitor.stop_monitor(port=port)
+
+
+# Сообщения по состояниям heartbeat
+_STATE_MESSAGES = {
+    "connecting": "Connecting to Renga on port {port}...",
+    "connected": "Server reachable on port {port}",
+    "degraded": "Connection to port {port} unstable, retrying ({error})",
+    "down": "Server not reachable on port {port}. Make sure Renga plugin is running and server is started. Retry in {retry:.0f} s",
+}
+
 
 class SvRengaConnectNode(SverchCustomTreeNode, bpy.types.Node):
     """
@@ -92,6 +152,29 @@ class SvRengaConnectNode(SverchCustomTreeNode, bpy.types.Node):
         layout.prop(self, 'port', text='Port')
         layout.prop(self, 'connect', text='Connect')
     
+    def sv_draw_buttons_ext(self, context, layout):
+        """Draw node UI in the sidebar: protocol diagnostics"""
+        self.sv_draw_buttons(context, layout)
+        entry = _watched.get(self.node_id)
+        monitor = connection_monitor.find_monitor(port=entry[2]) if entry and connection_monitor else None
+        if monitor is not None:
+            snapshot = monitor.snapshot()
+            box = layout.box()
+            box.label(text=f"Heartbeat: {snapshot['state']}")
+            if snapshot['latency'] is not None:
+                box.label(text=f"Probe: {snapshot['latency'] * 1000:.1f} ms")
+            if snapshot['failures']:
+                box.label(text=f"Failed probes: {snapshot['failures']}, next in {snapshot['next_interval']:.0f} s")
+        if json_codec is None:
+            return
+        stats = json_codec.stats()
+        box = layout.box()
+        box.label(text=f"JSON codec: {stats['codec']}")
+        for direction in ("encode", "decode"):
+            timing = stats[direction]
+            box.label(text=f"{direction}: {timing['calls']} frames, "
+                           f"{timing['bytes'] / 1e6:.1f} MB, {timing['seconds'] * 1000:.0f} ms")
+    
     def process(self):
         """Process node"""
         try:
@@ -144,26 +227,36 @@ class SvRengaConnectNode(SverchCustomTreeNode, bpy.types.Node):
                     timeout=2.0
                 )
             
-            # Check connection status
-            if connect:
-                try:
-                    is_reachable = self._client.is_server_reachable()
-                    if is_reachable:
-                        self.outputs['Connected'].sv_set([[True]])
-                        self.outputs['Message'].sv_set([[f"Server reachable on port {port}"]])
-                        self.outputs['Client'].sv_set([[port]])
-                    else:
-                        self.outputs['Connected'].sv_set([[False]])
-                        self.outputs['Message'].sv_set([[f"Server not reachable on port {port}. Make sure Renga plugin is running and server is started."]])
-                        self.outputs['Client'].sv_set([[]])
-                except Exception as e:
-                    self.outputs['Connected'].sv_set([[False]])
-                    self.outputs['Message'].sv_set([[f"Connection check error: {str(e)}"]])
-                    self.outputs['Client'].sv_set([[]])
-            else:
+            if not connect:
+                if connection_monitor is not None:
+                    _unwatch(self.node_id)
                 self.outputs['Connected'].sv_set([[False]])
                 self.outputs['Message'].sv_set([["Not connected"]])
                 self.outputs['Client'].sv_set([[]])
+                return
+            
+            if connection_monitor is None:
+                # Без heartbeat: разовая проверка
+                is_reachable = self._client.is_server_reachable()
+                self._set_state_outputs("connected" if is_reachable else "down", port, {"next_interval": 0})
+                return
+            
+            # Check connection status: the heartbeat thread probes, we only read
+            entry = _watched.get(self.node_id)
+            if entry is not None and entry[2] != port:
+                _unwatch(self.node_id)
+                entry = None
+            monitor = connection_monitor.get_monitor(port=port)
+            if entry is None:
+                monitor.poke()
+                _watched[self.node_id] = [self.id_data.name, self.name, port, monitor.changes]
+                if not bpy.app.timers.is_registered(_watch_monitors):
+                    bpy.app.timers.register(_watch_monitors, first_interval=WATCH_INTERVAL)
+            else:
+                entry[0], entry[1], entry[3] = self.id_data.name, self.name, monitor.changes
+            
+            snapshot = monitor.snapshot()
+            self._set_state_outputs(snapshot["state"], port, snapshot)
         except Exception as e:
             print(f"ERROR in SvRengaConnectNode.process(): {e}")
             import traceback
@@ -175,6 +268,18 @@ class SvRengaConnectNode(SverchCustomTreeNode, bpy.types.Node):
             except:
                 pass
     
+    def sv_free(self):
+        """Node removed: stop its heartbeat"""
+        if connection_monitor is not None:
+            _unwatch(self.node_id)
+    
+    def _set_state_outputs(self, state, port, snapshot):
+        message = _STATE_MESSAGES.get(state, state).format(
+            port=port, error=snapshot.get("last_error"), retry=snapshot.get("next_interval") or 0)
+        self.outputs['Connected'].sv_set([[state == "connected"]])
+        self.outputs['Message'].sv_set([[message]])
+        self.outputs['Client'].sv_set([[port]] if state in ("connected", "degraded") else [[]])
+    
     def get_client(self):
         """Get Renga client object for other nodes"""
         if hasattr(self, '_client'):
@@ -199,6 +304,14 @@ def register():
 
 def unregister():
     """Отмена регистрации ноды"""
+    try:
+        if bpy.app.timers.is_registered(_watch_monitors):
+            bpy.app.timers.unregister(_watch_monitors)
+        _watched.clear()
+        if connection_monitor is not None:
+            connection_monitor.stop_all()
+    except:
+        pass
     try:
         if 'SvRengaConnectNode' in dir(bpy.types):
             bpy.utils.unregister_class(SvRengaConnectNode)
@@ -21,12 +21,13 @@ Renga Create Columns Node - ПЕРЕПИСАННАЯ ВЕРСИЯ БЕЗ ОТН
 """
 
 import bpy
-from bpy.props import BoolProperty
+from bpy.props import BoolProperty, StringProperty
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import updateNode
 import os
 import sys
 import json
+import threading
 import uuid
 from datetime import datetime
 
@@ -51,24 +52,56 @@ except ImportError:
     except:
         renga_client = None
 
+try:
+    import renga_jobs
+except ImportError:
+    renga_jobs = None
+
+try:
+    import connection_monitor
+except ImportError:
+    connection_monitor = None
+
+import point_index
+import column_snapshot
+import model_cache
+
+
+def _server_down(port):
+    """Cached heartbeat state of the Connect node; never probes the server"""
+    if connection_monitor is None:
+        return False
+    return connection_monitor.get_state(port=port) == connection_monitor.STATE_DOWN
+
 # Встроенные функции commands (чтобы не зависеть от импорта)
+POINT_TOLERANCE = 0.001
 _point_guid_map = {}
-_point_to_guid_map = {}
+_point_index = point_index.PointIndex(POINT_TOLERANCE)  # point -> GUID
 _guid_counter = 0
+# Nodes resolve GUIDs in JobRunner worker threads: one point, one GUID
+_point_lock = threading.RLock()
 
-def _get_point_guid(point, tolerance=0.001):
-    global _point_to_guid_map, _guid_counter
-    for existing_point, guid in _point_to_guid_map.items():
-        if (abs(existing_point[0] - point[0]) < tolerance and
-            abs(existing_point[1] - point[1]) < tolerance and
-            abs(existing_point[2] - point[2]) < tolerance):
+def _get_point_guid(point, tolerance=POINT_TOLERANCE):
+    global _guid_counter
+    with _point_lock:
+        guid = _point_index.find(point, tolerance)
+        if guid is not None:
             return guid
-    new_guid = f"SV_Point_{_guid_counter}_{uuid.uuid4().hex[:8]}"
-    _point_to_guid_map[tuple(point)] = new_guid
-    _guid_counter += 1
-    return new_guid
+        new_guid = f"SV_Point_{_guid_counter}_{uuid.uuid4().hex[:8]}"
+        _point_index.add(point, new_guid)
+        _guid_counter += 1
+        return new_guid
+
+def _get_point_guids(points, tolerance=POINT_TOLERANCE):
+    """Known points in one batch lookup, new ones one by one in input order"""
+    with _point_lock:
+        guids = _point_index.find_many(points, tolerance) if len(points) else []
+        for i, guid in enumerate(guids):
+            if guid is None:
+                guids[i] = _get_point_guid(points[i], tolerance)
+        return guids
 
-def create_update_points_message(points, heights=None):
+def create_update_points_message(points, heights=None, column_ids=None, deletions=None, point_guids=None):
     global _point_guid_map
     if heights is None:
         heights = [3000.0]
@@ -76,6 +109,8 @@ def create_update_points_message(points, heights=None):
         last_height = heights[-1] if heights else 3000.0
         heights.extend([last_height] * (len(points) - len(heights)))
     
+    if point_guids is None:
+        point_guids = _get_point_guids(points)
     point_data = []
     for i, point in enumerate(points):
         if isinstance(point, tuple):
@@ -85,8 +120,8 @@ def create_update_points_message(points, heights=None):
         if height <= 0:
             height = 3000.0
         
-        point_guid = _get_point_guid(point)
-        renga_column_guid = _point_guid_map.get(point_guid)
+        point_guid = point_guids[i]
+        renga_column_guid = column_ids[i] if column_ids and column_ids[i] else _point_guid_map.get(point_guid)
         
         point_obj = {
             "x": float(x),
@@ -98,10 +133,14 @@ def create_update_points_message(points, heights=None):
         }
         point_data.append(point_obj)
     
+    data = {"points": point_data}
+    if deletions:
+        data["delete"] = [{"grasshopperGuid": guid, "rengaColumnGuid": str(column_id) if column_id else None}
+                          for guid, column_id in deletions]
     return {
         "id": str(uuid.uuid4()),
         "command": "update_points",
-        "data": {"points": point_data},
+        "data": data,
         "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
     }
 
@@ -109,6 +148,60 @@ def update_mapping(point_guid, column_id):
     global _point_guid_map
     if column_id:
         _point_guid_map[point_guid] = str(column_id)
+    else:
+        _point_guid_map.pop(point_guid, None)
+
+
+# Points (and deletions) per update_points request: Renga handles each
+# request within the client timeout
+UPDATE_CHUNK_POINTS = 1000
+# Largest request payload (frames are limited to 10 MB), estimated without
+# encoding: UPDATE_ITEM_BYTES per point or deletion plus its GUIDs
+UPDATE_CHUNK_BYTES = 4 * 1024 * 1024
+# JSON of one point without its GUIDs: keys, four floats at full precision
+UPDATE_ITEM_BYTES = 192
+
+
+# (node_id, port) -> ColumnSnapshot of the columns Renga acknowledged
+_column_snapshots = {}
+
+
+def _get_snapshot(node_id, port):
+    key = (node_id, port)
+    snapshot = _column_snapshots.get(key)
+    if snapshot is None:
+        # Another Renga (port): its columns are not ours
+        for other in [k for k in _column_snapshots if k[0] == node_id]:
+            del _column_snapshots[other]
+        snapshot = _column_snapshots[key] = column_snapshot.ColumnSnapshot()
+    return snapshot
+
+
+def restore_snapshot(snapshot, path):
+    """
+    Fill an empty snapshot from a file written by column_snapshot.save and
+    give its points their GUIDs and column ids back, so the same points
+    map to the same columns as before the restart
+    
+    Returns:
+        bool: False if the file could not be read
+    """
+    try:
+        loaded = column_snapshot.load(path)
+    except (OSError, KeyError, TypeError, ValueError) as e:
+        print(f"Renga Create Columns: could not load column snapshot: {e}")
+        return False
+    snapshot.columns = loaded.columns
+    snapshot.order = loaded.order
+    # Compared with the open project before the first sync (_check_project)
+    snapshot.project = loaded.project
+    snapshot.checked = False
+    with _point_lock:
+        for guid, (x, y, z, _, column_id) in snapshot.columns.items():
+            if guid not in _point_index:
+                _point_index.add((x, y, z), guid)
+            update_mapping(guid, column_id)
+    return True
 
 
 class SvRengaCreateColumnsNode(SverchCustomTreeNode, bpy.types.Node):
@@ -129,6 +222,32 @@ class SvRengaCreateColumnsNode(SverchCustomTreeNode, bpy.types.Node):
         update=updateNode
     )
     
+    background: BoolProperty(
+        name='Background',
+        description='Run the request in a worker thread so Blender stays responsive',
+        default=True,
+        update=updateNode
+    )
+    
+    only_changes: BoolProperty(
+        name='Only Changes',
+        description='Send only created, moved, resized and removed columns; '
+                    'unchanged points are not sent, removed points delete their columns',
+        default=True,
+        update=updateNode
+    )
+    
+    keep_on_disk: BoolProperty(
+        name='Keep on Disk',
+        description='Save the columns sent to Renga next to the .blend, so after reopening '
+                    'the same points update their columns instead of creating new ones',
+        default=True,
+        update=updateNode
+    )
+    
+    # Column snapshot file of the last sync (column_snapshot), restored on first run
+    column_file: StringProperty(default='')
+    
     _last_update_value = False
     
     def sv_init(self, context):
@@ -145,6 +264,10 @@ class SvRengaCreateColumnsNode(SverchCustomTreeNode, bpy.types.Node):
     def sv_draw_buttons(self, context, layout):
         """Draw node UI"""
         layout.prop(self, 'update_trigger', text='Update')
+        layout.prop(self, 'background', text='Background')
+        layout.prop(self, 'only_changes', text='Only Changes')
+        if self.only_changes:
+            layout.prop(self, 'keep_on_disk', text='Keep on Disk')
     
     def process(self):
         """Process node"""
@@ -201,84 +324,31 @@ class SvRengaCreateColumnsNode(SverchCustomTreeNode, bpy.types.Node):
                 if heights[i] <= 0:
                     heights[i] = 3000.0
             
-            # Only process if Update trigger occurred
-            if not should_update:
-                self.outputs['Success'].sv_set([[]])
-                self.outputs['Message'].sv_set([["Set Update to True to send points to Renga"]])
-                self.outputs['ColumnGuids'].sv_set([[]])
-                return
-            
-            # Create client
             if renga_client is None:
                 self.outputs['Success'].sv_set([[]])
                 self.outputs['Message'].sv_set([["Renga client module not available"]])
                 self.outputs['ColumnGuids'].sv_set([[]])
                 return
             
-            client = renga_client.RengaConnectionClient(port=port)
-            
-            if not client.is_server_reachable():
+            if _server_down(port):
                 self.outputs['Success'].sv_set([[]])
                 self.outputs['Message'].sv_set([["Renga Connect is not connected. Connect to Renga first."]])
                 self.outputs['ColumnGuids'].sv_set([[]])
                 return
             
-            # Prepare command
-            message = create_update_points_message(points, heights)
-            
-            # Send command
-            try:
-                response = client.send(message)
-            except Exception as e:
-                self.outputs['Success'].sv_set([[False] * len(points)])
-                self.outputs['Message'].sv_set([[f"Error: {str(e)}"] * len(points)])
-                self.outputs['ColumnGuids'].sv_set([[""] * len(points)])
+            if self.background and renga_jobs is not None:
+                self._process_background(should_update, port, points, heights)
                 return
             
-            # Parse response
-            successes = []
-            messages = []
-            column_guids = []
-            
-            if not response or not response.get('success', False):
-                error_msg = response.get('error', 'Failed to send data to Renga') if response else 'No response'
-                for _ in points:
-                    successes.append(False)
-                    messages.append(error_msg)
-                    column_guids.append("")
-            else:
-                try:
-                    results = response.get('data', {}).get('results', [])
-                    
-                    if results and len(results) == len(points):
-                        for result in results:
-                            success = result.get('success', False)
-                            result_message = result.get('message', 'Unknown')
-                            column_id = result.get('columnId', '')
-                            
-                            successes.append(success)
-                            messages.append(result_message)
-                            column_guids.append(str(column_id) if column_id else "")
-                            
-                            # Update mapping
-                            if success and column_id:
-                                point_guid = result.get('grasshopperGuid')
-                                if point_guid:
-                                    update_mapping(point_guid, column_id)
-                    else:
-                        for _ in points:
-                            successes.append(False)
-                            messages.append("Invalid response format from Renga")
-                            column_guids.append("")
-                except Exception as e:
-                    for _ in points:
-                        successes.append(False)
-                        messages.append(f"Error parsing response: {str(e)}")
-                        column_guids.append("")
+            # Only process if Update trigger occurred
+            if not should_update:
+                self.outputs['Success'].sv_set([[]])
+                self.outputs['Message'].sv_set([["Set Update to True to send points to Renga"]])
+                self.outputs['ColumnGuids'].sv_set([[]])
+                return
             
-            self.outputs['Success'].sv_set([successes])
-            self.outputs['Message'].sv_set([messages])
-            self.outputs['ColumnGuids'].sv_set([column_guids])
+            self._set_outputs(*send_points(port, points, heights, self._snapshot(port), _window_progress(),
+                                          self._persist_path(port)))
         except Exception as e:
             print(f"ERROR in SvRengaCreateColumnsNode.process(): {e}")
             import traceback
@@ -289,6 +359,291 @@ class SvRengaCreateColumnsNode(SverchCustomTreeNode, bpy.types.Node):
                 self.outputs['ColumnGuids'].sv_set([[]])
             except:
                 pass
+    
+    def _process_background(self, should_update, port, points, heights):
+        """
+        Background mode: the request runs in a worker thread, the node shows
+        "pending" and is re-triggered by a timer when the result is ready
+        """
+        runner = renga_jobs.get_runner()
+        key = self.node_id
+        
+        if should_update:
+            # Jobs of one node run in order, so a newer batch sees the
+            # column ids created by the previous one
+            runner.submit(key, send_points, port, list(points), list(heights), self._snapshot(port),
+                          persist_path=self._persist_path(port),
+                          on_ready=renga_jobs.retrigger_node(self), with_progress=True)
+            self.outputs['Success'].sv_set([[]])
+            self.outputs['Message'].sv_set([["Pending: sending points to Renga..."]])
+            self.outputs['ColumnGuids'].sv_set([[]])
+            return
+        
+        job = runner.take(key)
+        if job is not None:
+            if job.error is not None:
+                self._set_outputs([False] * len(points), [f"Error: {str(job.error)}"] * len(points), [""] * len(points))
+            else:
+                self._set_outputs(*job.result)
+            return
+        
+        self.outputs['Success'].sv_set([[]])
+        if runner.state(key) == renga_jobs.JOB_PENDING:
+            progress = runner.progress(key)
+            if progress is not None:
+                self.outputs['Message'].sv_set([[f"Pending: sending points to Renga ({progress[0]}/{progress[1]})..."]])
+            else:
+                self.outputs['Message'].sv_set([["Pending: sending points to Renga..."]])
+        else:
+            self.outputs['Message'].sv_set([["Set Update to True to send points to Renga"]])
+        self.outputs['ColumnGuids'].sv_set([[]])
+    
+    def _snapshot(self, port):
+        if not self.only_changes:
+            self.sv_free()
+            return None
+        snapshot = _get_snapshot(self.node_id, port)
+        if not len(snapshot) and not snapshot.order:
+            self._restore_snapshot(snapshot, port)
+        return snapshot
+    
+    def _cache_dirs(self):
+        """Snapshot directories: next to the .blend (if saved), then the user cache dir"""
+        dirs = [model_cache.cache_dir(bpy.data.filepath)] if bpy.data.filepath else []
+        dirs.append(model_cache.cache_dir())
+        return dirs
+    
+    def _persist_path(self, port):
+        """Where send_points saves the snapshot; None - not kept on disk"""
+        if not (self.only_changes and self.keep_on_disk):
+            # Columns sent meanwhile would be missing from the file
+            if self.column_file:
+                self.column_file = ''
+            return None
+        name = column_snapshot.snapshot_name(self.node_id, port)
+        if self.column_file != name:
+            self.column_file = name
+        return os.path.join(self._cache_dirs()[0], name)
+    
+    def _restore_snapshot(self, snapshot, port):
+        """Fill an empty snapshot from the file of the last sync (with this port)"""
+        if not (self.keep_on_disk and self.column_file):
+            return
+        if self.column_file != column_snapshot.snapshot_name(self.node_id, port):
+            # Columns on another Renga instance
+            return
+        path = model_cache.find(self.column_file, self._cache_dirs())
+        if path is None or not restore_snapshot(snapshot, path):
+            self.column_file = ''
+    
+    def sv_free(self):
+        """Node removed: drop its column snapshot"""
+        for key in [k for k in _column_snapshots if k[0] == self.node_id]:
+            del _column_snapshots[key]
+    
+    def _set_outputs(self, successes, messages, column_guids):
+        """Set per-point outputs"""
+        self.outputs['Success'].sv_set([successes])
+        self.outputs['Message'].sv_set([messages])
+        self.outputs['ColumnGuids'].sv_set([column_guids])
+
+
+def send_points(port, points, heights, snapshot=None, progress=None, persist_path=None):
+    """
+    Send points to Renga and collect per-point results
+    
+    Touches no Blender data, so it can run in a worker thread. The point
+    mapping is updated after every request, so column ids are kept even
+    when a later request fails or a newer one makes the node drop this result.
+    
+    Args:
+        snapshot: ColumnSnapshot of the node - only the difference to it is
+            sent (points removed since the last sync delete their columns);
+            None - every point is sent
+        progress: called with an (items sent, items) tuple after every request
+        persist_path: save the snapshot there after a change
+            (see column_snapshot.save)
+    
+    Returns:
+        tuple: (successes, messages, column_guids)
+    """
+    guids = _get_point_guids(points)
+    if snapshot is not None:
+        return _send_changes(port, guids, points, heights, snapshot, progress, persist_path)
+    
+    results, _ = _send_chunks(port, guids, points, heights, progress=progress)
+    successes = [bool(result.get('success', False)) for result in results]
+    messages = [result.get('message', 'Unknown') for result in results]
+    column_guids = [str(result.get('columnId')) if result.get('columnId') else "" for result in results]
+    return (successes, messages, column_guids)
+
+
+def _window_progress():
+    """progress callback for send_points that drives Blender's cursor progress"""
+    try:
+        window_manager = bpy.context.window_manager
+    except AttributeError:
+        return None
+    if window_manager is None:
+        return None
+    started = []
+    
+    def progress(value):
+        done, total = value
+        if not started:
+            window_manager.progress_begin(0, total)
+            started.append(total)
+        window_manager.progress_update(done)
+        if done >= total:
+            window_manager.progress_end()
+    
+    return progress
+
+
+def _send_changes(port, guids, points, heights, snapshot, progress=None, persist_path=None):
+    """send_points against a snapshot: only the diff is sent, or nothing"""
+    if not snapshot.checked:
+        _check_project(port, snapshot)
+    plan = snapshot.diff(guids, points, heights)
+    if plan.empty:
+        reordered = snapshot.order != guids
+        outputs = snapshot.apply(plan, [])
+        if reordered and persist_path is not None:
+            _save_snapshot(snapshot, persist_path)
+        return outputs
+    
+    results, deleted = _send_chunks(
+        port, [guids[i] for i in plan.send], [points[i] for i in plan.send],
+        [heights[i] for i in plan.send], plan.column_ids, plan.deletions, progress)
+    for result in results:
+        point_guid = result.get('grasshopperGuid')
+        if result.get('success', False) and result.get('columnId') and point_guid in plan.moved:
+            # The old GUID's column is this point's now
+            update_mapping(plan.moved[point_guid], None)
+    outputs = snapshot.apply(plan, results, deleted)
+    if persist_path is not None:
+        _save_snapshot(snapshot, persist_path)
+    return outputs
+
+
+def _check_project(port, snapshot):
+    """
+    Compare the project of a snapshot (restored from disk, or new) with the
+    project open in Renga: the column ids of another project would move or
+    delete unrelated columns there, so such a snapshot is dropped and its
+    points are created anew
+    """
+    project = renga_client.RengaConnectionClient(port=port).open_project()
+    if project is None:
+        # Not reachable, or a plugin that doesn't report its project
+        return
+    if snapshot.project is not None and snapshot.project != project:
+        print("Renga Create Columns: the column snapshot belongs to another project, ignoring it")
+        with _point_lock:
+            for guid in snapshot.columns:
+                update_mapping(guid, None)
+        snapshot.clear()
+    snapshot.project = project
+    snapshot.checked = True
+
+
+def _save_snapshot(snapshot, path):
+    try:
+        column_snapshot.save(snapshot, path)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Renga Create Columns: could not save column snapshot: {e}")
+
+
+def _failed_result(point_guid, error_msg):
+    return {"success": False, "message": error_msg, "columnId": None, "grasshopperGuid": point_guid}
+
+
+def _send_chunks(port, guids, points, heights, column_ids=None, deletions=(), progress=None):
+    """
+    update_points in requests of at most UPDATE_CHUNK_POINTS points and
+    deletions and UPDATE_CHUNK_BYTES, sent one after another
+    
+    Deletions go after the points. After a failed request the rest is not
+    sent: its points get the same error.
+    
+    Args:
+        guids: point GUID of every point
+        column_ids: rengaColumnGuid of every point, None - from the mapping
+        deletions: (point GUID, column id) of columns to delete
+        progress: called with an (items sent, items) tuple after every request
+    
+    Returns:
+        tuple: (results, deleted) - one result dict per point and per
+            deletion, in input order
+    """
+    client = renga_client.RengaConnectionClient(port=port)
+    count = len(points)
+    total = count + len(deletions)
+    results = []
+    deleted = []
+    error_msg = None
+    for start, end in _chunk_ranges(guids, column_ids, deletions):
+        p0, p1 = min(start, count), min(end, count)
+        d0, d1 = max(start, count) - count, max(end, count) - count
+        if error_msg is None:
+            message = create_update_points_message(
+                points[p0:p1], heights[p0:p1], column_ids[p0:p1] if column_ids else None, deletions[d0:d1],
+                guids[p0:p1])
+            response = client.send(message)
+            data = (response.get('data') or {}) if response and response.get('success', False) else None
+            chunk_results = data.get('results') if data is not None else None
+            if data is None:
+                error_msg = response.get('error', 'Failed to send data to Renga') if response else 'No response'
+            elif not isinstance(chunk_results, list) or len(chunk_results) != p1 - p0:
+                error_msg = "Invalid response format from Renga"
+        if error_msg is not None:
+            results.extend(_failed_result(guids[i], error_msg) for i in range(p0, p1))
+            deleted.extend(_failed_result(deletions[i][0], error_msg) for i in range(d0, d1))
+            if progress is not None:
+                progress((end, total))
+            continue
+        
+        chunk_deleted = data.get('deleted')
+        if not isinstance(chunk_deleted, list) or len(chunk_deleted) != d1 - d0:
+            # Plugin without delete support: the columns stay
+            chunk_deleted = [_failed_result(deletions[i][0], "Renga did not delete the column")
+                             for i in range(d0, d1)]
+        for result in chunk_results:
+            if result.get('success', False) and result.get('columnId') and result.get('grasshopperGuid'):
+                update_mapping(result['grasshopperGuid'], result['columnId'])
+        for (point_guid, _), result in zip(deletions[d0:d1], chunk_deleted):
+            if result.get('success', False):
+                update_mapping(point_guid, None)
+        results.extend(chunk_results)
+        deleted.extend(chunk_deleted)
+        if progress is not None:
+            progress((end, total))
+    return results, deleted
+
+
+def _chunk_ranges(guids, column_ids=None, deletions=()):
+    """
+    (start, end) ranges of the combined sequence points + deletions, each
+    within UPDATE_CHUNK_POINTS items and UPDATE_CHUNK_BYTES estimated bytes
+    """
+    count = len(guids)
+    total = count + len(deletions)
+    ranges = []
+    start = size = 0
+    for n in range(total):
+        if n < count:
+            point_guid = guids[n]
+            column_id = column_ids[n] if column_ids and column_ids[n] else _point_guid_map.get(point_guid)
+        else:
+            point_guid, column_id = deletions[n - count]
+        item = UPDATE_ITEM_BYTES + len(point_guid) + len(str(column_id or ''))
+        if n > start and (n - start >= UPDATE_CHUNK_POINTS or size + item > UPDATE_CHUNK_BYTES):
+            ranges.append((start, n))
+            start, size = n, 0
+        size += item
+    if start < total:
+        ranges.append((start, total))
+    return ranges
 
 
 def register():
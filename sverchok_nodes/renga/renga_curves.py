@@ -0,0 +1,456 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Baseline curves of Renga walls
+
+SvRengaPolyline is a piecewise-linear Sverchok curve built in one step from
+an (N, 3) point array. It replaces one SvLine per segment merged with
+concatenate_curves: same parametrization (segment i spans [i, i + 1]), but
+one object per wall and vectorized evaluation over parameter arrays.
+
+Baselines sent with analytic parameters ("arc" of an Arc baseline,
+"segments" of a PolyCurve) become SvRengaArc / SvRengaPolyCurve via
+analytic_curve(): exact circular arcs, or polylines within a chord
+tolerance that are tessellated on first evaluation. All three convert with
+to_nurbs(); an exact arc becomes a rational degree 2 NURBS.
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from sverchok.utils.curve.core import SvCurve
+    SVERCHOK_CURVES_AVAILABLE = True
+except ImportError:
+    # Without Sverchok the curves still evaluate (scripts, benchmarks)
+    SvCurve = object
+    SVERCHOK_CURVES_AVAILABLE = False
+
+
+class SvRengaPolyline(SvCurve):
+    """
+    Polyline through points; t in [0, N - 1], segment i spans [i, i + 1]
+
+    Args:
+        points: (N, 3) array-like, N >= 2
+    """
+
+    __description__ = "Renga Polyline"
+
+    def __init__(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if len(points) < 2:
+            raise ValueError("Polyline needs at least 2 points")
+        self.points = points
+        self.segments = np.diff(points, axis=0)
+        self.u_bounds = (0.0, float(len(points) - 1))
+
+    def get_u_bounds(self):
+        return self.u_bounds
+
+    def get_degree(self):
+        return 1
+
+    def get_end_points(self):
+        return self.points[0], self.points[-1]
+
+    def is_closed(self, *args):
+        return bool(np.allclose(self.points[0], self.points[-1]))
+
+    def get_control_points(self):
+        return self.points
+
+    def _locate(self, ts):
+        """Segment index and parameter within the segment for every t"""
+        ts = np.asarray(ts, dtype=np.float64)
+        index = np.clip(np.floor(ts).astype(np.int64), 0, len(self.segments) - 1)
+        return index, ts - index
+
+    def evaluate(self, t):
+        return self.evaluate_array(np.array([t]))[0]
+
+    def evaluate_array(self, ts):
+        index, local = self._locate(ts)
+        return self.points[index] + local[:, np.newaxis] * self.segments[index]
+
+    def tangent(self, t, tangent_delta=None):
+        return self.tangent_array(np.array([t]))[0]
+
+    def tangent_array(self, ts, tangent_delta=None):
+        index, _ = self._locate(ts)
+        return self.segments[index]
+
+    def second_derivative(self, t, tangent_delta=None):
+        return np.zeros(3)
+
+    def second_derivative_array(self, ts, tangent_delta=None):
+        return np.zeros((len(ts), 3))
+
+    def third_derivative_array(self, ts, tangent_delta=None):
+        return np.zeros((len(ts), 3))
+
+    def derivatives_array(self, n, ts, tangent_delta=None):
+        result = [self.tangent_array(ts)]
+        if n >= 2:
+            result.append(self.second_derivative_array(ts))
+        if n >= 3:
+            result.append(self.third_derivative_array(ts))
+        return result[:n]
+
+    def length(self):
+        return float(np.linalg.norm(self.segments, axis=1).sum())
+
+    def nurbs_data(self):
+        """(degree, knotvector, control points, weights): degree 1, same parametrization"""
+        count = len(self.points)
+        knotvector = np.concatenate(([0.0], np.arange(count, dtype=np.float64), [count - 1.0]))
+        return 1, knotvector, self.points, np.ones(count)
+
+    def to_nurbs(self, implementation=None):
+        """Degree 1 NURBS with the same parametrization"""
+        return _build_nurbs(self.nurbs_data(), implementation)
+
+
+class SvRengaArc(SvCurve):
+    """
+    Circular arc in a plane z = const; t in [0, 1]
+
+    Args:
+        center: (x, y, z)
+        radius: arc radius
+        start_angle, end_angle: radians; end_angle - start_angle is the
+            signed sweep (negative - clockwise)
+        chord_tolerance: None - exact arc; otherwise the arc evaluates as a
+            polyline whose chords deviate from it by at most this distance
+    """
+
+    __description__ = "Renga Arc"
+
+    def __init__(self, center, radius, start_angle, end_angle, chord_tolerance=None):
+        self.center = np.asarray(center, dtype=np.float64).reshape(3)
+        self.radius = float(radius)
+        self.start_angle = float(start_angle)
+        self.end_angle = float(end_angle)
+        self.sweep = self.end_angle - self.start_angle
+        self.chord_tolerance = chord_tolerance
+        self.u_bounds = (0.0, 1.0)
+        self._polyline = None
+
+    @classmethod
+    def from_data(cls, arc, chord_tolerance=None):
+        """Arc from the "arc" dict of a baseline (center, radius, startAngle, endAngle)"""
+        center = arc['center']
+        return cls((center.get('x', 0), center.get('y', 0), center.get('z', 0)),
+                   arc['radius'], arc['startAngle'], arc['endAngle'], chord_tolerance)
+
+    def get_u_bounds(self):
+        return self.u_bounds
+
+    def get_degree(self):
+        return 1 if self.chord_tolerance else 2
+
+    def get_end_points(self):
+        return self._exact(np.array([0.0, 1.0]))
+
+    def is_closed(self, *args):
+        return abs(abs(self.sweep) - 2 * math.pi) < 1e-9
+
+    def segment_count(self, chord_tolerance):
+        """Chords needed to stay within chord_tolerance of the arc"""
+        if chord_tolerance <= 0 or self.radius <= 0:
+            raise ValueError("Chord tolerance and radius must be positive")
+        if chord_tolerance >= self.radius:
+            max_angle = math.pi
+        else:
+            max_angle = 2 * math.acos(1 - chord_tolerance / self.radius)
+        return max(1, int(math.ceil(abs(self.sweep) / max_angle - 1e-9)))
+
+    def tessellate(self, chord_tolerance):
+        """(N, 3) points of the arc, N - 1 chords within chord_tolerance"""
+        count = self.segment_count(chord_tolerance)
+        return self._exact(np.linspace(0.0, 1.0, count + 1))
+
+    @property
+    def polyline(self):
+        """Tessellated arc, built on first use (chord_tolerance mode)"""
+        if self._polyline is None:
+            self._polyline = SvRengaPolyline(self.tessellate(self.chord_tolerance))
+        return self._polyline
+
+    def _exact(self, ts):
+        angles = self.start_angle + self.sweep * np.asarray(ts, dtype=np.float64)
+        points = np.empty((len(angles), 3))
+        points[:, 0] = self.center[0] + self.radius * np.cos(angles)
+        points[:, 1] = self.center[1] + self.radius * np.sin(angles)
+        points[:, 2] = self.center[2]
+        return points
+
+    def evaluate(self, t):
+        return self.evaluate_array(np.array([t]))[0]
+
+    def evaluate_array(self, ts):
+        ts = np.asarray(ts, dtype=np.float64)
+        if self.chord_tolerance:
+            polyline = self.polyline
+            return polyline.evaluate_array(ts * polyline.u_bounds[1])
+        return self._exact(ts)
+
+    def tangent(self, t, tangent_delta=None):
+        return self.tangent_array(np.array([t]))[0]
+
+    def tangent_array(self, ts, tangent_delta=None):
+        ts = np.asarray(ts, dtype=np.float64)
+        if self.chord_tolerance:
+            polyline = self.polyline
+            scale = polyline.u_bounds[1]
+            return polyline.tangent_array(ts * scale) * scale
+        angles = self.start_angle + self.sweep * ts
+        factor = self.radius * self.sweep
+        return np.stack((-factor * np.sin(angles), factor * np.cos(angles), np.zeros(len(angles))), axis=1)
+
+    def second_derivative(self, t, tangent_delta=None):
+        return self.second_derivative_array(np.array([t]))[0]
+
+    def second_derivative_array(self, ts, tangent_delta=None):
+        ts = np.asarray(ts, dtype=np.float64)
+        if self.chord_tolerance:
+            return np.zeros((len(ts), 3))
+        angles = self.start_angle + self.sweep * ts
+        factor = self.radius * self.sweep ** 2
+        return np.stack((-factor * np.cos(angles), -factor * np.sin(angles), np.zeros(len(angles))), axis=1)
+
+    def third_derivative_array(self, ts, tangent_delta=None):
+        ts = np.asarray(ts, dtype=np.float64)
+        if self.chord_tolerance:
+            return np.zeros((len(ts), 3))
+        angles = self.start_angle + self.sweep * ts
+        factor = self.radius * self.sweep ** 3
+        return np.stack((factor * np.sin(angles), -factor * np.cos(angles), np.zeros(len(angles))), axis=1)
+
+    def derivatives_array(self, n, ts, tangent_delta=None):
+        result = [self.tangent_array(ts)]
+        if n >= 2:
+            result.append(self.second_derivative_array(ts))
+        if n >= 3:
+            result.append(self.third_derivative_array(ts))
+        return result[:n]
+
+    def length(self):
+        if self.chord_tolerance:
+            return self.polyline.length()
+        return abs(self.sweep) * self.radius
+
+    def nurbs_data(self):
+        """
+        (degree, knotvector, control points, weights) on t in [0, 1]
+
+        Exact arc: rational degree 2, one span per quarter turn at most.
+        The ends and span joints match the arc, in between the NURBS
+        parameter is not proportional to the angle.
+        chord_tolerance mode: the tessellated polyline, same parametrization.
+        """
+        if self.chord_tolerance:
+            degree, knotvector, points, weights = self.polyline.nurbs_data()
+            return degree, knotvector / knotvector[-1], points, weights
+        spans = max(1, int(math.ceil(abs(self.sweep) / (math.pi / 2) - 1e-9)))
+        half = self.sweep / spans / 2
+        ends = self._exact(np.linspace(0.0, 1.0, spans + 1))
+        points = np.empty((2 * spans + 1, 3))
+        points[0::2] = ends
+        # Middle control point of a span: the tangents at its ends meet there
+        middle = self.start_angle + half * (2 * np.arange(spans) + 1)
+        distance = self.radius / math.cos(half)
+        points[1::2, 0] = self.center[0] + distance * np.cos(middle)
+        points[1::2, 1] = self.center[1] + distance * np.sin(middle)
+        points[1::2, 2] = self.center[2]
+        weights = np.ones(2 * spans + 1)
+        weights[1::2] = math.cos(half)
+        joints = np.repeat(np.arange(1, spans) / spans, 2)
+        knotvector = np.concatenate(([0.0] * 3, joints, [1.0] * 3))
+        return 2, knotvector, points, weights
+
+    def to_nurbs(self, implementation=None):
+        """NURBS of the arc, see nurbs_data()"""
+        return _build_nurbs(self.nurbs_data(), implementation)
+
+
+class SvRengaPolyCurve(SvCurve):
+    """
+    Chain of curves with unit parameter ranges; segment i spans [i, i + 1]
+
+    Args:
+        segments: curves with u_bounds (0, 1) (2-point SvRengaPolyline, SvRengaArc)
+    """
+
+    __description__ = "Renga PolyCurve"
+
+    def __init__(self, segments):
+        if not segments:
+            raise ValueError("PolyCurve needs at least 1 segment")
+        self.segments = list(segments)
+        self.u_bounds = (0.0, float(len(self.segments)))
+
+    def get_u_bounds(self):
+        return self.u_bounds
+
+    def get_degree(self):
+        return max(segment.get_degree() for segment in self.segments)
+
+    def get_end_points(self):
+        return self.segments[0].get_end_points()[0], self.segments[-1].get_end_points()[1]
+
+    def is_closed(self, *args):
+        begin, end = self.get_end_points()
+        return bool(np.allclose(begin, end))
+
+    def _apply(self, method, ts):
+        ts = np.asarray(ts, dtype=np.float64)
+        index = np.clip(np.floor(ts).astype(np.int64), 0, len(self.segments) - 1)
+        local = ts - index
+        result = np.empty((len(ts), 3))
+        for i in np.unique(index):
+            mask = index == i
+            result[mask] = getattr(self.segments[i], method)(local[mask])
+        return result
+
+    def evaluate(self, t):
+        return self.evaluate_array(np.array([t]))[0]
+
+    def evaluate_array(self, ts):
+        return self._apply('evaluate_array', ts)
+
+    def tangent(self, t, tangent_delta=None):
+        return self.tangent_array(np.array([t]))[0]
+
+    def tangent_array(self, ts, tangent_delta=None):
+        return self._apply('tangent_array', ts)
+
+    def second_derivative(self, t, tangent_delta=None):
+        return self.second_derivative_array(np.array([t]))[0]
+
+    def second_derivative_array(self, ts, tangent_delta=None):
+        return self._apply('second_derivative_array', ts)
+
+    def third_derivative_array(self, ts, tangent_delta=None):
+        return self._apply('third_derivative_array', ts)
+
+    def derivatives_array(self, n, ts, tangent_delta=None):
+        result = [self.tangent_array(ts)]
+        if n >= 2:
+            result.append(self.second_derivative_array(ts))
+        if n >= 3:
+            result.append(self.third_derivative_array(ts))
+        return result[:n]
+
+    def length(self):
+        return sum(segment.length() for segment in self.segments)
+
+    def nurbs_data(self):
+        """
+        (degree, knotvector, control points, weights): the NURBS of the
+        segments joined at the integer parameters; line segments are raised
+        to degree 2 when the chain has exact arcs
+        """
+        degree = self.get_degree()
+        knots, points, weights = [], [], []
+        for i, segment in enumerate(self.segments):
+            data = segment.nurbs_data()
+            if data[0] < degree:
+                data = _elevate_linear(data)
+            segment_knots = data[1] + i
+            if i == 0:
+                knots.append(segment_knots[:-1])
+                points.append(data[2])
+                weights.append(data[3])
+            else:
+                # The end knots of two segments merge into one joint of
+                # multiplicity degree, the shared end point is kept once
+                knots.append(segment_knots[degree + 1:-1])
+                points.append(data[2][1:])
+                weights.append(data[3][1:])
+        knots.append([float(len(self.segments))])
+        return degree, np.concatenate(knots), np.concatenate(points), np.concatenate(weights)
+
+    def to_nurbs(self, implementation=None):
+        """NURBS of the chain, same segment ranges [i, i + 1], see nurbs_data()"""
+        return _build_nurbs(self.nurbs_data(), implementation)
+
+
+def _elevate_linear(data):
+    """Degree 1 NURBS data as degree 2: a middle control point per span"""
+    _, knotvector, points, _ = data
+    count = len(points)
+    elevated = np.empty((2 * count - 1, 3))
+    elevated[0::2] = points
+    elevated[1::2] = (points[:-1] + points[1:]) / 2
+    knotvector = np.concatenate(([knotvector[0]], np.repeat(knotvector[1:-1], 2), [knotvector[-1]]))
+    return 2, knotvector, elevated, np.ones(len(elevated))
+
+
+def _build_nurbs(data, implementation=None):
+    from sverchok.utils.curve.nurbs import SvNurbsCurve
+    from sverchok.utils.nurbs_common import SvNurbsMaths
+    if implementation is None:
+        implementation = SvNurbsMaths.NATIVE
+    degree, knotvector, points, weights = data
+    return SvNurbsCurve.build(implementation, degree, knotvector, points, weights)
+
+
+def sample_points(curve, count=65):
+    """Points of curve at count evenly spaced parameters, as lists"""
+    return curve.evaluate_array(np.linspace(*curve.get_u_bounds(), count)).tolist()
+
+
+def _point(obj):
+    return (obj.get('x', 0), obj.get('y', 0), obj.get('z', 0))
+
+
+def _segment_curve(segment, chord_tolerance):
+    """Curve of a LineSegment or Arc described by parameters, else None"""
+    arc = segment.get('arc')
+    if arc:
+        return SvRengaArc.from_data(arc, chord_tolerance)
+    if segment.get('type', '').endswith('LineSegment'):
+        start, end = segment.get('startPoint'), segment.get('endPoint')
+        if start and end:
+            return SvRengaPolyline([_point(start), _point(end)])
+    return None
+
+
+def analytic_curve(baseline, chord_tolerance=None):
+    """
+    Curve built from the analytic parameters of a baseline
+
+    Args:
+        baseline: baseline dict of a wall
+        chord_tolerance: None - exact arcs; otherwise arcs are tessellated
+            (on first evaluation) within this chord tolerance
+
+    Returns:
+        SvRengaArc, SvRengaPolyline, SvRengaPolyCurve or None when the
+        baseline has no (complete) analytic description
+    """
+    segments = baseline.get('segments')
+    if segments:
+        curves = [_segment_curve(segment, chord_tolerance) for segment in segments]
+        if any(curve is None for curve in curves):
+            return None
+        return curves[0] if len(curves) == 1 else SvRengaPolyCurve(curves)
+    return _segment_curve(baseline, chord_tolerance)
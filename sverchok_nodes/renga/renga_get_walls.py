@@ -23,7 +23,7 @@ Similar to RengaGetWallsComponent in Grasshopper
 """
 
 import bpy
-from bpy.props import BoolProperty
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, IntProperty, StringProperty
 from mathutils import Vector
 from sverchok.node_tree import SverchCustomTreeNode
 from sverchok.data_structure import updateNode
@@ -53,12 +53,107 @@ except ImportError:
     except:
         renga_client = None
 
+try:
+    import renga_jobs
+except ImportError:
+    renga_jobs = None
+
+try:
+    import connection_monitor
+except ImportError:
+    connection_monitor = None
+
+import walls_decoder
+import wall_cache
+import renga_curves
+import spatial_index
+import model_cache
+
+try:
+    import parallel_decode
+except ImportError:
+    parallel_decode = None
+
+# Key of the mesh arrays of a batch decoded in the process pool
+_MESH_ARRAYS = parallel_decode.MESH_ARRAYS if parallel_decode is not None else 'meshArrays'
+
+# (node_id, port, options) -> WallCache of an incremental Get Walls node
+_wall_caches = {}
+# node_id -> copy of the WallCache updated by the background job in flight
+_job_caches = {}
+
+
+# Output socket -> attribute column
+_COLUMN_OUTPUTS = (
+    ('Ids', 'id'),
+    ('Names', 'name'),
+    ('Positions', 'position'),
+    ('Heights', 'height'),
+    ('Thicknesses', 'thickness'),
+)
+
+
+def _install_wall_cache(node_id, port, cache):
+    """
+    Put the cache updated by a background job in place of the node's cache,
+    unless the port or the options changed while the job was running
+    """
+    key = (node_id, port, cache.options)
+    if key in _wall_caches:
+        _wall_caches[key] = cache
+
+
+def _get_wall_cache(node_id, port, options=None):
+    """WallCache of a node; options - settings that change the cached data"""
+    key = (node_id, port, options)
+    cache = _wall_caches.get(key)
+    if cache is None:
+        # Port or options changed, or first run: forget caches of this node
+        for other in [k for k in _wall_caches if k[0] == node_id]:
+            del _wall_caches[other]
+        cache = _wall_caches[key] = wall_cache.WallCache(options)
+    return cache
+
+
+def _server_down(port):
+    """Cached heartbeat state of the Connect node; never probes the server"""
+    if connection_monitor is None:
+        return False
+    return connection_monitor.get_state(port=port) == connection_monitor.STATE_DOWN
+
+# Walls per streamed frame: keeps every frame far below the frame size limit
+STREAM_BATCH_SIZE = 256
+
 # Встроенная функция create_get_walls_message (чтобы не зависеть от commands)
-def create_get_walls_message():
+def create_get_walls_message(stream=False, batch_size=None, delta=False, since=None, analytic_curves=False,
+                             fields=None, baseline_samples=None, bbox=None, level_id=None):
+    data = {}
+    if stream:
+        data["stream"] = True
+        if batch_size:
+            data["batchSize"] = int(batch_size)
+    if delta:
+        data["delta"] = True
+        if since:
+            data["since"] = since
+    if analytic_curves:
+        data["analyticCurves"] = True
+    if fields is not None:
+        data["fields"] = list(fields)
+    if baseline_samples:
+        data["baselineSamples"] = int(baseline_samples)
+    if bbox is not None:
+        lower, upper = bbox
+        data["bbox"] = {
+            "min": {"x": float(lower[0]), "y": float(lower[1]), "z": float(lower[2])},
+            "max": {"x": float(upper[0]), "y": float(upper[1]), "z": float(upper[2])},
+        }
+    if level_id is not None:
+        data["levelId"] = int(level_id)
     return {
         "id": str(uuid.uuid4()),
         "command": "get_walls",
-        "data": {},
+        "data": data,
         "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
     }
 
@@ -66,7 +161,6 @@ def create_get_walls_message():
 try:
     from sverchok.utils.curve.primitives import SvLine
     from sverchok.utils.curve.splines import SvSplineCurve
-    from sverchok.utils.curve.algorithms import concatenate_curves
     CURVE_UTILS_AVAILABLE = True
 except ImportError:
     CURVE_UTILS_AVAILABLE = False
@@ -91,22 +185,177 @@ class SvRengaGetWallsNode(SverchCustomTreeNode, bpy.types.Node):
         update=updateNode
     )
     
+    background: BoolProperty(
+        name='Background',
+        description='Run the request in a worker thread so Blender stays responsive',
+        default=True,
+        update=updateNode
+    )
+    
+    incremental: BoolProperty(
+        name='Incremental',
+        description='Download only walls changed since the last update',
+        default=True,
+        update=updateNode
+    )
+    
+    weld: BoolProperty(
+        name='Weld',
+        description='Merge coincident vertices of all grids and walls',
+        default=False,
+        update=updateNode
+    )
+    
+    weld_tolerance: FloatProperty(
+        name='Tolerance',
+        description='Vertices are snapped to a grid of this size (model units, mm) and '
+                    'merged per grid cell; close vertices on either side of a cell '
+                    'boundary stay apart',
+        default=0.1,
+        min=0.0,
+        precision=3,
+        update=updateNode
+    )
+    
+    output_numpy: BoolProperty(
+        name='Output NumPy',
+        description='Output vertices and faces as NumPy arrays',
+        default=False,
+        update=updateNode
+    )
+    
+    include_attributes: BoolProperty(
+        name='Attributes',
+        description='Get name, position, height and thickness of walls',
+        default=True,
+        update=updateNode
+    )
+    
+    include_baselines: BoolProperty(
+        name='Baselines',
+        description='Get wall baselines',
+        default=True,
+        update=updateNode
+    )
+    
+    include_meshes: BoolProperty(
+        name='Meshes',
+        description='Get wall meshes (the largest part of the reply)',
+        default=True,
+        update=updateNode
+    )
+    
+    baseline_samples: IntProperty(
+        name='Baseline Samples',
+        description='Points per curved baseline segment; 0 - server default',
+        default=0,
+        min=0,
+        update=updateNode
+    )
+    
+    level_id: IntProperty(
+        name='Level',
+        description='Only walls on the level with this id; 0 - all levels',
+        default=0,
+        min=0,
+        update=updateNode
+    )
+    
+    arc_mode: EnumProperty(
+        name='Arcs',
+        description='How arc baselines are built',
+        items=[
+            ('SAMPLED', 'Sampled', 'Polyline through the points sampled by Renga'),
+            ('EXACT', 'Exact', 'Exact circular arcs from the arc parameters'),
+            ('TESSELLATE', 'Tessellate', 'Polyline within the chord tolerance, built on first use'),
+        ],
+        default='SAMPLED',
+        update=updateNode
+    )
+    
+    chord_tolerance: FloatProperty(
+        name='Chord Tolerance',
+        description='Largest distance between a tessellated arc and the exact one (model units, mm)',
+        default=10.0,
+        min=0.001,
+        update=updateNode
+    )
+    
+    split_walls: BoolProperty(
+        name='Per Wall',
+        description='Output one mesh per wall instead of one shared mesh',
+        default=False,
+        update=updateNode
+    )
+    
+    decode_workers: IntProperty(
+        name='Decode Processes',
+        description='Decode large replies in this many processes; 0 - in the request thread',
+        default=0,
+        min=0,
+        max=64,
+        update=updateNode
+    )
+    
+    keep_on_disk: BoolProperty(
+        name='Keep on Disk',
+        description='Save the fetched model next to the .blend: it is restored on reopen '
+                    'and shown while Renga is not reachable',
+        default=True,
+        update=updateNode
+    )
+    
+    # Model file of the last update (model_cache), restored on first run
+    cache_file: StringProperty(default='')
+    
     _last_update_value = False
     
     def sv_init(self, context):
         """Initialize node inputs and outputs"""
         self.inputs.new('SvStringsSocket', 'RengaConnect')
         self.inputs.new('SvStringsSocket', 'Update').prop_name = 'update_trigger'
+        self.inputs.new('SvVerticesSocket', 'Bounds')
         
         self.outputs.new('SvStringsSocket', 'Success')
         self.outputs.new('SvStringsSocket', 'Message')
         self.outputs.new('SvCurveSocket', 'Baselines')
         self.outputs.new('SvVerticesSocket', 'Vertices')
         self.outputs.new('SvStringsSocket', 'Faces')
+        self.outputs.new('SvStringsSocket', 'WallVertexStart')
+        self.outputs.new('SvStringsSocket', 'WallFaceStart')
+        self.outputs.new('SvStringsSocket', 'Ids')
+        self.outputs.new('SvStringsSocket', 'Names')
+        self.outputs.new('SvVerticesSocket', 'Positions')
+        self.outputs.new('SvStringsSocket', 'Heights')
+        self.outputs.new('SvStringsSocket', 'Thicknesses')
     
     def sv_draw_buttons(self, context, layout):
         """Draw node UI"""
         layout.prop(self, 'update_trigger', text='Update')
+        layout.prop(self, 'background', text='Background')
+        layout.prop(self, 'split_walls', text='Per Wall')
+        row = layout.row(align=True)
+        row.prop(self, 'include_attributes', toggle=True)
+        row.prop(self, 'include_baselines', toggle=True)
+        row.prop(self, 'include_meshes', toggle=True)
+        row = layout.row(align=True)
+        row.prop(self, 'weld', text='Weld')
+        if self.weld:
+            row.prop(self, 'weld_tolerance', text='')
+    
+    def sv_draw_buttons_ext(self, context, layout):
+        """Draw node UI in the sidebar"""
+        self.sv_draw_buttons(context, layout)
+        layout.prop(self, 'incremental')
+        if self.incremental:
+            layout.prop(self, 'keep_on_disk')
+        layout.prop(self, 'output_numpy')
+        layout.prop(self, 'decode_workers')
+        layout.prop(self, 'level_id')
+        layout.prop(self, 'baseline_samples')
+        layout.prop(self, 'arc_mode')
+        if self.arc_mode == 'TESSELLATE':
+            layout.prop(self, 'chord_tolerance')
     
     def process(self):
         """Process node"""
@@ -132,109 +381,29 @@ class SvRengaGetWallsNode(SverchCustomTreeNode, bpy.types.Node):
             
             # Create client with port from Connect node or default
             if renga_client is None:
-                self.outputs['Success'].sv_set([[False]])
-                self.outputs['Message'].sv_set([["Renga client module not available"]])
-                self.outputs['Baselines'].sv_set([[]])
-                self.outputs['Vertices'].sv_set([[]])
-                self.outputs['Faces'].sv_set([[]])
+                self._set_outputs(False, "Renga client module not available")
                 return
             
-            client = renga_client.RengaConnectionClient(port=port)
+            if _server_down(port):
+                if not self._set_cached_outputs(port, "Offline: Renga is not reachable, cached model"):
+                    self._set_outputs(False, "Renga Connect is not connected. Connect to Renga first.")
+                return
             
-            if not client.is_server_reachable():
-                self.outputs['Success'].sv_set([[False]])
-                self.outputs['Message'].sv_set([["Renga Connect is not connected. Connect to Renga first."]])
-                self.outputs['Baselines'].sv_set([[]])
-                self.outputs['Vertices'].sv_set([[]])
-                self.outputs['Faces'].sv_set([[]])
+            if self.background and renga_jobs is not None:
+                self._process_background(should_update, port)
                 return
             
             # Only process if Update trigger occurred (False->True)
             if not should_update:
-                self.outputs['Success'].sv_set([[False]])
-                self.outputs['Message'].sv_set([["Set Update to True to get walls from Renga"]])
-                self.outputs['Baselines'].sv_set([[]])
-                self.outputs['Vertices'].sv_set([[]])
-                self.outputs['Faces'].sv_set([[]])
-                return
-            
-            # Prepare command
-            message = create_get_walls_message()
-            
-            # Send command to server
-            try:
-                response = client.send(message)
-            except Exception as e:
-                self.outputs['Success'].sv_set([[False]])
-                self.outputs['Message'].sv_set([[f"Error: {str(e)}"]])
-                self.outputs['Baselines'].sv_set([[]])
-                self.outputs['Vertices'].sv_set([[]])
-                self.outputs['Faces'].sv_set([[]])
+                if not self._set_cached_outputs(port):
+                    self._set_outputs(False, "Set Update to True to get walls from Renga")
                 return
             
-            if not response or not response.get('success', False):
-                error_msg = response.get('error', 'Failed to get walls from Renga or no response') if response else 'No response'
-                self.outputs['Success'].sv_set([[False]])
-                self.outputs['Message'].sv_set([[error_msg]])
-                self.outputs['Baselines'].sv_set([[]])
-                self.outputs['Vertices'].sv_set([[]])
-                self.outputs['Faces'].sv_set([[]])
-                return
-            
-            # Parse response
-            try:
-                walls = response.get('data', {}).get('walls', [])
-                if not walls:
-                    self.outputs['Success'].sv_set([[False]])
-                    self.outputs['Message'].sv_set([["No walls found in response"]])
-                    self.outputs['Baselines'].sv_set([[]])
-                    self.outputs['Vertices'].sv_set([[]])
-                    self.outputs['Faces'].sv_set([[]])
-                    return
-                
-                baselines = []
-                all_verts = []
-                all_faces = []
-                
-                for wall in walls:
-                    wall_id = wall.get('id', 0)
-                    
-                    # Process baseline
-                    baseline_obj = wall.get('baseline')
-                    if baseline_obj:
-                        baseline_curve = self._parse_baseline(baseline_obj)
-                        if baseline_curve:
-                            baselines.append(baseline_curve)
-                    
-                    # Process mesh
-                    mesh_array = wall.get('mesh', [])
-                    if mesh_array:
-                        for mesh_obj in mesh_array:
-                            grids = mesh_obj.get('grids', [])
-                            if grids:
-                                for grid in grids:
-                                    mesh_data = self._parse_mesh(grid)
-                                    if mesh_data:
-                                        verts, faces = mesh_data
-                                        # Accumulate vertices and faces
-                                        base_vert_idx = len(all_verts)
-                                        all_verts.extend(verts)
-                                        # Adjust face indices
-                                        adjusted_faces = [[f[0] + base_vert_idx, f[1] + base_vert_idx, f[2] + base_vert_idx] for f in faces]
-                                        all_faces.extend(adjusted_faces)
-                
-                self.outputs['Success'].sv_set([[True]])
-                self.outputs['Message'].sv_set([[f"Found {len(walls)} walls"]])
-                self.outputs['Baselines'].sv_set(baselines)
-                self.outputs['Vertices'].sv_set([all_verts] if all_verts else [[]])
-                self.outputs['Faces'].sv_set([all_faces] if all_faces else [[]])
-            
-            except Exception as e:
-                self.outputs['Success'].sv_set([[False]])
-                self.outputs['Message'].sv_set([[f"Error parsing response: {str(e)}"]])
-                self.outputs['Baselines'].sv_set([[]])
-                self.outputs['Vertices'].sv_set([[]])
-                self.outputs['Faces'].sv_set([[]])
+            self._set_outputs(*fetch_walls(port, self.output_numpy, self._weld_tolerance(), self._cache(port),
+                                           self.split_walls, self._arc_tolerance(), self._fields(),
+                                           self.baseline_samples, self._bounds(), self._level_id(),
+                                           self._persist_dir(), self.decode_workers))
+            self._remember_cache(port)
         except Exception as e:
             # Catch any unexpected errors to prevent Blender crash
             print(f"ERROR in SvRengaGetWallsNode.process(): {e}")
@@ -242,19 +411,205 @@ class SvRengaGetWallsNode(SverchCustomTreeNode, bpy.types.Node):
             traceback.print_exc()
             # Set safe defaults
             try:
-                self.outputs['Success'].sv_set([[False]])
-                self.outputs['Message'].sv_set([[f"Error: {str(e)}"]])
-                self.outputs['Baselines'].sv_set([[]])
-                self.outputs['Vertices'].sv_set([[]])
-                self.outputs['Faces'].sv_set([[]])
+                self._set_outputs(False, f"Error: {str(e)}")
             except:
                 pass
     
-    def _parse_baseline(self, baseline_obj):
+    def _process_background(self, should_update, port):
+        """
+        Background mode: the request runs in a worker thread, the node shows
+        "pending" and is re-triggered by a timer when the result is ready
+        """
+        runner = renga_jobs.get_runner()
+        key = self.node_id
+        
+        if should_update:
+            # The job updates a copy of the wall cache: the node keeps reading
+            # the current one until the result is taken
+            cache = self._cache(port)
+            job_cache = cache.copy() if cache is not None else None
+            _job_caches[key] = job_cache
+            # A new trigger supersedes a request still in flight
+            runner.submit(key, fetch_walls, port, self.output_numpy, self._weld_tolerance(), job_cache,
+                          self.split_walls, self._arc_tolerance(), self._fields(), self.baseline_samples,
+                          self._bounds(), self._level_id(), self._persist_dir(), self.decode_workers,
+                          on_ready=renga_jobs.retrigger_node(self))
+            self._set_outputs(False, "Pending: getting walls from Renga...")
+            return
+        
+        job = runner.take(key)
+        if job is not None:
+            job_cache = _job_caches.pop(key, None)
+            if job.error is not None:
+                self._set_outputs(False, f"Error: {str(job.error)}")
+            else:
+                if job_cache is not None:
+                    _install_wall_cache(key, port, job_cache)
+                self._set_outputs(*job.result)
+                self._remember_cache(port)
+            return
+        
+        if runner.state(key) == renga_jobs.JOB_PENDING:
+            self._set_outputs(False, "Pending: getting walls from Renga...")
+        elif not self._set_cached_outputs(port):
+            self._set_outputs(False, "Set Update to True to get walls from Renga")
+    
+    def _set_cached_outputs(self, port, message="Cached"):
+        """
+        Answer from the wall cache of the last update (Bounds or Level changed,
+        any re-run without a trigger, or Renga not reachable) - no round trip
+        to Renga. After reopening the file the cache comes from disk.
+        
+        Returns:
+            bool: False when there is no cache to answer from
+        """
+        if not self.incremental:
+            return False
+        cache = self._cache(port)
+        if cache.revision is None and not len(cache):
+            return False
+        fields = self._fields()
+        self._set_outputs(*cached_walls(
+            cache, message, self.output_numpy, self._weld_tolerance(), self.split_walls,
+            fields is None or 'mesh' in fields, self._bounds(), self._level_id(),
+            column_fields=_column_fields(fields), want_baselines=fields is None or 'baseline' in fields))
+        return True
+    
+    def _cache(self, port):
+        if not self.incremental:
+            self.sv_free()
+            return None
+        # Cached walls depend on the requested fields and on the arc settings
+        # (baselines are cached as decoded curves)
+        fields = self._fields()
+        options = (self._arc_tolerance(), tuple(fields) if fields else None, self.baseline_samples)
+        cache = _get_wall_cache(self.node_id, port, options)
+        if cache.revision is None and not len(cache):
+            self._restore_cache(cache)
+        return cache
+    
+    def _cache_dirs(self):
+        """Model file directories: next to the .blend (if saved), then the user cache dir"""
+        dirs = [model_cache.cache_dir(bpy.data.filepath)] if bpy.data.filepath else []
+        dirs.append(model_cache.cache_dir())
+        return dirs
+    
+    def _persist_dir(self):
+        """Where fetch_walls saves the model; None - not kept on disk"""
+        if not (self.incremental and self.keep_on_disk):
+            return None
+        return self._cache_dirs()[0]
+    
+    def _restore_cache(self, cache):
+        """Fill an empty wall cache from the model file of the last update"""
+        if not (self.keep_on_disk and self.cache_file):
+            return
+        path = model_cache.find(self.cache_file, self._cache_dirs())
+        loaded = False
+        if path is not None:
+            fields = self._fields()
+            try:
+                loaded = load_cache(cache, path, self._arc_tolerance(), fields is None or 'baseline' in fields)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Renga Get Walls: could not load model cache {path}: {e}")
+        if not loaded:
+            # Gone, evicted or fetched with other settings - don't look again
+            self.cache_file = ''
+    
+    def _remember_cache(self, port):
+        """Store the model file name of the wall cache in the node (saved with the .blend)"""
+        cache = self._cache(port) if self._persist_dir() else None
+        if cache is None or cache.revision is None:
+            return
+        name = model_cache.cache_name(cache.project, cache.revision, cache.options)
+        if self.cache_file != name:
+            self.cache_file = name
+    
+    def sv_free(self):
+        """Node removed: drop its wall cache"""
+        for key in [k for k in _wall_caches if k[0] == self.node_id]:
+            del _wall_caches[key]
+        _job_caches.pop(self.node_id, None)
+    
+    def _weld_tolerance(self):
+        return self.weld_tolerance if self.weld else None
+    
+    def _fields(self):
+        """data.fields of the request; None when everything is included"""
+        if self.include_attributes and self.include_baselines and self.include_meshes:
+            return None
+        fields = ['id']
+        # levelId and bbox are cheap and needed to filter cached walls
+        fields += ['levelId', 'bbox']
+        if self.include_attributes:
+            fields += ['name', 'position', 'height', 'thickness']
+        if self.include_baselines:
+            fields.append('baseline')
+        if self.include_meshes:
+            fields.append('mesh')
+        return fields
+    
+    def _bounds(self):
+        """Box (min, max) around the points of the Bounds input, or None"""
+        if 'Bounds' not in self.inputs or not self.inputs['Bounds'].is_linked:
+            return None
+        objects = self.inputs['Bounds'].sv_get(default=[[]])
+        points = [point for obj in objects for point in obj]
+        bounds = spatial_index.points_bounds(points) if points else None
+        if bounds is None:
+            return None
+        return tuple(bounds[0].tolist()), tuple(bounds[1].tolist())
+    
+    def _level_id(self):
+        return self.level_id or None
+    
+    def _arc_tolerance(self):
+        """None - sampled arcs, 0 - exact arcs, > 0 - tessellated within it"""
+        if self.arc_mode == 'EXACT':
+            return 0.0
+        if self.arc_mode == 'TESSELLATE':
+            return self.chord_tolerance
+        return None
+    
+    def _set_outputs(self, success, message, baselines=None, verts=None, faces=None,
+                     wall_vertex_start=None, wall_face_start=None, per_wall=False, columns=None):
+        """
+        Set all outputs at once
+        
+        per_wall: verts/faces are already lists with one mesh per wall
+        columns: attribute columns (walls_decoder.attribute_columns), one
+            row per wall in the order of the per-wall meshes
+        """
+        self.outputs['Success'].sv_set([[success]])
+        self.outputs['Message'].sv_set([[message]])
+        self.outputs['Baselines'].sv_set(baselines if baselines else [[]])
+        if per_wall:
+            self.outputs['Vertices'].sv_set(verts if verts else [[]])
+            self.outputs['Faces'].sv_set(faces if faces else [[]])
+        else:
+            self.outputs['Vertices'].sv_set([verts] if verts is not None and len(verts) else [[]])
+            self.outputs['Faces'].sv_set([faces] if faces is not None and len(faces) else [[]])
+        # Nodes saved before these sockets existed don't have them
+        if 'WallVertexStart' in self.outputs:
+            self.outputs['WallVertexStart'].sv_set([wall_vertex_start] if wall_vertex_start is not None else [[]])
+        if 'WallFaceStart' in self.outputs:
+            self.outputs['WallFaceStart'].sv_set([wall_face_start] if wall_face_start is not None else [[]])
+        columns = columns or {}
+        for socket_name, field in _COLUMN_OUTPUTS:
+            if socket_name in self.outputs:
+                column = columns.get(field)
+                self.outputs[socket_name].sv_set([column] if column is not None else [[]])
+    
+    @staticmethod
+    def _parse_baseline(baseline_obj, arc_tolerance=None):
         """
         Parse baseline curve from JSON object
-        Returns Sverchok curve object (SvLine or SvSplineCurve) or list of points
+        Returns Sverchok curve object (SvLine, SvRengaPolyline, SvRengaArc,
+        SvRengaPolyCurve or SvSplineCurve) or list of points
         Similar to RengaGetWallsComponent.ParseBaseline in C#
+        
+        arc_tolerance: None - sampled points; 0 - exact arcs from the arc
+        parameters; > 0 - arcs tessellated within this chord tolerance
         """
         try:
             baseline_type = baseline_obj.get('type', '')
@@ -264,46 +619,42 @@ class SvRengaGetWallsNode(SverchCustomTreeNode, bpy.types.Node):
             if not start_point_obj or not end_point_obj:
                 return None
             
+            # Arc parameters (analyticCurves request); straight baselines keep
+            # the SvLine path below
+            if arc_tolerance is not None and (baseline_obj.get('arc') or baseline_obj.get('segments')):
+                curve = renga_curves.analytic_curve(baseline_obj, arc_tolerance or None)
+                if curve is not None:
+                    if renga_curves.SVERCHOK_CURVES_AVAILABLE:
+                        return curve
+                    return renga_curves.sample_points(curve)
+            
             # Use sampled points if available (especially for arcs)
             sampled_points = baseline_obj.get('sampledPoints', [])
-            if sampled_points and len(sampled_points) >= 2:
-                points = []
-                for pt_obj in sampled_points:
-                    x = pt_obj.get('x', 0)
-                    y = pt_obj.get('y', 0)
-                    z = pt_obj.get('z', 0)
-                    points.append([x, y, z])
+            if sampled_points is not None and len(sampled_points) >= 2:
+                # (N, 3) array in one pass, whether from a binary frame or JSON
+                points = walls_decoder.points_array(sampled_points)
                 
-                if len(points) >= 2:
-                    # Try to create Sverchok curve if utilities are available
-                    if CURVE_UTILS_AVAILABLE:
+                # Try to create Sverchok curve if utilities are available
+                if CURVE_UTILS_AVAILABLE:
+                    try:
+                        if len(points) == 2:
+                            # Simple line for 2 points
+                            return SvLine.from_two_points(points[0], points[1])
+                        # Polyline in one object, parametrized like concatenated
+                        # lines (matches Grasshopper PolylineCurve behavior)
+                        return renga_curves.SvRengaPolyline(points)
+                    except Exception as e:
+                        print(f"Renga Get Walls: Error creating polyline, trying SvSplineCurve: {e}")
+                        # Fallback: try SvSplineCurve with metric parameter
                         try:
-                            if len(points) == 2:
-                                # Simple line for 2 points
-                                return SvLine.from_two_points(points[0], points[1])
-                            else:
-                                # For multiple points, create polyline by concatenating lines
-                                # This avoids the CubicSpline error and matches Grasshopper PolylineCurve behavior
-                                lines = []
-                                for i in range(len(points) - 1):
-                                    line = SvLine.from_two_points(points[i], points[i + 1])
-                                    lines.append(line)
-                                if lines:
-                                    return concatenate_curves(lines)
-                                else:
-                                    return SvLine.from_two_points(points[0], points[-1])
-                        except Exception as e:
-                            print(f"Renga Get Walls: Error creating polyline, trying SvSplineCurve: {e}")
-                            # Fallback: try SvSplineCurve with metric parameter
-                            try:
-                                return SvSplineCurve.from_points(points, is_cyclic=False, metric='DISTANCE')
-                            except Exception as e2:
-                                print(f"Renga Get Walls: Error creating curve, using point list: {e2}")
-                                # Fallback to point list
-                                return points
-                    else:
-                        # Return as list of points if curve utils not available
-                        return points
+                            return SvSplineCurve.from_points(points, is_cyclic=False, metric='DISTANCE')
+                        except Exception as e2:
+                            print(f"Renga Get Walls: Error creating curve, using point list: {e2}")
+                            # Fallback to point list
+                            return points.tolist()
+                else:
+                    # Return as list of points if curve utils not available
+                    return points.tolist()
             
             # Fallback: simple line (start and end points)
             start_x = start_point_obj.get('x', 0)
@@ -334,47 +685,326 @@ class SvRengaGetWallsNode(SverchCustomTreeNode, bpy.types.Node):
             traceback.print_exc()
             return None
     
-    def _parse_mesh(self, grid_obj):
+    @staticmethod
+    def _parse_mesh(grid_obj):
         """
         Parse mesh from JSON object
-        Returns tuple (vertices, faces) for Sverchok mesh
+        Returns tuple (vertices, faces) for Sverchok mesh: (N, 3) float64 and
+        (M, 3) int32 arrays, faces indexing the grid's own vertices
         Similar to RengaGetWallsComponent.ParseMesh in C#
         """
         try:
-            vertices = grid_obj.get('vertices', [])
-            triangles = grid_obj.get('triangles', [])
-            
-            if not vertices or not triangles:
-                return None
-            
-            # Convert vertices to list of lists
-            verts = []
-            for v_obj in vertices:
-                x = v_obj.get('x', 0)
-                y = v_obj.get('y', 0)
-                z = v_obj.get('z', 0)
-                verts.append([x, y, z])
-            
-            # Convert triangles to list of indices
-            faces = []
-            for t_array in triangles:
-                if len(t_array) >= 3:
-                    i0 = t_array[0]
-                    i1 = t_array[1]
-                    i2 = t_array[2]
-                    faces.append([i0, i1, i2])
-            
-            if len(verts) > 0 and len(faces) > 0:
-                # Return tuple (vertices, faces) for Sverchok mesh
-                return (verts, faces)
-            
-            return None
-        
+            return walls_decoder.grid_arrays(grid_obj)
         except Exception as e:
             print(f"Error parsing mesh: {str(e)}")
             return None
 
 
+def fetch_walls(port, output_numpy=False, weld_tolerance=None, cache=None, split_walls=False,
+                arc_tolerance=None, fields=None, baseline_samples=None, bbox=None, level_id=None,
+                persist_dir=None, workers=0):
+    """
+    Get walls from Renga and parse them into node outputs
+    
+    Touches no Blender data, so it can run in a worker thread. Meshes of all
+    walls are decoded into arrays and merged once at the end; walls stay
+    contiguous in the shared buffer, CSR offsets mark where each one starts.
+    
+    Args:
+        output_numpy: return vertices/faces as numpy arrays instead of lists
+        weld_tolerance: grid size of the weld (see walls_decoder.weld_vertices);
+            None - no welding
+        cache: WallCache of the node - only walls changed since its
+            revision are downloaded and decoded
+        split_walls: return a list of meshes, one per wall
+        arc_tolerance: None - arcs from sampled points; 0 - exact arcs;
+            > 0 - arcs tessellated within this chord tolerance. Not None
+            asks the server for arc parameters instead of sampled points.
+        fields: wall fields to request (commands.WALL_FIELDS), None - all;
+            baselines/meshes left out are neither decoded nor output
+        baseline_samples: points per curved baseline segment, None - default
+        bbox: ((x, y, z) min, (x, y, z) max) - only walls touching the box
+        level_id: only walls on this level
+        persist_dir: save the cache there after the update (see save_cache)
+        workers: decode frames in a pool of this many processes (see
+            parallel_decode); 0 - in this thread
+    
+    With a cache the whole model is kept and bbox/level_id are applied
+    locally (see cached_walls); without one the server filters. When the
+    request fails, a populated cache is answered from instead.
+    
+    Returns:
+        tuple: (success, message, baselines, vertices, faces,
+            wall_vertex_start, wall_face_start, per_wall, columns).
+            wall_vertex_start is None after welding: walls share vertices
+            then. columns - attribute columns of the requested fields, one
+            row per wall in mesh order. baselines - one per wall in the same
+            order, None for a wall without one.
+    """
+    client = renga_client.RengaConnectionClient(port=port)
+    want_baselines = fields is None or 'baseline' in fields
+    want_meshes = fields is None or 'mesh' in fields
+    column_fields = _column_fields(fields)
+    submit = None
+    if workers and parallel_decode is not None:
+        submit = parallel_decode.frame_submitter(workers, want_meshes)
+    
+    # Prepare command: walls are streamed in batches and parsed as they arrive
+    message = create_get_walls_message(
+        stream=True, batch_size=STREAM_BATCH_SIZE,
+        delta=cache is not None, since=cache.revision if cache is not None else None,
+        analytic_curves=arc_tolerance is not None, fields=fields, baseline_samples=baseline_samples,
+        bbox=bbox if cache is None else None, level_id=level_id if cache is None else None)
+    
+    # Send command and parse response
+    try:
+        if cache is not None:
+            stats = _read_walls_delta(client, message, cache, arc_tolerance, want_baselines, want_meshes, submit)
+            if persist_dir is not None:
+                save_cache(cache, persist_dir)
+            result_message = f"Found {stats['total']} walls"
+            if not stats['full']:
+                result_message += (f" ({stats['added']} added, {stats['changed']} changed, "
+                                   f"{stats['removed']} removed)")
+            return cached_walls(cache, result_message, output_numpy, weld_tolerance, split_walls,
+                                want_meshes, bbox, level_id, column_fields, want_baselines)
+        
+        wall_count, baselines, mesh_builder, columns = _read_walls(client, message, arc_tolerance, want_baselines,
+                                                                   want_meshes, column_fields, submit)
+        if not wall_count:
+            if bbox is not None or level_id is not None:
+                return (True, "No walls match the filter", None, None, None)
+            return (False, "No walls found in response", None, None, None)
+        return _mesh_outputs(f"Found {wall_count} walls", baselines, mesh_builder,
+                             output_numpy, weld_tolerance, split_walls, columns)
+    
+    except renga_client.RengaServerError as e:
+        if cache is not None and cache.revision is not None:
+            return cached_walls(cache, f"Offline ({e}), cached model", output_numpy, weld_tolerance,
+                                split_walls, want_meshes, bbox, level_id, column_fields, want_baselines)
+        return (False, str(e), None, None, None)
+    except Exception as e:
+        return (False, f"Error parsing response: {str(e)}", None, None, None)
+
+
+def save_cache(cache, directory):
+    """
+    Write the walls of cache to a model file in directory (see model_cache)
+    and evict old files there
+    
+    Returns:
+        str: path of the file, None if it could not be written
+    """
+    if cache.revision is None:
+        return None
+    path = os.path.join(directory, model_cache.cache_name(cache.project, cache.revision, cache.options))
+    try:
+        if os.path.isfile(path):
+            # Same project, revision and options: same content
+            model_cache.touch(path)
+        else:
+            entries = cache.entries()
+            model_cache.save(path, cache.project, cache.revision, cache.options,
+                             [wall for wall, _ in entries], [(verts, faces) for _, (_, verts, faces) in entries])
+            model_cache.evict(directory, keep=(path,))
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Renga Get Walls: could not save model cache: {e}")
+        return None
+    return path
+
+
+def load_cache(cache, path, arc_tolerance=None, want_baselines=True):
+    """
+    Fill cache from a model file written by save_cache
+    
+    Returns:
+        bool: False when the file was saved with other options than the cache's
+    """
+    meta, walls, meshes = model_cache.load(path)
+    if model_cache.options_key(meta.get('options')) != model_cache.options_key(cache.options):
+        return False
+    cache.begin()
+    for wall, (verts, faces) in zip(walls, meshes):
+        cache.add(wall, _decode_entry(wall, verts, faces, arc_tolerance, want_baselines))
+    cache.commit({'revision': meta.get('revision'), 'project': meta.get('project'), 'full': True})
+    model_cache.touch(path)
+    return True
+
+
+def _column_fields(fields):
+    """Attribute columns available for a request of fields"""
+    if fields is None:
+        return walls_decoder.ATTRIBUTE_FIELDS
+    return tuple(f for f in walls_decoder.ATTRIBUTE_FIELDS if f in fields)
+
+
+def wall_bounds(wall, decoded):
+    """Box of a cached wall: its mesh if decoded, else the server's bbox"""
+    verts = decoded[1] if decoded is not None else None
+    if verts is not None and len(verts):
+        return spatial_index.points_bounds(verts)
+    bbox = wall.get('bbox')
+    if bbox:
+        lower, upper = bbox['min'], bbox['max']
+        return ((lower.get('x', 0), lower.get('y', 0), lower.get('z', 0)),
+                (upper.get('x', 0), upper.get('y', 0), upper.get('z', 0)))
+    return None
+
+
+def cached_walls(cache, message, output_numpy=False, weld_tolerance=None, split_walls=False,
+                 want_meshes=True, bbox=None, level_id=None, column_fields=walls_decoder.ATTRIBUTE_FIELDS,
+                 want_baselines=True):
+    """
+    Node outputs from the walls in cache, optionally only those touching
+    bbox (answered by the cache's grid index) and on level level_id
+    
+    Returns:
+        tuple: as fetch_walls
+    """
+    if bbox is not None:
+        wall_ids = cache.query(bbox[0], bbox[1], wall_bounds)
+    else:
+        wall_ids = [wall.get('id') for wall in cache.walls()]
+    entries = [cache.get_entry(wall_id) for wall_id in wall_ids]
+    if level_id is not None:
+        entries = [entry for entry in entries if entry[0].get('levelId') == level_id]
+    
+    if bbox is not None or level_id is not None:
+        message += f", {len(entries)} match the filter"
+        if not entries:
+            return (True, message, None, None, None)
+    elif not entries:
+        return (False, "No walls found in response", None, None, None)
+    
+    baselines = []
+    mesh_builder = walls_decoder.MeshBuilder() if want_meshes else None
+    for _, (baseline_curve, verts, faces) in entries:
+        if want_baselines:
+            # One per wall, None as a placeholder: index i is the same wall on every output
+            baselines.append(baseline_curve)
+        if mesh_builder is not None:
+            # Every wall gets its CSR slot, even without a mesh
+            mesh_builder.add_wall_mesh(verts, faces)
+    columns = walls_decoder.attribute_columns([wall for wall, _ in entries], column_fields)
+    return _mesh_outputs(message, baselines, mesh_builder, output_numpy, weld_tolerance, split_walls, columns)
+
+
+def _mesh_outputs(message, baselines, mesh_builder, output_numpy, weld_tolerance, split_walls, columns=None):
+    """Build, weld and split the collected meshes into the fetch_walls tuple"""
+    if columns is not None and not output_numpy:
+        columns = {field: column if isinstance(column, list) else column.tolist()
+                   for field, column in columns.items()}
+    if mesh_builder is None:
+        return (True, message, baselines, None, None, None, None, False, columns)
+    
+    all_verts, all_faces = mesh_builder.build()
+    wall_vertex_start, wall_face_start = mesh_builder.wall_offsets()
+    if weld_tolerance is not None:
+        all_verts, all_faces, weld_stats = walls_decoder.weld_vertices(all_verts, all_faces, weld_tolerance)
+        wall_vertex_start = None
+        wall_face_start = walls_decoder.remap_face_starts(wall_face_start, weld_stats['face_mask'])
+        message += (f", welded {weld_stats['vertices_before']} -> {weld_stats['vertices_after']} "
+                    f"vertices ({weld_stats['ratio']:.1f}x)")
+    if split_walls:
+        all_verts, all_faces = walls_decoder.split_walls(all_verts, all_faces, wall_vertex_start, wall_face_start)
+    if not output_numpy:
+        if split_walls:
+            all_verts = [v.tolist() for v in all_verts]
+            all_faces = [f.tolist() for f in all_faces]
+        else:
+            all_verts, all_faces = all_verts.tolist(), all_faces.tolist()
+        wall_face_start = wall_face_start.tolist()
+        if wall_vertex_start is not None:
+            wall_vertex_start = wall_vertex_start.tolist()
+    
+    return (True, message, baselines, all_verts, all_faces,
+            wall_vertex_start, wall_face_start, split_walls, columns)
+
+
+def _parse_baselines(walls, baselines, arc_tolerance=None):
+    """One curve per wall; None for a wall without a baseline or with one that can't be parsed"""
+    for wall in walls:
+        baseline_obj = wall.get('baseline')
+        baseline_curve = SvRengaGetWallsNode._parse_baseline(baseline_obj, arc_tolerance) if baseline_obj else None
+        baselines.append(baseline_curve if baseline_curve else None)
+
+
+def _read_walls(client, message, arc_tolerance=None, want_baselines=True, want_meshes=True,
+                column_fields=walls_decoder.ATTRIBUTE_FIELDS, submit=None):
+    """
+    Full reply: returns (wall count, baselines, MeshBuilder or None, attribute columns)
+    
+    submit: decode frames in a process pool (parallel_decode.frame_submitter)
+    """
+    wall_count = 0
+    baselines = []
+    column_parts = []
+    mesh_builder = walls_decoder.MeshBuilder() if want_meshes else None
+    
+    for batch in client.iter_wall_batches(message, submit):
+        walls = batch.get('walls') or []
+        wall_count += len(walls)
+        if walls:
+            column_parts.append(walls_decoder.attribute_columns(walls, column_fields))
+        if want_baselines:
+            _parse_baselines(walls, baselines, arc_tolerance)
+        
+        # Process meshes: a binary frame has them packed already, a frame
+        # decoded in the pool has them built
+        geometry = batch.get('geometry')
+        if mesh_builder is None:
+            continue
+        if _MESH_ARRAYS in batch:
+            mesh_builder.add_walls(*batch[_MESH_ARRAYS])
+        elif geometry is not None:
+            mesh_builder.add_packed(geometry, walls)
+        else:
+            for wall in walls:
+                mesh_builder.add_wall(wall)
+    
+    return wall_count, baselines, mesh_builder, walls_decoder.concat_columns(column_parts, column_fields)
+
+
+def _read_walls_delta(client, message, cache, arc_tolerance=None, want_baselines=True, want_meshes=True,
+                      submit=None):
+    """
+    Delta reply: decode the walls that came and merge them into cache
+    
+    Every cache entry holds (baseline curve, vertices, faces) of its wall;
+    parts not wanted are None.
+    
+    Returns:
+        dict: WallCache.commit() stats
+    """
+    meta = {}
+    cache.begin()
+    for batch in client.iter_wall_batches(message, submit):
+        walls = batch.get('walls') or []
+        geometry = batch.get('geometry')
+        if not want_meshes:
+            meshes = [(None, None)] * len(walls)
+        elif _MESH_ARRAYS in batch:
+            meshes = zip(*walls_decoder.split_walls(*batch[_MESH_ARRAYS]))
+        elif geometry is not None:
+            meshes = walls_decoder.split_packed(geometry, walls)
+        else:
+            meshes = [walls_decoder.wall_mesh_arrays(wall) for wall in walls]
+        for wall, (verts, faces) in zip(walls, meshes):
+            # The mesh lives on as arrays; don't keep it twice
+            wall = {k: v for k, v in wall.items() if k != 'mesh'}
+            cache.add(wall, _decode_entry(wall, verts, faces, arc_tolerance, want_baselines))
+        if 'revision' in batch:
+            meta = batch
+    return cache.commit(meta)
+
+
+def _decode_entry(wall, verts, faces, arc_tolerance=None, want_baselines=True):
+    """WallCache entry of a wall: (baseline curve, vertices, faces)"""
+    baseline_obj = wall.get('baseline') if want_baselines else None
+    baseline_curve = SvRengaGetWallsNode._parse_baseline(baseline_obj, arc_tolerance) if baseline_obj else None
+    return (baseline_curve, verts, faces)
+
+
 def register():
     """Регистрация ноды (вызывается Sverchok автоматически)"""
     try:
@@ -392,6 +1022,8 @@ def register():
 
 def unregister():
     """Отмена регистрации ноды"""
+    if parallel_decode is not None:
+        parallel_decode.shutdown()
     try:
         if 'SvRengaGetWallsNode' in dir(bpy.types):
             bpy.utils.unregister_class(SvRengaGetWallsNode)
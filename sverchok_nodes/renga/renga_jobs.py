@@ -0,0 +1,286 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Background jobs for Renga nodes
+
+Nodes run Renga requests in worker threads so Blender's UI does not freeze
+for the round trip. Flow:
+
+    1. process() submits a job under the node's key and shows "pending"
+    2. the job runs in a worker thread
+    3. a bpy.app.timers callback (main thread) sees the finished job and
+       re-triggers the node
+    4. process() takes the result and publishes it to the outputs
+
+Submitting again under the same key supersedes the previous job: its
+result is dropped, and if it has not started yet it never runs. Jobs of one
+key run one after another, never in parallel.
+
+A job submitted with with_progress=True gets a progress(value) callback;
+the latest value is in progress(key) and on_ready is also called (from
+poll()) when it changes, so the node can show it while still pending.
+"""
+
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+# Состояния задачи ноды
+JOB_IDLE = "idle"
+JOB_PENDING = "pending"
+JOB_READY = "ready"
+
+POLL_INTERVAL = 0.1
+
+
+class Job:
+    """Finished job: result or error of one submission"""
+
+    def __init__(self, key, generation, result=None, error=None):
+        self.key = key
+        self.generation = generation
+        self.result = result
+        self.error = error
+
+
+class JobRunner:
+    """
+    Runs node jobs in a thread pool and hands results back on the main thread
+
+    Args:
+        max_workers: worker threads shared by all nodes
+    """
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="renga-job")
+        self._lock = threading.Lock()
+        self._generations = {}  # key -> generation of the latest submission
+        self._futures = {}      # key -> Future of the latest submission
+        self._waits = {}        # key -> Future the latest submission waits for
+        self._callbacks = {}    # key -> on_ready of the latest submission
+        self._ready = {}        # key -> Job, not yet taken
+        self._notified = set()  # keys whose on_ready was already called
+        self._progress = {}     # key -> latest progress of the running job
+        self._progressed = set()  # keys with progress not yet announced
+
+    def submit(self, key, fn, *args, on_ready=None, with_progress=False, **kwargs):
+        """
+        Run fn(*args, **kwargs) in a worker thread
+
+        Args:
+            key: owner of the job (e.g. node_id); supersedes its previous job
+            on_ready: called on the main thread (from poll()) when done
+            with_progress: pass fn a progress=callback(value) argument
+
+        Returns:
+            int: generation of the job
+        """
+        with self._lock:
+            generation = self._generations.get(key, 0) + 1
+            self._generations[key] = generation
+            self._ready.pop(key, None)
+            self._notified.discard(key)
+            self._callbacks[key] = on_ready
+            self._progress.pop(key, None)
+            self._progressed.discard(key)
+            previous = self._futures.get(key)
+            if previous is not None and previous.cancel():
+                # Superseded before it started: wait for what it waited for
+                previous = self._waits.get(key)
+            if with_progress:
+                kwargs = dict(kwargs, progress=lambda value: self._report(key, generation, value))
+
+            def run():
+                if previous is not None:
+                    # Jobs of one key must not overlap (e.g. two batches of columns)
+                    wait([previous])
+                with self._lock:
+                    if self._generations.get(key) != generation:
+                        return None  # superseded while waiting: its result is dropped anyway
+                return fn(*args, **kwargs)
+
+            future = self._executor.submit(run)
+            self._futures[key] = future
+            self._waits[key] = previous
+        future.add_done_callback(lambda f: self._finished(key, generation, f))
+        _ensure_timer()
+        return generation
+
+    def cancel(self, key):
+        """Forget the job of key; a running job finishes but its result is dropped"""
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            future = self._futures.get(key)
+            if future is not None:
+                future.cancel()
+            self._ready.pop(key, None)
+            self._callbacks.pop(key, None)
+            self._notified.discard(key)
+            self._progress.pop(key, None)
+            self._progressed.discard(key)
+
+    def state(self, key):
+        with self._lock:
+            if key in self._ready:
+                return JOB_READY
+            future = self._futures.get(key)
+            if future is not None and not future.done() and key in self._callbacks:
+                return JOB_PENDING
+            return JOB_IDLE
+
+    def progress(self, key):
+        """Latest progress value of the pending job of key, or None"""
+        with self._lock:
+            return self._progress.get(key)
+
+    def take(self, key):
+        """Pop the finished job of key, or None"""
+        with self._lock:
+            self._notified.discard(key)
+            return self._ready.pop(key, None)
+
+    def poll(self):
+        """
+        Call on_ready for newly finished jobs (main thread)
+
+        Returns:
+            bool: True while jobs are still running
+        """
+        with self._lock:
+            ready = [(key, self._callbacks.get(key)) for key in self._ready if key not in self._notified]
+            self._notified.update(key for key, _ in ready)
+            ready.extend((key, self._callbacks.get(key)) for key in self._progressed
+                         if key not in self._ready)
+            self._progressed.clear()
+            running = any(not future.done() for future in self._futures.values())
+        for key, on_ready in ready:
+            if on_ready is not None:
+                try:
+                    on_ready()
+                except Exception as e:
+                    print(f"Renga jobs: error in callback for {key}: {e}")
+        return running
+
+    def shutdown(self):
+        with self._lock:
+            self._generations.clear()
+            self._futures.clear()
+            self._waits.clear()
+            self._callbacks.clear()
+            self._ready.clear()
+            self._progress.clear()
+            self._progressed.clear()
+        self._executor.shutdown(wait=False)
+
+    def _report(self, key, generation, value):
+        with self._lock:
+            if self._generations.get(key) != generation:
+                return  # superseded job
+            self._progress[key] = value
+            self._progressed.add(key)
+
+    def _finished(self, key, generation, future):
+        if future.cancelled():
+            return  # superseded before it started
+        error = future.exception()
+        if error is not None:
+            traceback.print_exception(type(error), error, error.__traceback__)
+        with self._lock:
+            if self._generations.get(key) != generation:
+                return  # superseded: stale result
+            if self._futures.get(key) is future:
+                del self._futures[key]
+                self._waits.pop(key, None)
+            self._ready[key] = Job(key, generation, None if error else future.result(), error)
+            self._progress.pop(key, None)
+            self._progressed.discard(key)
+            self._notified.discard(key)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    """Shared JobRunner of all Renga nodes"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
+
+
+def _timer_callback():
+    runner = _runner
+    if runner is None:
+        return None
+    running = runner.poll()
+    with runner._lock:
+        waiting = any(key not in runner._notified for key in runner._ready)
+    # Keep polling while anything is running or not yet delivered
+    return POLL_INTERVAL if running or waiting else None
+
+
+def _ensure_timer():
+    if bpy is None:
+        return
+    try:
+        if not bpy.app.timers.is_registered(_timer_callback):
+            bpy.app.timers.register(_timer_callback, first_interval=POLL_INTERVAL)
+    except Exception as e:
+        print(f"Renga jobs: cannot register timer: {e}")
+
+
+def retrigger_node(node):
+    """
+    on_ready callback that re-runs node's tree update from the timer
+
+    Looks the node up by tree and node name at call time, so a node deleted
+    while its job was running is simply skipped.
+    """
+    tree_name = node.id_data.name
+    node_name = node.name
+
+    def retrigger():
+        tree = bpy.data.node_groups.get(tree_name)
+        target = tree.nodes.get(node_name) if tree is not None else None
+        if target is not None:
+            target.process_node(None)
+
+    return retrigger
+
+
+def unregister():
+    """Stop the timer and drop pending results (addon unregister)"""
+    global _runner
+    if bpy is not None:
+        try:
+            if bpy.app.timers.is_registered(_timer_callback):
+                bpy.app.timers.unregister(_timer_callback)
+        except Exception:
+            pass
+    with _runner_lock:
+        if _runner is not None:
+            _runner.shutdown()
+            _runner = None
@@ -0,0 +1,123 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Grid index over axis-aligned bounding boxes
+
+Walls are vertical and spread over the plan, so boxes are bucketed by x/y
+into a uniform grid; z is only checked exactly. A region query visits the
+cells the region covers and tests the candidates with one array operation.
+A box that would cover more than MAX_BOX_CELLS cells is not bucketed: such
+boxes are kept in one list that every query tests.
+"""
+
+import numpy as np
+
+# Cells one box may occupy; larger boxes are tested on every query
+MAX_BOX_CELLS = 64
+
+
+def box_intersects(mins, maxs, box_min, box_max):
+    """Bool mask of the (N, 3) boxes mins/maxs touching box [box_min, box_max]"""
+    return np.all((mins <= box_max) & (maxs >= box_min), axis=1)
+
+
+def points_bounds(points):
+    """(min, max) of an (N, 3) array, None when empty"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if not len(points):
+        return None
+    return points.min(axis=0), points.max(axis=0)
+
+
+class GridIndex:
+    """
+    Uniform x/y grid over boxes
+
+    Args:
+        mins, maxs: (N, 3) box corners
+        cell_size: grid step; default - from the typical box size
+    """
+
+    def __init__(self, mins, maxs, cell_size=None):
+        self.mins = np.asarray(mins, dtype=np.float64).reshape(-1, 3)
+        self.maxs = np.asarray(maxs, dtype=np.float64).reshape(-1, 3)
+        count = len(self.mins)
+        if cell_size is None:
+            cell_size = self._default_cell_size()
+        self.cell_size = float(cell_size)
+        self.origin = self.mins[:, :2].min(axis=0) if count else np.zeros(2)
+        self._cells = {}
+        self._large = np.empty(0, dtype=np.int64)  # boxes over MAX_BOX_CELLS cells
+        if not count:
+            return
+
+        lo = self._cell(self.mins[:, :2])
+        hi = self._cell(self.maxs[:, :2])
+        cells = {}
+        large = []
+        for i, (x0, y0, x1, y1) in enumerate(np.hstack((lo, hi)).tolist()):
+            if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_BOX_CELLS:
+                large.append(i)
+                continue
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    cells.setdefault((x, y), []).append(i)
+        self._cells = {key: np.asarray(items, dtype=np.int64) for key, items in cells.items()}
+        self._large = np.asarray(large, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.mins)
+
+    def _default_cell_size(self):
+        if not len(self.mins):
+            return 1.0
+        extents = (self.maxs[:, :2] - self.mins[:, :2]).max(axis=1)
+        size = float(np.median(extents))
+        return size if size > 0 else 1.0
+
+    def _cell(self, xy):
+        return np.floor((xy - self.origin) / self.cell_size).astype(np.int64)
+
+    def query(self, box_min, box_max):
+        """
+        Boxes touching the region
+
+        Returns:
+            np.ndarray: sorted indices of the boxes
+        """
+        box_min = np.asarray(box_min, dtype=np.float64).reshape(3)
+        box_max = np.asarray(box_max, dtype=np.float64).reshape(3)
+        if not len(self.mins):
+            return np.empty(0, dtype=np.int64)
+
+        (x0, y0), (x1, y1) = self._cell(np.stack((box_min[:2], box_max[:2])))
+        if (x1 - x0 + 1) * (y1 - y0 + 1) >= len(self._cells):
+            # The region covers most of the grid: testing every box is cheaper
+            return np.flatnonzero(box_intersects(self.mins, self.maxs, box_min, box_max))
+
+        found = [self._cells[key] for key in
+                 ((x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+                 if key in self._cells]
+        if len(self._large):
+            found.append(self._large)
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.unique(np.concatenate(found))
+        mask = box_intersects(self.mins[candidates], self.maxs[candidates], box_min, box_max)
+        return candidates[mask]
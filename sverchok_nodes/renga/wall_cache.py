@@ -0,0 +1,183 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Client-side wall cache for incremental get_walls
+
+A get_walls request with data.delta=true and data.since=<revision> is
+answered with the current revision token and only the walls that were
+added or changed since that revision, plus the ids of removed walls:
+
+    {"revision": "...", "full": false, "walls": [...],
+     "added": [ids], "changed": [ids], "removed": [ids]}
+
+With an unknown or missing since the server sends every wall and
+"full": true. In a streamed reply these fields come in the final frame,
+together with "project" - the identity of the open project.
+
+WallCache keeps the walls by id and merges such replies:
+
+    cache.begin()
+    for wall in walls_of_reply:
+        cache.add(wall, decoded)     # decoded: anything derived from the wall
+    cache.commit(reply_data)         # applies removals, stores the revision
+
+Nothing changes until commit(), so an interrupted reply leaves the cache
+(and its revision) as it was.
+
+WallCache is not thread safe. A background update works on copy() and the
+node puts the copy in place of the cache on the main thread when the job is
+done, so the cache the node reads is never changed under it.
+
+query() answers region queries from the cached walls through a GridIndex
+over their bounding boxes, built on first use after each commit.
+"""
+
+import os
+import sys
+from collections import OrderedDict
+
+# Добавить путь к папке для импорта модулей
+_current_dir = os.path.dirname(os.path.abspath(__file__))
+if _current_dir not in sys.path:
+    sys.path.insert(0, _current_dir)
+
+import spatial_index
+
+
+class WallCache:
+    """Walls of one model by id, in server order, with per-wall decoded data"""
+
+    def __init__(self, options=None):
+        self.revision = None
+        self.project = None
+        self.options = options  # settings the decoded data depends on
+        self._entries = OrderedDict()  # wall id -> (wall, decoded)
+        self._pending = None
+        self._index = None  # (wall ids, GridIndex) of the committed walls
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, wall_id):
+        return wall_id in self._entries
+
+    def copy(self):
+        """Cache with the same committed walls (the walls themselves are shared)"""
+        other = WallCache(self.options)
+        other.revision = self.revision
+        other.project = self.project
+        other._entries = OrderedDict(self._entries)
+        other._index = self._index  # never changed in place, only replaced
+        return other
+
+    def clear(self):
+        self.revision = None
+        self.project = None
+        self._entries.clear()
+        self._pending = None
+        self._index = None
+
+    def begin(self):
+        """Start collecting the walls of a reply"""
+        self._pending = OrderedDict()
+
+    def add(self, wall, decoded=None):
+        if self._pending is None:
+            self.begin()
+        self._pending[wall.get("id")] = (wall, decoded)
+
+    def commit(self, data):
+        """
+        Merge the collected walls
+
+        Args:
+            data: reply data with revision/full/removed; a server without
+                delta support sends none of them - the reply replaces all
+
+        Returns:
+            dict: full, added, changed, removed, unchanged, total
+        """
+        pending = self._pending if self._pending is not None else OrderedDict()
+        self._pending = None
+        data = data or {}
+        full = data.get("full", True) or "revision" not in data
+
+        if full:
+            stats = {"full": True, "added": len(pending), "changed": 0, "removed": 0, "unchanged": 0}
+            self._entries = pending
+        else:
+            added = changed = removed = 0
+            for wall_id, entry in pending.items():
+                if wall_id in self._entries:
+                    changed += 1
+                else:
+                    added += 1
+                self._entries[wall_id] = entry
+            for wall_id in data.get("removed") or []:
+                if self._entries.pop(wall_id, None) is not None:
+                    removed += 1
+            stats = {"full": False, "added": added, "changed": changed, "removed": removed,
+                     "unchanged": len(self._entries) - added - changed}
+        self.revision = data.get("revision")
+        self.project = data.get("project", self.project)
+        self._index = None
+        stats["total"] = len(self._entries)
+        return stats
+
+    def walls(self):
+        return [wall for wall, _ in self._entries.values()]
+
+    def entries(self):
+        """(wall, decoded) pairs in server order"""
+        return list(self._entries.values())
+
+    def get(self, wall_id):
+        entry = self._entries.get(wall_id)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, wall_id):
+        """(wall, decoded) of wall_id, or None"""
+        return self._entries.get(wall_id)
+
+    def index(self, bounds_of):
+        """
+        Grid index over the cached walls
+
+        Args:
+            bounds_of: (wall, decoded) -> (min, max) or None; walls without
+                bounds are left out of the index
+
+        Returns:
+            tuple: (wall ids, GridIndex), box i belongs to wall ids[i]
+        """
+        if self._index is None:
+            ids, mins, maxs = [], [], []
+            for wall_id, (wall, decoded) in self._entries.items():
+                bounds = bounds_of(wall, decoded)
+                if bounds is not None:
+                    ids.append(wall_id)
+                    mins.append(bounds[0])
+                    maxs.append(bounds[1])
+            self._index = (ids, spatial_index.GridIndex(mins, maxs))
+        return self._index
+
+    def query(self, box_min, box_max, bounds_of):
+        """Ids of the walls whose boxes touch [box_min, box_max], in server order"""
+        ids, index = self.index(bounds_of)
+        return [ids[i] for i in index.query(box_min, box_max).tolist()]
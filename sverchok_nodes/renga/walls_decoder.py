@@ -0,0 +1,433 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""
+Vectorized decoding of get_walls mesh data
+
+Every grid becomes an (N, 3) float64 vertex array and an (M, 3) int32
+triangle array with grid-local indices. MeshBuilder collects them and
+concatenates once in build(); the grid offsets are added to all triangle
+indices with one array operation.
+
+Grids from binary frames already are numpy arrays (views into the frame)
+and are used as they are; a whole binary batch can be added at once with
+MeshBuilder.add_packed(). JSON grids ({"x", "y", "z"} dicts or [x, y, z]
+lists) are collected into flat lists and converted once.
+
+attribute_columns() turns the scalar wall fields (id, name, position,
+height, thickness) into parallel arrays, one row per wall.
+"""
+
+from itertools import chain
+
+import numpy as np
+
+VERTEX_DTYPE = np.float64
+INDEX_DTYPE = np.int32
+
+
+def points_array(points):
+    """
+    Convert points to an (N, 3) float64 array
+
+    Args:
+        points: (N, >=3) array, list of {"x", "y", "z"} dicts or of [x, y, z]
+    """
+    if isinstance(points, np.ndarray):
+        return np.asarray(points, dtype=VERTEX_DTYPE).reshape(len(points), -1)[:, :3]
+    count = len(points)
+    if not count:
+        return np.empty((0, 3), dtype=VERTEX_DTYPE)
+    if isinstance(points[0], dict):
+        coords = chain.from_iterable((p.get('x', 0), p.get('y', 0), p.get('z', 0)) for p in points)
+        return np.fromiter(coords, dtype=VERTEX_DTYPE, count=3 * count).reshape(count, 3)
+    return np.asarray(points, dtype=VERTEX_DTYPE).reshape(count, -1)[:, :3]
+
+
+def triangles_array(triangles):
+    """Convert triangles ([i0, i1, i2] lists or an (M, >=3) array) to (M, 3) int32"""
+    if isinstance(triangles, np.ndarray):
+        return np.asarray(triangles, dtype=INDEX_DTYPE).reshape(len(triangles), -1)[:, :3]
+    count = len(triangles)
+    if not count:
+        return np.empty((0, 3), dtype=INDEX_DTYPE)
+    if all(len(t) == 3 for t in triangles):
+        return np.fromiter(chain.from_iterable(triangles), dtype=INDEX_DTYPE, count=3 * count).reshape(count, 3)
+    return np.array([t[:3] for t in triangles if len(t) >= 3], dtype=INDEX_DTYPE).reshape(-1, 3)
+
+
+def grid_arrays(grid):
+    """
+    Vertex and triangle arrays of one grid
+
+    Returns:
+        tuple: ((N, 3) float64, (M, 3) int32) or None for an empty grid
+    """
+    vertices = grid.get('vertices')
+    triangles = grid.get('triangles')
+    if vertices is None or triangles is None or len(vertices) == 0 or len(triangles) == 0:
+        return None
+    verts = points_array(vertices)
+    tris = triangles_array(triangles)
+    if not len(verts) or not len(tris):
+        return None
+    return verts, tris
+
+
+def iter_wall_grids(wall):
+    """Yield grid dicts of a wall (wall -> mesh -> grids order)"""
+    for mesh_obj in wall.get('mesh') or []:
+        for grid in mesh_obj.get('grids') or []:
+            yield grid
+
+
+class MeshBuilder:
+    """
+    Collects grids of many walls into one mesh
+
+    Nothing is concatenated or offset until build(). JSON grids (a wall
+    face is one grid of ~4 vertices, too small for per-grid arrays) go into
+    flat coordinate/index lists; array grids are kept as they are.
+    
+    Walls stay contiguous in the result; wall_offsets() gives CSR-style
+    start arrays to slice them.
+    """
+
+    def __init__(self):
+        self._vertex_chunks = []
+        self._triangle_chunks = []
+        self._flat_vertices = []
+        self._flat_triangles = []
+        self._vertex_counts = []
+        self._triangle_counts = []
+        self._wall_grid_ends = []  # grid count after each wall
+
+    @property
+    def wall_count(self):
+        return len(self._wall_grid_ends)
+
+    @property
+    def grid_count(self):
+        return len(self._vertex_counts)
+
+    def add_grid(self, vertices, triangles):
+        """Add one grid as arrays; triangles index into its own vertices"""
+        self._flush()
+        self._vertex_chunks.append(vertices)
+        self._triangle_chunks.append(triangles)
+        self._vertex_counts.append(len(vertices))
+        self._triangle_counts.append(len(triangles))
+
+    def add_wall(self, wall):
+        """Add all non-empty grids of a wall"""
+        for grid in iter_wall_grids(wall):
+            vertices = grid.get('vertices')
+            triangles = grid.get('triangles')
+            if vertices is None or triangles is None or len(vertices) == 0 or len(triangles) == 0:
+                continue
+            if isinstance(vertices, np.ndarray) or isinstance(triangles, np.ndarray):
+                self.add_grid(points_array(vertices), triangles_array(triangles))
+            else:
+                self._add_json_grid(vertices, triangles)
+        self._wall_grid_ends.append(len(self._vertex_counts))
+
+    def add_wall_mesh(self, vertices, faces):
+        """Add a whole wall as arrays (faces index its own vertices)"""
+        self.add_grid(vertices, faces)
+        self._wall_grid_ends.append(len(self._vertex_counts))
+
+    def add_walls(self, vertices, faces, wall_vertex_start, wall_face_start):
+        """
+        Add a block of whole walls built elsewhere (e.g. by another
+        MeshBuilder): faces index the block's vertices, wall starts as
+        returned by wall_offsets()
+        """
+        self._flush()
+        vertex_starts = np.asarray(wall_vertex_start, dtype=np.int64)
+        face_starts = np.asarray(wall_face_start, dtype=np.int64)
+        first_grid = len(self._vertex_counts)
+        self._vertex_chunks.append(vertices)
+        # Block-global -> wall-local indices, each wall becomes one grid
+        self._triangle_chunks.append(faces - np.repeat(
+            vertex_starts[:-1], np.diff(face_starts)).astype(INDEX_DTYPE)[:, None])
+        self._vertex_counts.extend(np.diff(vertex_starts).tolist())
+        self._triangle_counts.extend(np.diff(face_starts).tolist())
+        self._wall_grid_ends.extend(range(first_grid + 1, first_grid + len(vertex_starts)))
+
+    def add_packed(self, geometry, walls):
+        """
+        Add the geometry block of a binary frame (see pack_geometry) as a whole
+
+        Args:
+            geometry: data["geometry"] of the frame
+            walls: walls of the frame; only their grid counts are used
+
+        Grids with no triangles are kept; they only shift vertex offsets.
+        """
+        self._flush()
+        vertex_starts = np.asarray(geometry["gridVertexStart"])
+        triangle_starts = np.asarray(geometry["gridTriangleStart"])
+        first_grid = len(self._vertex_counts)
+        self._vertex_chunks.append(points_array(geometry["vertices"]))
+        self._triangle_chunks.append(triangles_array(geometry["triangles"]))
+        self._vertex_counts.extend(np.diff(vertex_starts).tolist())
+        self._triangle_counts.extend(np.diff(triangle_starts).tolist())
+        grid_end = first_grid
+        for wall in walls:
+            grid_end += sum(len(mesh_obj.get('grids') or []) for mesh_obj in wall.get('mesh') or [])
+            self._wall_grid_ends.append(grid_end)
+
+    def build(self):
+        """
+        Concatenate everything added so far
+
+        Returns:
+            tuple: ((N, 3) float64 vertices, (M, 3) int32 faces indexing them)
+        """
+        self._flush()
+        if not self._vertex_chunks:
+            return np.empty((0, 3), dtype=VERTEX_DTYPE), np.empty((0, 3), dtype=INDEX_DTYPE)
+        vertices = np.concatenate(self._vertex_chunks).astype(VERTEX_DTYPE, copy=False)
+        faces = np.concatenate(self._triangle_chunks).astype(INDEX_DTYPE, copy=False)
+        # Grid-local -> global indices: start of each grid, repeated per triangle
+        vertex_starts = np.zeros(len(self._vertex_counts), dtype=INDEX_DTYPE)
+        np.cumsum(self._vertex_counts[:-1], out=vertex_starts[1:])
+        faces += np.repeat(vertex_starts, self._triangle_counts)[:, None]
+        return vertices, faces
+
+    def wall_offsets(self):
+        """
+        CSR offsets of the walls in the build() result
+
+        Wall i owns vertices[wall_vertex_start[i]:wall_vertex_start[i + 1]]
+        and faces[wall_face_start[i]:wall_face_start[i + 1]].
+
+        Returns:
+            tuple: (wall_vertex_start, wall_face_start), int32 arrays of W + 1
+        """
+        grid_vertex_start = np.zeros(len(self._vertex_counts) + 1, dtype=np.int64)
+        grid_face_start = np.zeros(len(self._triangle_counts) + 1, dtype=np.int64)
+        np.cumsum(self._vertex_counts, out=grid_vertex_start[1:])
+        np.cumsum(self._triangle_counts, out=grid_face_start[1:])
+        ends = np.asarray([0] + self._wall_grid_ends, dtype=np.int64)
+        return grid_vertex_start[ends].astype(INDEX_DTYPE), grid_face_start[ends].astype(INDEX_DTYPE)
+
+    def _add_json_grid(self, vertices, triangles):
+        if isinstance(vertices[0], dict):
+            self._flat_vertices.extend(chain.from_iterable(
+                (p.get('x', 0), p.get('y', 0), p.get('z', 0)) for p in vertices))
+        else:
+            self._flat_vertices.extend(chain.from_iterable(p[:3] for p in vertices))
+        count = 0
+        for triangle in triangles:
+            if len(triangle) >= 3:
+                self._flat_triangles.extend(triangle[:3])
+                count += 1
+        self._vertex_counts.append(len(vertices))
+        self._triangle_counts.append(count)
+
+    def _flush(self):
+        """Turn the flat lists collected so far into one chunk"""
+        if self._flat_vertices:
+            self._vertex_chunks.append(np.array(self._flat_vertices, dtype=VERTEX_DTYPE).reshape(-1, 3))
+            self._flat_vertices = []
+        if self._flat_triangles:
+            self._triangle_chunks.append(np.array(self._flat_triangles, dtype=INDEX_DTYPE).reshape(-1, 3))
+            self._flat_triangles = []
+
+
+def wall_mesh_arrays(wall):
+    """
+    Mesh of one wall as arrays
+
+    Returns:
+        tuple: ((N, 3) float64 vertices, (M, 3) int32 faces indexing them)
+    """
+    builder = MeshBuilder()
+    builder.add_wall(wall)
+    return builder.build()
+
+
+def split_packed(geometry, walls):
+    """
+    Cut the geometry block of a binary frame into per-wall meshes
+
+    Vertices are views into the frame; faces are shifted to index the
+    wall's own vertices (one add for the whole block, then slices).
+
+    Returns:
+        list: (vertices, faces) per wall, in the order of walls
+    """
+    vertex_starts = np.asarray(geometry["gridVertexStart"], dtype=np.int64)
+    triangle_starts = np.asarray(geometry["gridTriangleStart"], dtype=np.int64)
+    vertices = points_array(geometry["vertices"])
+    # Grid-local -> frame-global indices
+    faces = triangles_array(geometry["triangles"]) + np.repeat(
+        vertex_starts[:-1], np.diff(triangle_starts)).astype(INDEX_DTYPE)[:, None]
+
+    meshes = []
+    grid = 0
+    for wall in walls:
+        first = grid
+        grid += sum(len(mesh_obj.get('grids') or []) for mesh_obj in wall.get('mesh') or [])
+        v0, v1 = vertex_starts[first], vertex_starts[grid]
+        t0, t1 = triangle_starts[first], triangle_starts[grid]
+        meshes.append((vertices[v0:v1], faces[t0:t1] - INDEX_DTYPE(v0)))
+    return meshes
+
+
+def weld_vertices(vertices, faces, tolerance=0.1):
+    """
+    Merge coincident vertices across grids and walls
+
+    Coordinates are snapped to a grid of size tolerance; vertices in the
+    same grid cell become one (np.unique over the integer key rows). This
+    is not a distance test: two vertices closer than tolerance but on
+    either side of a cell boundary are not merged, two up to
+    tolerance * sqrt(3) apart in one cell are. Vertices that coincide up to
+    float noise are merged unless they straddle a boundary, which a
+    tolerance well above the noise makes unlikely. The first vertex of
+    every group is kept, in original order. Faces collapsed by the merge
+    (two equal indices) are removed.
+
+    Args:
+        vertices: (N, 3) float array
+        faces: (M, 3) int array
+        tolerance: grid cell size, model units (mm)
+
+    Returns:
+        tuple: (vertices (K, 3), faces (L, 3) int32, stats dict with
+            vertices_before, vertices_after, faces_removed, ratio and
+            face_mask - bool (M,) of the faces kept, None if all are)
+    """
+    vertices = np.asarray(vertices, dtype=VERTEX_DTYPE).reshape(-1, 3)
+    faces = np.asarray(faces, dtype=INDEX_DTYPE).reshape(-1, 3)
+    count = len(vertices)
+    if not count or tolerance <= 0:
+        return vertices, faces, _weld_stats(count, count, 0)
+
+    keys = np.ascontiguousarray(np.floor(vertices / tolerance + 0.5).astype(np.int64))
+    # One 24-byte value per row: unique over rows without axis=0 (much faster)
+    rows = keys.view(np.dtype((np.void, keys.dtype.itemsize * 3))).ravel()
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+
+    # Unique rows come back sorted by key; renumber in order of first use
+    order = np.argsort(first, kind='stable')
+    new_index = np.empty(len(first), dtype=INDEX_DTYPE)
+    new_index[order] = np.arange(len(first), dtype=INDEX_DTYPE)
+    welded = vertices[first[order]]
+    remap = new_index[inverse.ravel()]
+
+    new_faces = remap[faces]
+    keep = ((new_faces[:, 0] != new_faces[:, 1]) &
+            (new_faces[:, 1] != new_faces[:, 2]) &
+            (new_faces[:, 0] != new_faces[:, 2]))
+    new_faces = new_faces[keep]
+    stats = _weld_stats(count, len(welded), int(len(faces) - len(new_faces)))
+    stats["face_mask"] = keep if stats["faces_removed"] else None
+    return welded, new_faces, stats
+
+
+def _weld_stats(before, after, faces_removed):
+    return {
+        "vertices_before": before,
+        "vertices_after": after,
+        "faces_removed": faces_removed,
+        "ratio": (before / after) if after else 1.0,
+        "face_mask": None,
+    }
+
+
+def remap_face_starts(face_start, face_mask):
+    """Face offsets after removing faces (face_mask False); None mask - unchanged"""
+    if face_mask is None:
+        return face_start
+    kept_before = np.zeros(len(face_mask) + 1, dtype=np.int64)
+    np.cumsum(face_mask, out=kept_before[1:])
+    return kept_before[face_start].astype(INDEX_DTYPE)
+
+
+def split_walls(vertices, faces, wall_vertex_start, wall_face_start):
+    """
+    Per-wall meshes from a shared buffer, faces renumbered to each wall
+
+    wall_vertex_start None (after welding, walls share vertices): every wall
+    gets the vertices its faces use, in buffer order.
+
+    Returns:
+        tuple: (list of (N_i, 3) vertex arrays, list of (M_i, 3) face arrays)
+    """
+    wall_vertices, wall_faces = [], []
+    for i in range(len(wall_face_start) - 1):
+        wall_f = faces[wall_face_start[i]:wall_face_start[i + 1]]
+        if wall_vertex_start is not None:
+            v0, v1 = wall_vertex_start[i], wall_vertex_start[i + 1]
+            wall_vertices.append(vertices[v0:v1])
+            wall_faces.append(wall_f - INDEX_DTYPE(v0))
+        else:
+            used, local = np.unique(wall_f, return_inverse=True)
+            wall_vertices.append(vertices[used])
+            wall_faces.append(local.reshape(-1, 3).astype(INDEX_DTYPE))
+    return wall_vertices, wall_faces
+
+
+# Scalar wall fields of attribute_columns()
+ATTRIBUTE_FIELDS = ("id", "name", "position", "height", "thickness")
+
+_NAN_POINT = {"x": np.nan, "y": np.nan, "z": np.nan}
+
+
+def attribute_columns(walls, fields=ATTRIBUTE_FIELDS):
+    """
+    Wall attributes as columns, row i belongs to walls[i]
+
+    Args:
+        walls: wall dicts of a reply
+        fields: columns to build (of ATTRIBUTE_FIELDS)
+
+    Returns:
+        dict: id - (N,) int64 (-1 if missing), name - list of str,
+            position - (N, 3) float64, height/thickness - (N,) float64;
+            missing numbers are NaN
+    """
+    count = len(walls)
+    columns = {}
+    if "id" in fields:
+        columns["id"] = np.fromiter((w.get("id", -1) for w in walls), dtype=np.int64, count=count)
+    if "name" in fields:
+        columns["name"] = [w.get("name") or "" for w in walls]
+    if "position" in fields:
+        columns["position"] = points_array([w.get("position") or _NAN_POINT for w in walls])
+    for field in ("height", "thickness"):
+        if field in fields:
+            values = (w.get(field) for w in walls)
+            columns[field] = np.fromiter((np.nan if v is None else v for v in values), dtype=VERTEX_DTYPE, count=count)
+    return columns
+
+
+def concat_columns(parts, fields=ATTRIBUTE_FIELDS):
+    """Join attribute_columns() of consecutive batches"""
+    if not parts:
+        return attribute_columns([], fields)
+    columns = {}
+    for field in parts[0]:
+        if field == "name":
+            columns[field] = [name for part in parts for name in part[field]]
+        else:
+            columns[field] = np.concatenate([part[field] for part in parts])
+    return columns
@@ -0,0 +1,43 @@
+"""
+Tests of the Renga client modules against the reference server
+
+The modules under sverchok_nodes/renga that don't need Blender are tested
+with plain Python:
+    python -m pytest -q
+Tests of the node modules (renga_create_columns) are skipped unless bpy and
+Sverchok can be imported, e.g. when pytest runs inside Blender's Python.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sverchok_nodes", "renga"))
+
+import reference_server
+import renga_client
+
+
+@pytest.fixture
+def walls():
+    """60 synthetic walls on 2 levels, every 5th with an arc baseline"""
+    return reference_server.make_synthetic_walls(60, levels=2)
+
+
+@pytest.fixture
+def server(walls):
+    with reference_server.RengaReferenceServer(model=reference_server.ReferenceModel(walls)) as srv:
+        yield srv
+
+
+@pytest.fixture
+def pool():
+    pool = renga_client.ConnectionPool()
+    yield pool
+    pool.close_all()
+
+
+@pytest.fixture
+def client(server, pool):
+    return renga_client.RengaConnectionClient(port=server.port, pool=pool)
@@ -0,0 +1,242 @@
+"""
+RengaConnectionClient: connection pooling and retry, pipelining, streaming
+and compression
+"""
+
+import socket
+import threading
+import uuid
+import zlib
+
+import pytest
+
+import commands
+import connection_protocol
+import parallel_decode
+import reference_server
+import renga_client
+
+
+def _message(command, data=None):
+    return {"id": str(uuid.uuid4()), "command": command, "data": data or {}}
+
+
+def _script_server(handle):
+    """
+    One-off TCP server: handle(sock) runs for every accepted connection
+
+    Returns:
+        tuple: (listening socket, port)
+    """
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(5)
+
+    def serve():
+        while True:
+            try:
+                sock, _ = listener.accept()
+            except OSError:
+                return
+            try:
+                handle(sock)
+            except (ConnectionError, OSError, ValueError):
+                pass
+            finally:
+                sock.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener, listener.getsockname()[1]
+
+
+def _reply(sock, message, **fields):
+    connection_protocol.send_message(sock, dict({"id": message["id"], "success": True, "data": {}}, **fields))
+
+
+# Pooling and retry
+
+def test_connection_is_reused(client, pool):
+    for _ in range(3):
+        assert client.send(commands.create_get_walls_message())["success"]
+    assert pool.stats["opened"] == 1
+    assert pool.stats["reused"] >= 2
+
+
+def test_stale_pooled_connection_is_replaced(walls, pool):
+    srv = reference_server.RengaReferenceServer(model=reference_server.ReferenceModel(walls)).start()
+    port = srv.port
+    client = renga_client.RengaConnectionClient(port=port, pool=pool)
+    assert client.send(commands.create_get_walls_message())["success"]
+    srv.stop()
+
+    # Renga restarted: the pooled socket is closed by the old server
+    with reference_server.RengaReferenceServer(port=port, model=reference_server.ReferenceModel(walls)):
+        response = client.send(commands.create_get_walls_message())
+    assert response["success"]
+    assert len(response["data"]["walls"]) == len(walls)
+    assert pool.stats["opened"] == 2
+
+
+def test_request_is_not_resent_after_receive_failure(pool):
+    received = []
+
+    def handle(sock):
+        while True:
+            message = connection_protocol.receive_message(sock, 5)
+            received.append(message["command"])
+            if message["command"] == "hello":
+                _reply(sock, message, success=False, error="Unknown command")
+            elif message["command"] == "first":
+                _reply(sock, message)
+            else:
+                # Applied, then the connection drops before the reply
+                return
+
+    listener, port = _script_server(handle)
+    try:
+        client = renga_client.RengaConnectionClient(port=port, pool=pool, compress_level=None)
+        assert client.send(_message("first"))["success"]
+        response = client.send(_message("update_points"))
+        assert not response["success"]
+        assert received.count("update_points") == 1
+    finally:
+        listener.close()
+
+
+def test_unreachable_server_gives_error_response(pool):
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    listener.close()
+    client = renga_client.RengaConnectionClient(port=port, pool=pool, timeout=1.0)
+    response = client.send(_message("get_walls"))
+    assert response["success"] is False
+    assert response["error"]
+    assert not client.is_server_reachable()
+
+
+# Pipelining
+
+def test_send_many_matches_responses_by_id(client, walls):
+    messages = [commands.create_get_walls_message(level_id=level) for level in (1, 2, 1)]
+    messages.append(_message("no_such_command"))
+    responses = client.send_many(messages)
+    assert [r["id"] for r in responses] == [m["id"] for m in messages]
+    for level, response in zip((1, 2, 1), responses):
+        expected = [w["id"] for w in walls if w["levelId"] == level]
+        assert [w["id"] for w in response["data"]["walls"]] == expected
+    assert responses[-1]["success"] is False
+
+
+def test_submit_rejects_streamed_requests(client):
+    with pytest.raises(ValueError):
+        client.submit(commands.create_get_walls_message(stream=True))
+
+
+def test_stream_and_plain_requests_on_the_same_server(client, walls):
+    future = client.submit(commands.create_get_walls_message())
+    batches = list(client.iter_wall_batches(commands.create_get_walls_message(stream=True, batch_size=16)))
+    assert sum(len(b.get("walls") or []) for b in batches) == len(walls)
+    assert len(future.result(10)["data"]["walls"]) == len(walls)
+
+
+def test_pipelined_reply_with_unknown_id_is_dropped_and_unanswered_request_not_resent():
+    received = []
+
+    def handle(sock):
+        message = connection_protocol.receive_message(sock, 5)
+        received.append(message["id"])
+        _reply(sock, {"id": "stray"})
+        _reply(sock, message, data={"ok": 1})
+        received.append(connection_protocol.receive_message(sock, 5)["id"])
+        # The second request was read (maybe applied), the reply never comes
+
+    listener, port = _script_server(handle)
+    try:
+        client = renga_client.RengaConnectionClient(port=port, compress_level=None)
+        first, second = _message("update_points"), _message("update_points")
+        responses = client.send_many([first, second])
+        assert responses[0]["success"] and responses[0]["data"] == {"ok": 1}
+        assert responses[1]["success"] is False
+        assert received == [first["id"], second["id"]]
+    finally:
+        listener.close()
+        renga_client.get_channel(port=port).close()
+
+
+# Streaming
+
+def test_stream_batches_and_final_frame(client, walls):
+    message = commands.create_get_walls_message(stream=True, batch_size=16, delta=True)
+    responses = list(client.send_stream(message))
+    assert len(responses) == -(-len(walls) // 16) + 1
+    assert [r["stream"]["seq"] for r in responses] == list(range(len(responses)))
+    assert [r["stream"]["final"] for r in responses][-2:] == [False, True]
+    final = responses[-1]["data"]
+    assert final["revision"] and final["full"] is True
+    assert final["count"] == len(walls)
+    ids = [w["id"] for r in responses[:-1] for w in r["data"]["walls"]]
+    assert ids == [w["id"] for w in walls]
+
+
+def test_stream_stopped_early_discards_the_connection(client, pool):
+    batches = client.iter_wall_batches(commands.create_get_walls_message(stream=True, batch_size=8))
+    next(batches)
+    batches.close()
+    assert pool.stats["discarded"] == 1
+    assert pool.idle_count(client.host, client.port) == 0
+    assert client.send(commands.create_get_walls_message())["success"]
+
+
+def test_stream_decoded_in_worker_processes(client, walls):
+    submit = parallel_decode.frame_submitter(1)
+    try:
+        message = commands.create_get_walls_message(stream=True, batch_size=16)
+        batches = list(client.iter_wall_batches(message, submit))
+    finally:
+        parallel_decode.shutdown()
+    assert sum(len(b.get("walls") or []) for b in batches) == len(walls)
+
+
+def test_server_error_in_stream_raises(client):
+    message = commands.create_get_walls_message(stream=True)
+    message["command"] = "no_such_command"
+    with pytest.raises(renga_client.RengaServerError):
+        list(client.iter_wall_batches(message))
+
+
+# Compression
+
+def test_compressed_request_and_reply(server, pool):
+    client = renga_client.RengaConnectionClient(port=server.port, pool=pool, compress_threshold=1024)
+    points = [(float(i), float(i), 0.0) for i in range(2000)]
+    message = commands.create_update_points_message(points, [3000.0] * len(points))
+    assert client._encode(message)[0] & connection_protocol.FLAG_COMPRESSED
+    response = client.send(message)
+    assert response["success"]
+    assert len(response["data"]["results"]) == len(points)
+
+
+def test_reply_is_compressed_only_when_accepted(server, walls):
+    payloads = {}
+    for accept in ([], [connection_protocol.ENCODING_ZLIB]):
+        message = dict(commands.create_get_walls_message(), accept=accept)
+        with socket.create_connection((server.host, server.port), 5) as sock:
+            connection_protocol.send_message(sock, message)
+            payloads[bool(accept)] = connection_protocol.receive_frame(sock, 10)
+    assert not payloads[False][0] & connection_protocol.FRAME_TAGGED
+    assert payloads[True][0] & connection_protocol.FLAG_COMPRESSED
+    assert len(payloads[True]) < len(payloads[False])
+    plain = connection_protocol.decode_message(payloads[False])
+    assert connection_protocol.decode_message(payloads[True])["data"] == plain["data"]
+
+
+def test_compressed_frame_inflating_past_the_limit_is_rejected():
+    body = b"[" + b"0," * 500000 + b"0]"
+    payload = bytes((connection_protocol.FRAME_TAGGED | connection_protocol.FLAG_COMPRESSED |
+                     connection_protocol.FRAME_JSON,)) + zlib.compress(body)
+    assert len(connection_protocol.decode_message(payload)) == 500001
+    with pytest.raises(ValueError):
+        connection_protocol.decode_message(payload, max_length=64 * 1024)
+    with pytest.raises(ValueError):
+        connection_protocol.decode_message(payload[:len(payload) // 2])
@@ -0,0 +1,149 @@
+"""
+update_points: creating, moving and deleting columns, diff-based sync
+through a ColumnSnapshot and chunked requests of the Create Columns node
+"""
+
+import pytest
+
+import column_snapshot
+import commands
+
+
+def _sync(client, snapshot, guids, points, heights):
+    """One diff-based sync in a single request; returns the plan and the outputs"""
+    plan = snapshot.diff(guids, points, heights)
+    if plan.empty:
+        return plan, snapshot.apply(plan, [])
+    message = commands.create_update_points_message(
+        [points[i] for i in plan.send], [heights[i] for i in plan.send], plan.column_ids,
+        plan.deletions, [guids[i] for i in plan.send])
+    response = client.send(message)
+    assert response["success"], response
+    data = response["data"]
+    return plan, snapshot.apply(plan, data["results"], data.get("deleted"))
+
+
+def _grid(count, height=3000.0):
+    points = [(float(i % 10) * 1000, float(i // 10) * 1000, 0.0) for i in range(count)]
+    return [f"p{i}" for i in range(count)], points, [height] * count
+
+
+def test_update_points_creates_moves_and_deletes(server, client):
+    points = [(0.0, 0.0, 0.0), (1000.0, 0.0, 0.0)]
+    message = commands.create_update_points_message(points, [3000.0, 3000.0], point_guids=["a", "b"])
+    results = client.send(message)["data"]["results"]
+    assert [r["message"] for r in results] == ["Column created"] * 2
+    column_a = results[0]["columnId"]
+
+    # Point "c" takes over the column of "a"
+    message = commands.create_update_points_message([(5.0, 5.0, 0.0)], [2500.0], [column_a], point_guids=["c"])
+    moved = client.send(message)["data"]["results"][0]
+    assert moved["message"] == "Column updated" and moved["columnId"] == column_a
+    assert server.model.columns[int(column_a)]["height"] == 2500.0
+
+    message = commands.create_update_points_message([], deletions=[("b", results[1]["columnId"])])
+    deleted = client.send(message)["data"]["deleted"]
+    assert deleted[0]["success"] and int(results[1]["columnId"]) not in server.model.columns
+    assert len(server.model.columns) == 1
+
+
+def test_snapshot_sends_only_the_difference(server, client):
+    guids, points, heights = _grid(30)
+    snapshot = column_snapshot.ColumnSnapshot()
+    plan, (successes, _, column_ids) = _sync(client, snapshot, guids, points, heights)
+    assert plan.created == 30 and all(successes) and all(column_ids)
+
+    plan, (_, messages, _) = _sync(client, snapshot, guids, points, heights)
+    assert plan.empty and set(messages) == {"Column unchanged"}
+
+    heights[4] = 4000.0
+    guids[7] = "moved"
+    plan, _ = _sync(client, snapshot, guids[:-2], points[:-2], heights[:-2])
+    assert (plan.changed, len(plan.moved), len(plan.deletions)) == (1, 1, 2)
+    assert len(server.model.columns) == 28
+    assert snapshot.column_id("moved") == column_ids[7]
+
+
+def test_snapshot_save_and_load(tmp_path, client):
+    guids, points, heights = _grid(5)
+    snapshot = column_snapshot.ColumnSnapshot()
+    _sync(client, snapshot, guids, points, heights)
+    snapshot.project = "project.rnp"
+    path = tmp_path / column_snapshot.snapshot_name("node", 50100)
+    column_snapshot.save(snapshot, str(path))
+
+    loaded = column_snapshot.load(str(path))
+    assert loaded.columns == snapshot.columns and loaded.order == guids
+    assert loaded.project == "project.rnp" and not loaded.checked
+    assert column_snapshot.snapshot_name("node", 50100) != column_snapshot.snapshot_name("node", 50101)
+
+
+def test_open_project_is_reported(server, client):
+    assert client.open_project() == "reference"
+    server.model.project = "other"
+    assert client.open_project() == "other"
+
+
+# Create Columns node: needs Blender (bpy) and Sverchok
+
+@pytest.fixture
+def create_columns(monkeypatch):
+    pytest.importorskip("bpy")
+    pytest.importorskip("sverchok")
+    import renga_create_columns
+    monkeypatch.setattr(renga_create_columns, "UPDATE_CHUNK_POINTS", 8)
+    return renga_create_columns
+
+
+def test_points_are_sent_in_chunks(server, create_columns):
+    guids, points, heights = _grid(30)
+    deletions = [("gone1", None), ("gone2", None)]
+    progress = []
+    results, deleted = create_columns._send_chunks(server.port, guids, points, heights, [None] * 30,
+                                                   deletions, progress.append)
+    assert [r["grasshopperGuid"] for r in results] == guids
+    assert len(deleted) == 2
+    assert progress == [(8, 32), (16, 32), (24, 32), (32, 32)]
+    assert len(server.model.columns) == 30
+
+
+def test_chunk_ranges_respect_the_byte_limit(monkeypatch, create_columns):
+    monkeypatch.setattr(create_columns, "UPDATE_CHUNK_BYTES", 3 * create_columns.UPDATE_ITEM_BYTES)
+    guids = [f"p{i}" for i in range(10)]
+    ranges = create_columns._chunk_ranges(guids)
+    assert ranges[0][0] == 0 and ranges[-1][1] == 10
+    assert all(end - start <= 3 for start, end in ranges)
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+def test_failed_chunk_fails_the_rest(server, create_columns):
+    guids, points, heights = _grid(20)
+    port = server.port
+    server.stop()
+    progress = []
+    results, _ = create_columns._send_chunks(port, guids, points, heights, progress=progress.append)
+    assert len(results) == 20 and not any(r["success"] for r in results)
+    assert progress[-1] == (20, 20)
+
+
+def test_snapshot_of_another_project_is_dropped(server, monkeypatch, create_columns):
+    _, points, heights = _grid(10)
+    snapshot = column_snapshot.ColumnSnapshot()
+    create_columns.send_points(server.port, points, heights, snapshot)
+    assert snapshot.project == "reference" and len(snapshot) == 10
+
+    sent = []
+    build = create_columns.create_update_points_message
+
+    def spy(*args, **kwargs):
+        message = build(*args, **kwargs)
+        sent.extend(point["rengaColumnGuid"] for point in message["data"]["points"])
+        return message
+
+    monkeypatch.setattr(create_columns, "create_update_points_message", spy)
+    server.model.project = "other"
+    snapshot.checked = False  # as after restoring it from disk
+    create_columns.send_points(server.port, points, heights, snapshot)
+    # Every point is sent again, without the column ids of the old project
+    assert sent == [None] * 10
+    assert snapshot.project == "other" and len(snapshot) == 10
@@ -0,0 +1,160 @@
+"""
+get_walls: delta replies merged into a WallCache, bbox/level filters and
+region queries over the cached walls
+"""
+
+import numpy as np
+
+import commands
+import reference_server
+import spatial_index
+import wall_cache
+
+
+def _refresh(client, cache, stream=False, **filters):
+    """One delta get_walls merged into cache, as the Get Walls node does it"""
+    message = commands.create_get_walls_message(stream=stream, batch_size=16, delta=True,
+                                                since=cache.revision, **filters)
+    meta = {}
+    cache.begin()
+    for batch in client.iter_wall_batches(message):
+        for wall in batch.get("walls") or []:
+            cache.add(wall)
+        if "revision" in batch:
+            meta = batch
+    return cache.commit(meta)
+
+
+def _box(wall):
+    bbox = wall["bbox"]
+    return ([bbox["min"][axis] for axis in "xyz"], [bbox["max"][axis] for axis in "xyz"])
+
+
+def _touches(wall, box_min, box_max):
+    lower, upper = _box(wall)
+    return all(lower[i] <= box_max[i] and upper[i] >= box_min[i] for i in range(3))
+
+
+# Delta
+
+def test_first_refresh_is_full(client, walls):
+    cache = wall_cache.WallCache()
+    stats = _refresh(client, cache)
+    assert stats["full"] and stats["added"] == stats["total"] == len(walls)
+    assert [w["id"] for w in cache.walls()] == [w["id"] for w in walls]
+    assert cache.project == "reference"
+
+
+def test_delta_sends_only_changes(server, client, walls):
+    cache = wall_cache.WallCache()
+    _refresh(client, cache)
+    revision = cache.revision
+
+    assert _refresh(client, cache) == {"full": False, "added": 0, "changed": 0, "removed": 0,
+                                       "unchanged": len(walls), "total": len(walls)}
+    assert cache.revision == revision
+
+    server.model.set_wall(dict(walls[3], height=4500.0))
+    server.model.remove_wall(walls[7]["id"])
+    server.model.set_wall(reference_server.make_wall(999, (0, -9000, 0), (4000, -9000, 0)))
+    stats = _refresh(client, cache)
+    assert (stats["added"], stats["changed"], stats["removed"]) == (1, 1, 1)
+    assert stats["total"] == len(walls)
+    assert cache.revision != revision
+    assert cache.get(walls[3]["id"])["height"] == 4500.0
+    assert walls[7]["id"] not in cache and 999 in cache
+
+
+def test_streamed_delta_carries_removals_in_the_final_frame(server, client, walls):
+    cache = wall_cache.WallCache()
+    _refresh(client, cache, stream=True)
+    server.model.remove_wall(walls[0]["id"])
+    stats = _refresh(client, cache, stream=True)
+    assert stats["removed"] == 1 and stats["total"] == len(walls) - 1
+
+
+def test_unknown_revision_gets_a_full_reply(client, walls):
+    cache = wall_cache.WallCache()
+    _refresh(client, cache)
+    cache.revision = "unknown"
+    stats = _refresh(client, cache)
+    assert stats["full"] and stats["total"] == len(walls)
+
+
+def test_interrupted_reply_leaves_the_cache_as_it_was(client, walls):
+    cache = wall_cache.WallCache()
+    _refresh(client, cache)
+    revision = cache.revision
+    cache.begin()
+    cache.add({"id": 12345})
+    # No commit: the reply broke off
+    cache.begin()
+    cache.commit({"revision": revision, "full": False, "removed": []})
+    assert len(cache) == len(walls) and 12345 not in cache
+
+
+def test_copy_is_updated_independently(server, client, walls):
+    cache = wall_cache.WallCache()
+    _refresh(client, cache)
+    copy = cache.copy()
+    server.model.remove_wall(walls[0]["id"])
+    _refresh(client, copy)
+    assert len(copy) == len(walls) - 1
+    assert len(cache) == len(walls) and walls[0]["id"] in cache
+
+
+# Filters
+
+def test_level_filter(client, walls):
+    for level in (1, 2):
+        response = client.send(commands.create_get_walls_message(level_id=level))
+        assert [w["id"] for w in response["data"]["walls"]] == [w["id"] for w in walls if w["levelId"] == level]
+
+
+def test_bbox_filter(client, walls):
+    box_min, box_max = (4000.0, 4000.0, 0.0), (16000.0, 12000.0, 1000.0)
+    expected = [w["id"] for w in walls if _touches(w, box_min, box_max)]
+    assert 0 < len(expected) < len(walls)
+    for stream in (False, True):
+        message = commands.create_get_walls_message(stream=stream, bbox=(box_min, box_max))
+        ids = [w["id"] for w in client.iter_walls(message)]
+        assert ids == expected
+
+
+def test_filtered_delta_ignores_changes_outside_the_filter(server, client, walls):
+    cache = wall_cache.WallCache()
+    _refresh(client, cache, level_id=1)
+    assert {w["levelId"] for w in cache.walls()} == {1}
+    other = next(w for w in walls if w["levelId"] == 2)
+    server.model.set_wall(dict(other, height=5000.0))
+    stats = _refresh(client, cache, level_id=1)
+    assert not stats["full"] and stats["changed"] == stats["added"] == stats["removed"] == 0
+
+
+# Region queries
+
+def test_cache_query_matches_the_bbox_filter(client, walls):
+    cache = wall_cache.WallCache()
+    _refresh(client, cache)
+    bounds_of = lambda wall, decoded: _box(wall)
+    for box_min, box_max in [((0, 0, 0), (1, 1, 1)), ((4000, 4000, 0), (16000, 12000, 1000)),
+                             ((-1e9, -1e9, -1e9), (1e9, 1e9, 1e9)), ((1e6, 1e6, 0), (2e6, 2e6, 1))]:
+        expected = [w["id"] for w in walls if _touches(w, box_min, box_max)]
+        assert cache.query(box_min, box_max, bounds_of) == expected
+
+
+def test_grid_index_matches_brute_force_with_oversized_boxes():
+    rng = np.random.default_rng(7)
+    mins = rng.uniform(0, 1000, (2000, 3))
+    maxs = mins + rng.uniform(0.5, 5, (2000, 3))
+    # A box over the whole plan would otherwise land in every cell
+    mins = np.vstack((mins, [[-1e7, -1e7, 0], [100, 100, 0]]))
+    maxs = np.vstack((maxs, [[1e7, 1e7, 10], [900, 900, 10]]))
+    index = spatial_index.GridIndex(mins, maxs)
+    assert len(index._large) == 2
+    assert sum(len(items) for items in index._cells.values()) < 20 * len(mins)
+    for _ in range(200):
+        box_min = rng.uniform(-100, 1000, 3)
+        box_max = box_min + rng.uniform(0, 300, 3)
+        expected = np.flatnonzero(spatial_index.box_intersects(mins, maxs, box_min, box_max))
+        assert np.array_equal(index.query(box_min, box_max), expected)